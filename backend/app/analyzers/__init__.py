@@ -1,4 +1,37 @@
-from .js_analyzer import analyze_javascript
-from .py_analyzer import analyze_python
+from .core import ENGINES, LANGUAGES, analyze_file, analyze_source, analyze_stream, backend, language_for
 
-__all__ = ['analyze_javascript', 'analyze_python'] 
\ No newline at end of file
+# Bump whenever a change to the analyzers can change their results; cached
+# results from other versions are then ignored
+ANALYZER_VERSION = "2.1.0"
+
+# Backend functions, imported from their language module on first access
+_LAZY_NAMES = {
+    'analyze_javascript': 'javascript',
+    'analyze_javascript_source': 'javascript',
+    'analyze_javascript_stream': 'javascript',
+    'analyze_python': 'python',
+    'analyze_python_source': 'python',
+    'analyze_python_stream': 'python',
+}
+
+def __getattr__(name):
+    if name in _LAZY_NAMES:
+        return getattr(backend(_LAZY_NAMES[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+__all__ = [
+    'ANALYZER_VERSION',
+    'ENGINES',
+    'LANGUAGES',
+    'analyze_file',
+    'analyze_javascript',
+    'analyze_javascript_source',
+    'analyze_javascript_stream',
+    'analyze_python',
+    'analyze_python_source',
+    'analyze_python_stream',
+    'analyze_source',
+    'analyze_stream',
+    'backend',
+    'language_for',
+]
@@ -0,0 +1,439 @@
+import argparse
+import fnmatch
+import hashlib
+import itertools
+import json
+import os
+import sys
+import time
+from . import ANALYZER_VERSION
+from .core import DEFAULT_ENGINE, ENGINES, LANGUAGES, analyze_source
+from ..config import MAX_FILE_BYTES
+
+# Modules only some options need (worker pools, git, the SQLite store and
+# cross-file duplication) are imported where they are used, so that a hook
+# scoring a few files starts fast
+
+# Starting worker processes costs more than analyzing this many files
+SERIAL_MAX_FILES = 4
+
+DEFAULT_IGNORES = [
+    '.git', 'node_modules', '__pycache__', '.venv', 'venv',
+    'build', 'dist', '.tox', '.mypy_cache', '*.min.js',
+]
+
+def main(argv=None):
+    """
+    Analyze files and directory trees from the command line.
+
+    Args:
+        argv (list): Command-line arguments, defaults to sys.argv[1:]
+
+    Returns:
+        int: Process exit code
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m app.analyzers',
+        description='Score the code quality of .js, .jsx and .py files.',
+    )
+    parser.add_argument('paths', nargs='*', help='Files or directories to analyze (pathspecs with --git-diff)')
+    parser.add_argument('--ignore', action='append', default=[], metavar='GLOB',
+                        help='Skip paths matching GLOB (repeatable)')
+    parser.add_argument('--no-default-ignores', action='store_true',
+                        help=f"Do not skip {', '.join(DEFAULT_IGNORES)}")
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes (default: CPU count)')
+    parser.add_argument('--format', choices=['table', 'jsonl'], default='table',
+                        help='Output format (default: table)')
+    parser.add_argument('--output', '-o', help='Write results to this file instead of stdout')
+    parser.add_argument('--engine', choices=list(ENGINES), default=DEFAULT_ENGINE,
+                        help=f'Analyzer engine; legacy is the original analyzer (default: {DEFAULT_ENGINE})')
+    parser.add_argument('--manifest', help='Reuse results for files unchanged since the run that wrote this file, then update it')
+    parser.add_argument('--cross-file', action='store_true',
+                        help='Find code duplicated across files and count it against reusability')
+    parser.add_argument('--max-fingerprints', type=int, default=1_000_000,
+                        help='Memory bound of the --cross-file index (default: 1000000)')
+    parser.add_argument('--git-diff', nargs=2, metavar=('BASE', 'HEAD'),
+                        help='Only analyze files added or modified between two git refs and report score deltas')
+    parser.add_argument('--store', help='SQLite file of per-blob results reused across --git-diff runs')
+    parser.add_argument('--rollup', metavar='SNAPSHOT',
+                        help='Update the per-directory score rollups in this snapshot file '
+                             '(query it with python -m app.analyzers.rollups)')
+    args = parser.parse_args(argv)
+
+    ignores = args.ignore + ([] if args.no_default_ignores else DEFAULT_IGNORES)
+    if args.git_diff:
+        return diff_refs(args, ignores)
+    if not args.paths:
+        parser.error('give at least one path, or --git-diff BASE HEAD')
+    return scan_paths(args, ignores)
+
+def scan_paths(args, ignores):
+    """Analyze every supported file under args.paths and write the results."""
+    previous = load_manifest(args.manifest, args.engine) if args.manifest else {}
+    index = None
+    if args.cross_file:
+        from .duplicates import DuplicateIndex, apply_cross_file_duplication
+        index = DuplicateIndex(args.max_fingerprints)
+    # Cross-file results are only final once every file is indexed
+    stream = args.format == 'jsonl' and index is None
+
+    started = time.perf_counter()
+    paths = iter_source_files(args.paths, ignores)
+    first_paths = list(itertools.islice(paths, SERIAL_MAX_FILES + 1))
+    tasks = (
+        (path, previous.get(path, {}).get('sha256'), index is not None, args.engine)
+        for path in itertools.chain(first_paths, paths)
+    )
+    jobs = 1 if len(first_paths) <= SERIAL_MAX_FILES else args.jobs
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    records = []
+
+    try:
+        for record in run_tasks(analyze_file, tasks, jobs, chunksize=16):
+            fingerprints = record.pop('fingerprints', None)
+            if fingerprints is not None:
+                index.add(record['file'], fingerprints)
+            if record['status'] == 'unchanged':
+                record['result'] = previous[record['file']]['result']
+            if stream:
+                output.write(json.dumps(record) + '\n')
+            records.append(record)
+
+        records.sort(key=lambda record: record['file'])
+        # The manifest keeps single-file results, which other files cannot change
+        manifest_records = [dict(record) for record in records]
+        if index is not None:
+            for record in records:
+                clones = index.clones(record['file'])
+                record['cross_file_duplicates'] = len(clones)
+                if clones:
+                    record['clones'] = clones[:5]
+                if 'result' in record:
+                    record['result'] = apply_cross_file_duplication(record['result'], clones)
+            if args.format == 'jsonl':
+                for record in records:
+                    output.write(json.dumps(record) + '\n')
+
+        summary = summarize(records, time.perf_counter() - started)
+        if args.format == 'jsonl':
+            output.write(json.dumps({'summary': summary}) + '\n')
+        else:
+            write_table(output, records, summary)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    if args.manifest:
+        save_manifest(args.manifest, manifest_records, args.engine)
+    if args.rollup:
+        update_rollups(args.rollup, args.paths, records)
+    return 1 if summary['errors'] else 0
+
+def diff_refs(args, ignores):
+    """
+    Analyze only the files that changed between two git refs.
+
+    Both sides of every change are read straight from the object database,
+    so neither ref has to be checked out. Results are stored per blob id, and
+    a blob analyzed by an earlier run (or on the other side of this diff) is
+    never analyzed again, so the work scales with the diff, not the repo.
+    """
+    from .git_diff import GitError, changed_files, read_blobs
+    from ..cache import ResultCache
+
+    base, head = args.git_diff
+    started = time.perf_counter()
+    try:
+        changes = [
+            change for change in changed_files(base, head, args.paths)
+            if _extension(change.path) in LANGUAGES and not _ignored(change.path, ignores)
+        ]
+    except GitError as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 2
+
+    # Each blob to score, once per language
+    blobs = set()
+    for change in changes:
+        blobs.add((LANGUAGES[_extension(change.path)], change.new_oid))
+        if change.old_oid and _extension(change.old_path) in LANGUAGES:
+            blobs.add((LANGUAGES[_extension(change.old_path)], change.old_oid))
+
+    store = ResultCache(0, args.store)
+    results = {}
+    missing = []
+    for language, oid in blobs:
+        result = store.get(store.blob_key(language, oid, args.engine))
+        if result is None:
+            missing.append((language, oid))
+        else:
+            results[language, oid] = result
+
+    try:
+        contents = read_blobs(oid for _, oid in missing)
+    except GitError as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 2
+
+    errors = {}
+    if missing:
+        tasks = [(language, oid, contents[oid], args.engine) for language, oid in missing]
+        jobs = 1 if len(tasks) <= SERIAL_MAX_FILES else min(args.jobs, len(tasks))
+        for language, oid, result, error in run_tasks(analyze_blob, tasks, jobs):
+            if error is None:
+                results[language, oid] = result
+                store.put(store.blob_key(language, oid, args.engine), result)
+            else:
+                errors[language, oid] = error
+
+    records = []
+    for change in sorted(changes, key=lambda change: change.path):
+        language = LANGUAGES[_extension(change.path)]
+        after = results.get((language, change.new_oid))
+        before = None
+        if change.old_oid and _extension(change.old_path) in LANGUAGES:
+            before = results.get((LANGUAGES[_extension(change.old_path)], change.old_oid))
+
+        record = {
+            'file': change.path,
+            'change': change.status,
+            'language': language,
+            'before': before['overall_score'] if before else None,
+            'after': after['overall_score'] if after else None,
+        }
+        if change.old_path != change.path and change.old_path:
+            record['old_file'] = change.old_path
+        record['delta'] = record['after'] - record['before'] if before and after else None
+        if after:
+            record.update(status='ok', result=after)
+        else:
+            record.update(status='error', error=errors.get((language, change.new_oid), 'Analysis failed'))
+        records.append(record)
+
+    deltas = [record['delta'] for record in records if record['delta'] is not None]
+    summary = {
+        'base': base,
+        'head': head,
+        'files': len(records),
+        'analyzed_blobs': len(missing),
+        'reused_blobs': len(blobs) - len(missing),
+        'errors': sum(1 for record in records if record['status'] == 'error'),
+        'average_delta': round(sum(deltas) / len(deltas), 1) if deltas else None,
+        'elapsed_seconds': round(time.perf_counter() - started, 3),
+    }
+
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        if args.format == 'jsonl':
+            for record in records:
+                output.write(json.dumps(record) + '\n')
+            output.write(json.dumps({'summary': summary}) + '\n')
+        else:
+            write_delta_table(output, records, summary)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 1 if summary['errors'] else 0
+
+def iter_source_files(paths, ignores):
+    """
+    Walk the given files and directories, yielding supported source files.
+
+    A path is skipped when any ignore glob matches its base name or its
+    full path. Ignored directories are pruned without being walked.
+
+    Args:
+        paths (list): Files or directories
+        ignores (list): Glob patterns to skip
+
+    Yields:
+        str: Paths of .js, .jsx and .py files
+    """
+    for root_path in paths:
+        if os.path.isfile(root_path):
+            if _extension(root_path) in LANGUAGES:
+                yield root_path
+            continue
+
+        for directory, subdirectories, files in os.walk(root_path):
+            subdirectories[:] = sorted(
+                name for name in subdirectories if not _ignored(os.path.join(directory, name), ignores)
+            )
+            for name in sorted(files):
+                path = os.path.join(directory, name)
+                if _extension(name) in LANGUAGES and not _ignored(path, ignores):
+                    yield path
+
+def run_tasks(function, tasks, jobs, chunksize=1):
+    """
+    Yield function(task) for every task, in completion order.
+
+    With more than one job the tasks run in a pool of worker processes;
+    otherwise they run in this process, which skips the pool start-up.
+    """
+    if jobs <= 1:
+        yield from map(function, tasks)
+        return
+
+    import multiprocessing
+    with multiprocessing.Pool(jobs) as pool:
+        yield from pool.imap_unordered(function, tasks, chunksize=chunksize)
+
+def analyze_file(task):
+    """
+    Analyze one file in a worker process.
+
+    Args:
+        task (tuple): (path, SHA-256 from the previous run or None,
+            whether to include duplicate-detection fingerprints, engine)
+
+    Returns:
+        dict: Result record; status 'unchanged' when the hash still matches
+    """
+    path, previous_hash, with_fingerprints, engine = task
+    language = LANGUAGES[_extension(path)]
+    record = {'file': path, 'language': language}
+    try:
+        with open(path, 'rb') as file:
+            content = file.read(MAX_FILE_BYTES + 1)
+        if len(content) > MAX_FILE_BYTES:
+            record.update(status='error', error=f'File is larger than {MAX_FILE_BYTES} bytes')
+            return record
+
+        record['bytes'] = len(content)
+        record['sha256'] = hashlib.sha256(content).hexdigest()
+        if with_fingerprints:
+            from .duplicates import fingerprint
+            record['fingerprints'] = fingerprint(content, language)
+        if record['sha256'] == previous_hash:
+            record['status'] = 'unchanged'
+            return record
+        record.update(status='ok', result=analyze_source(language, content, engine=engine))
+    except Exception as e:
+        record.update(status='error', error=str(e))
+    return record
+
+def analyze_blob(task):
+    """
+    Analyze one git blob in a worker process.
+
+    Args:
+        task (tuple): (language, blob id, content bytes, engine)
+
+    Returns:
+        tuple: (language, blob id, result or None, error message or None)
+    """
+    language, oid, content, engine = task
+    try:
+        if len(content) > MAX_FILE_BYTES:
+            return language, oid, None, f'File is larger than {MAX_FILE_BYTES} bytes'
+        return language, oid, analyze_source(language, content, engine=engine), None
+    except Exception as e:
+        return language, oid, None, str(e)
+
+def summarize(records, elapsed):
+    """Aggregate counts and the average score over all records."""
+    scores = [record['result']['overall_score'] for record in records if 'result' in record]
+    return {
+        'files': len(records),
+        'analyzed': sum(1 for record in records if record['status'] == 'ok'),
+        'unchanged': sum(1 for record in records if record['status'] == 'unchanged'),
+        'errors': sum(1 for record in records if record['status'] == 'error'),
+        'average_score': round(sum(scores) / len(scores), 1) if scores else None,
+        'files_with_cross_file_duplicates': sum(1 for record in records if record.get('cross_file_duplicates')),
+        'elapsed_seconds': round(elapsed, 3),
+    }
+
+def write_table(output, records, summary):
+    """Write a plain-text score table followed by the summary."""
+    output.write(f"{'SCORE':>5}  {'LANGUAGE':<10}  FILE\n")
+    for record in records:
+        score = record['result']['overall_score'] if 'result' in record else 'ERR'
+        output.write(f"{score:>5}  {record['language']:<10}  {record['file']}\n")
+        if record['status'] == 'error':
+            output.write(f"{'':>5}  {'':<10}  error: {record['error']}\n")
+        for clone in record.get('clones', []):
+            first, last = clone['lines']
+            output.write(f"{'':>5}  {'':<10}  lines {first}-{last} duplicated in {clone['file']}:{clone['other_line']}\n")
+
+    average = summary['average_score'] if summary['average_score'] is not None else '-'
+    output.write(
+        f"\n{summary['files']} files: {summary['analyzed']} analyzed, "
+        f"{summary['unchanged']} unchanged, {summary['errors']} errors; "
+        f"average score {average} ({summary['elapsed_seconds']}s)\n"
+    )
+
+def write_delta_table(output, records, summary):
+    """Write a before/after score table followed by the summary."""
+    output.write(f"{'BEFORE':>6}  {'AFTER':>5}  {'DELTA':>5}  FILE\n")
+    for record in records:
+        before = '-' if record['before'] is None else record['before']
+        after = 'ERR' if record['after'] is None else record['after']
+        delta = '' if record['delta'] is None else f"{record['delta']:+d}"
+        name = f"{record['old_file']} -> {record['file']}" if 'old_file' in record else record['file']
+        output.write(f"{before:>6}  {after:>5}  {delta:>5}  {name} ({record['change']})\n")
+        if record['status'] == 'error':
+            output.write(f"{'':>6}  {'':>5}  {'':>5}  error: {record['error']}\n")
+
+    average = '-' if summary['average_delta'] is None else f"{summary['average_delta']:+}"
+    output.write(
+        f"\n{summary['files']} changed files between {summary['base']} and {summary['head']}: "
+        f"{summary['analyzed_blobs']} blobs analyzed, {summary['reused_blobs']} reused, "
+        f"{summary['errors']} errors; average delta {average} ({summary['elapsed_seconds']}s)\n"
+    )
+
+def update_rollups(path, roots, records):
+    """
+    Apply the results of a scan to a rollup snapshot.
+
+    Only files whose result or size changed since the snapshot was written
+    update their directories; files under the scanned paths that were not
+    found again (or could not be analyzed) are dropped.
+    """
+    from .rollups import RollupTree
+
+    tree = RollupTree(path)
+    try:
+        tree.update(
+            (record['file'], record['result'], record['bytes']) for record in records if 'result' in record
+        )
+        tree.prune(roots, [record['file'] for record in records if 'result' in record])
+    finally:
+        tree.close()
+
+def load_manifest(path, engine):
+    """
+    Read the per-file hashes and results written by an earlier run.
+
+    Returns an empty manifest when the file is missing, unreadable or was
+    written by a different analyzer version or engine.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('analyzer_version') != ANALYZER_VERSION or manifest.get('engine') != engine:
+        return {}
+    return manifest.get('files', {})
+
+def save_manifest(path, records, engine):
+    """Atomically write the hashes and results of this run."""
+    files = {
+        record['file']: {'sha256': record['sha256'], 'result': record['result']}
+        for record in records
+        if 'result' in record
+    }
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump({'analyzer_version': ANALYZER_VERSION, 'engine': engine, 'files': files}, file)
+    os.replace(temp_path, path)
+
+def _ignored(path, ignores):
+    """Check whether any ignore glob matches the path or its base name."""
+    name = os.path.basename(path)
+    return any(fnmatch.fnmatch(name, glob) or fnmatch.fnmatch(path, glob) for glob in ignores)
+
+def _extension(path):
+    return os.path.splitext(path)[1].lower()
@@ -0,0 +1,136 @@
+import importlib
+import os
+
+from .source import decode_source
+
+# Standard-library-only entry point to the analyzers. Language backends are
+# imported the first time a file in their language is analyzed, so a hook
+# scoring one Python file never loads the JavaScript analyzer.
+
+# Supported source extensions and the analyzer language each one maps to
+LANGUAGES = {
+    '.js': 'javascript',
+    '.jsx': 'javascript',
+    '.py': 'python',
+}
+
+# Backend module of each engine and language, imported on first use. The
+# fast engine is the rewritten analyzer; the legacy engine is the original
+# regex-based one, kept to compare scores against (see app.shadow)
+ENGINES = {
+    'fast': {
+        'python': 'py_analyzer',
+        'javascript': 'js_analyzer',
+    },
+    'legacy': {
+        'python': 'legacy.py_analyzer',
+        'javascript': 'legacy.js_analyzer',
+    },
+}
+# Only the fast engine can select categories and rules, and analyze a file
+# in pieces or in constant memory. The legacy engine stays the default
+# until shadow mode (see app.shadow) has seen both score files the same.
+FAST_ENGINE = 'fast'
+DEFAULT_ENGINE = 'legacy'
+BACKENDS = ENGINES[DEFAULT_ENGINE]
+
+def language_for(filename):
+    """Return the analyzer language for a file name, or None if unsupported."""
+    return LANGUAGES.get(os.path.splitext(filename or '')[1].lower())
+
+def backend(language, engine=DEFAULT_ENGINE):
+    """
+    Import the analyzer module of a language.
+
+    Args:
+        language (str): 'python' or 'javascript'
+        engine (str): 'fast' or 'legacy'
+
+    Returns:
+        module: e.g. app.analyzers.py_analyzer or app.analyzers.legacy.js_analyzer
+
+    Raises:
+        ValueError: If the language or the engine is not supported
+    """
+    check_engine(engine)
+    if language not in BACKENDS:
+        raise ValueError(f"Unsupported language: {language}")
+    return importlib.import_module(f'.{ENGINES[engine][language]}', __package__)
+
+def check_engine(engine, categories=None, rules=None):
+    """
+    Check that an engine exists and can run the requested selection.
+
+    Raises:
+        ValueError: If the engine is unknown, or is the legacy engine and
+            categories or rules were selected; it only scores whole files
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine}. Choose one of: {', '.join(ENGINES)}")
+    if engine != FAST_ENGINE and (categories is not None or rules is not None):
+        raise ValueError(f"The {engine} engine cannot select categories or rules")
+
+def pick_engine(engine, categories=None, rules=None):
+    """
+    Pick the engine to run when none was given: the fast one for a
+    selection of categories or rules, the default one otherwise.
+    """
+    if engine is not None:
+        return engine
+    return FAST_ENGINE if categories is not None or rules is not None else DEFAULT_ENGINE
+
+def analyze_source(language, content, profile=False, categories=None, rules=None, engine=None):
+    """
+    Analyze source code with the backend of its language.
+
+    Args:
+        language (str): 'python' or 'javascript'
+        content (str | bytes): Source code
+        profile (bool): Add per-phase timings in milliseconds as "timings_ms"
+        categories (iterable): Categories to score, or None for all six
+        rules (iterable): Rule ids to run, or None for every rule
+        engine (str): 'fast', 'legacy' for the original analyzer, or None
+            to pick one (see pick_engine())
+
+    Returns:
+        dict: Analysis results with scores and recommendations
+
+    Raises:
+        ValueError: If the engine cannot run the selection (see check_engine())
+    """
+    engine = pick_engine(engine, categories, rules)
+    check_engine(engine, categories, rules)
+    analyze = getattr(backend(language, engine), f'analyze_{language}_source')
+    if engine != FAST_ENGINE:
+        return analyze(content, profile)
+    return analyze(content, profile, categories, rules)
+
+def analyze_stream(language, chunks, profile=False, categories=None, rules=None, engine=None):
+    """
+    Analyze source code that arrives in chunks, like analyze_source().
+
+    Raises:
+        ValueError: If the engine cannot run the selection (see check_engine())
+    """
+    engine = pick_engine(engine, categories, rules)
+    check_engine(engine, categories, rules)
+    analyze = getattr(backend(language, engine), f'analyze_{language}_stream')
+    if engine != FAST_ENGINE:
+        return analyze(chunks, profile)
+    return analyze(chunks, profile, categories, rules)
+
+def analyze_file(path, profile=False, categories=None, rules=None, engine=None):
+    """
+    Analyze a .js, .jsx or .py file, picking the backend by its extension.
+
+    The file is read as bytes and decoded with its line breaks normalized
+    (see decode_source()), so CRLF and LF copies of a file score the same.
+
+    Raises:
+        ValueError: If the extension is not supported
+    """
+    language = language_for(path)
+    if language is None:
+        raise ValueError(f"Unsupported file type: {path}")
+    with open(path, 'rb') as file:
+        return analyze_source(language, decode_source(file.read()), profile, categories, rules, engine)
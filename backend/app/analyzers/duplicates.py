@@ -0,0 +1,280 @@
+import hashlib
+import re
+from array import array
+from collections import deque
+
+# Consecutive normalized lines hashed together into one k-gram
+KGRAM_LINES = 5
+
+# Winnowing window, in k-grams. Any clone of at least
+# KGRAM_LINES + WINDOW - 1 normalized lines shares a fingerprint.
+WINDOW = 4
+
+# A fingerprint found in more places than this is boilerplate (license
+# headers, generated code, a block repeated in a loop): its postings are
+# dropped and it no longer matches, so one common fingerprint cannot make
+# a lookup quadratic in the number of copies
+MAX_POSTINGS = 64
+
+# Clone regions reported per pair of files
+MAX_REGIONS_PER_FILE = 8
+
+# Comment markers per analyzer language
+COMMENT_PREFIXES = {
+    'python': ('#',),
+    'javascript': ('//', '/*', '*'),
+}
+
+_BASE = 0x100000001b3
+_MASK64 = (1 << 64) - 1
+_BASE_POWER = pow(_BASE, KGRAM_LINES - 1, 1 << 64)
+_WORD = re.compile(r'\w')
+
+# Posting of a fingerprint found in more than MAX_POSTINGS places
+_COMMON = object()
+
+def fingerprint(content, language):
+    """
+    Select winnowing fingerprints for a source file.
+
+    Lines are normalized (blank, comment-only and punctuation-only lines
+    dropped, whitespace collapsed), hashed, and combined with a Rabin-Karp
+    rolling hash over KGRAM_LINES consecutive lines. Winnowing then keeps
+    the rightmost minimum hash of every WINDOW consecutive k-grams, so two
+    files share fingerprints exactly where they share long enough runs of
+    normalized lines, whatever the block boundaries around them.
+
+    Args:
+        content (str | bytes): Source code
+        language (str): Analyzer language, for comment syntax
+
+    Returns:
+        list: (fingerprint, first line, last line) tuples, lines 1-based
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', 'replace')
+    comment_prefixes = COMMENT_PREFIXES[language]
+
+    hashes = []
+    numbers = []
+    for number, line in enumerate(content.split('\n'), 1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith(comment_prefixes) or not _WORD.search(stripped):
+            continue
+        digest = hashlib.blake2b(' '.join(stripped.split()).encode('utf-8'), digest_size=8).digest()
+        hashes.append(int.from_bytes(digest, 'little'))
+        numbers.append(number)
+
+    # Rolling hash of every run of KGRAM_LINES normalized lines
+    kgrams = []
+    rolling = 0
+    for index, value in enumerate(hashes):
+        if index >= KGRAM_LINES:
+            rolling = (rolling - hashes[index - KGRAM_LINES] * _BASE_POWER) & _MASK64
+        rolling = (rolling * _BASE + value) & _MASK64
+        if index >= KGRAM_LINES - 1:
+            kgrams.append(rolling)
+
+    # Winnowing: a monotonic deque holds the candidates for the window minimum
+    selected = []
+    candidates = deque()
+    last = -1
+    for index, value in enumerate(kgrams):
+        while candidates and kgrams[candidates[-1]] >= value:
+            candidates.pop()
+        candidates.append(index)
+        if candidates[0] <= index - WINDOW:
+            candidates.popleft()
+        if (index >= WINDOW - 1 or index == len(kgrams) - 1) and candidates[0] != last:
+            last = candidates[0]
+            selected.append((kgrams[last], numbers[last], numbers[last + KGRAM_LINES - 1]))
+    return selected
+
+class DuplicateIndex:
+    """
+    Repository-wide fingerprint index for finding code cloned across files.
+
+    Files are added (or replaced) one at a time. Lookups are dictionary
+    probes per fingerprint, so they never scan the index. Memory is bounded
+    by max_fingerprints: when the index grows past it, only fingerprints
+    whose low hash bits are zero are kept, doubling the sampling rate each
+    time. The choice depends on the hash value alone, so both copies of a
+    clone keep the same fingerprints and long clones are still found.
+
+    A fingerprint posted in more than MAX_POSTINGS places is marked common
+    and stops matching; the mark is kept until the index is resampled.
+    """
+
+    def __init__(self, max_fingerprints=1_000_000):
+        self.max_fingerprints = max_fingerprints
+        self.sample_bits = 0
+        self.size = 0
+        self._postings = {}  # fingerprint -> packed posting, a set of them, or _COMMON
+        self._file_ids = {}  # path -> file id
+        self._paths = []  # file id -> path, None once removed
+        self._free_ids = []  # ids of removed files, reused by add()
+        self._files = {}  # file id -> (fingerprints, first lines, last lines)
+
+    def add(self, path, fingerprints):
+        """
+        Index a file's fingerprints, replacing any earlier version of it.
+
+        Args:
+            path (str): File path
+            fingerprints (list): Output of fingerprint()
+        """
+        self.remove(path)
+        if self._free_ids:
+            file_id = self._free_ids.pop()
+            self._paths[file_id] = path
+        else:
+            file_id = len(self._paths)
+            self._paths.append(path)
+        self._file_ids[path] = file_id
+
+        mask = (1 << self.sample_bits) - 1
+        kept = [entry for entry in fingerprints if not entry[0] & mask]
+        self._files[file_id] = (
+            array('Q', [entry[0] for entry in kept]),
+            array('I', [entry[1] for entry in kept]),
+            array('I', [entry[2] for entry in kept]),
+        )
+        for value, first_line, _ in kept:
+            self._post(value, file_id << 32 | first_line)
+        self.size += len(kept)
+
+        while self.size > self.max_fingerprints:
+            self._resample()
+
+    def remove(self, path):
+        """Drop a file from the index."""
+        file_id = self._file_ids.pop(path, None)
+        if file_id is None:
+            return
+        values, first_lines, _ = self._files.pop(file_id)
+        for value, first_line in zip(values, first_lines):
+            self._unpost(value, file_id << 32 | first_line)
+        self.size -= len(values)
+        self._paths[file_id] = None
+        self._free_ids.append(file_id)
+
+    def clones(self, path):
+        """
+        Find regions of a file that also appear in other indexed files.
+
+        Args:
+            path (str): Indexed file path
+
+        Returns:
+            list: Dicts with 'lines' ([first, last] in this file), 'file'
+                (the other path) and 'other_line' (where it starts there),
+                ordered by position in this file; at most MAX_REGIONS_PER_FILE
+                per other file
+        """
+        file_id = self._file_ids.get(path)
+        if file_id is None:
+            return []
+
+        matches = {}  # other file id -> [(first, last, other line)]
+        for value, first_line, last_line in zip(*self._files[file_id]):
+            posting = self._postings.get(value)
+            if posting is _COMMON:
+                continue
+            for packed in posting if isinstance(posting, set) else (posting,):
+                other_id = packed >> 32
+                if other_id != file_id:
+                    matches.setdefault(other_id, []).append((first_line, last_line, packed & 0xFFFFFFFF))
+
+        # Merge matches into one region per clone. Consecutive fingerprints
+        # of one clone are at most a window apart, further when sampled.
+        gap = WINDOW << self.sample_bits
+        regions = []
+        for other_id, found in matches.items():
+            found.sort()
+            other_regions = []
+            first, last, other_line = found[0]
+            for next_first, next_last, next_other_line in found[1:]:
+                if next_first <= last + gap:
+                    last = max(last, next_last)
+                    continue
+                other_regions.append({"lines": [first, last], "file": self._paths[other_id], "other_line": other_line})
+                if len(other_regions) == MAX_REGIONS_PER_FILE:
+                    break
+                first, last, other_line = next_first, next_last, next_other_line
+            else:
+                other_regions.append({"lines": [first, last], "file": self._paths[other_id], "other_line": other_line})
+            regions.extend(other_regions)
+        regions.sort(key=lambda region: (region["lines"][0], region["file"]))
+        return regions
+
+    def _post(self, value, packed):
+        posting = self._postings.get(value)
+        if posting is None:
+            self._postings[value] = packed
+        elif posting is _COMMON:
+            return
+        elif isinstance(posting, set):
+            posting.add(packed)
+            if len(posting) > MAX_POSTINGS:
+                self._postings[value] = _COMMON
+        else:
+            self._postings[value] = {posting, packed}
+
+    def _unpost(self, value, packed):
+        posting = self._postings.get(value)
+        if isinstance(posting, set):
+            posting.discard(packed)
+            if len(posting) == 1:
+                self._postings[value] = next(iter(posting))
+        elif posting == packed:
+            del self._postings[value]
+
+    def _resample(self):
+        """Halve the sampling rate and drop fingerprints no longer sampled."""
+        self.sample_bits += 1
+        mask = (1 << self.sample_bits) - 1
+        self._postings = {}
+        self.size = 0
+        for file_id, (values, first_lines, last_lines) in self._files.items():
+            kept = [entry for entry in zip(values, first_lines, last_lines) if not entry[0] & mask]
+            self._files[file_id] = (
+                array('Q', [entry[0] for entry in kept]),
+                array('I', [entry[1] for entry in kept]),
+                array('I', [entry[2] for entry in kept]),
+            )
+            for value, first_line, _ in kept:
+                self._post(value, file_id << 32 | first_line)
+            self.size += len(kept)
+
+def apply_cross_file_duplication(result, clones):
+    """
+    Fold cross-file clones into an analysis result's reusability score.
+
+    Args:
+        result (dict): Result of analyze_python/analyze_javascript
+        clones (list): Output of DuplicateIndex.clones()
+
+    Returns:
+        dict: A new result with the reusability and overall scores lowered
+    """
+    if not clones:
+        return result
+
+    breakdown = dict(result["breakdown"])
+    breakdown["reusability"] = max(0, breakdown["reusability"] - min(6, len(clones) * 2))
+
+    clone = clones[0]
+    first, last = clone["lines"]
+    recommendation = (
+        f"Move code duplicated across files into a shared module "
+        f"(lines {first}-{last} also appear in {clone['file']} at line {clone['other_line']})"
+    )
+    recommendations = list(result["recommendations"])
+    recommendations = recommendations[:4] + [recommendation] if len(recommendations) >= 5 else recommendations + [recommendation]
+
+    return {
+        **result,
+        "overall_score": sum(breakdown.values()),
+        "breakdown": breakdown,
+        "recommendations": recommendations,
+    }
@@ -0,0 +1,100 @@
+import subprocess
+from dataclasses import dataclass
+from typing import Optional
+
+# Object id git uses for "no file" in raw diff output
+NULL_OID = '0' * 40
+
+@dataclass
+class ChangedFile:
+    """One added, modified or renamed file between two refs."""
+
+    status: str
+    path: str
+    old_path: Optional[str]
+    old_oid: Optional[str]
+    new_oid: str
+
+class GitError(Exception):
+    """Raised when a git command fails."""
+
+def changed_files(base, head, pathspecs=()):
+    """
+    List files added, modified or renamed between two refs.
+
+    Uses ``git diff --raw``, which reports the blob ids on both sides, so no
+    file content is read to find out what changed. Deleted files are left
+    out since there is nothing to analyze.
+
+    Args:
+        base (str): Base ref
+        head (str): Head ref
+        pathspecs (tuple): Optional pathspecs to limit the diff
+
+    Returns:
+        list: ChangedFile entries, paths relative to the repository root
+    """
+    output = _git('diff', '--raw', '-z', '--no-abbrev', '-M', base, head, '--', *pathspecs)
+    fields = output.split(b'\0')
+    changes = []
+    index = 0
+    while index < len(fields) - 1:
+        # ":<old mode> <new mode> <old oid> <new oid> <status>", then one or two paths
+        _, _, old_oid, new_oid, status = fields[index].decode('ascii').split(' ')
+        kind = status[0]
+        if kind in 'RC':
+            old_path, path = fields[index + 1], fields[index + 2]
+            index += 3
+        else:
+            old_path = path = fields[index + 1]
+            index += 2
+
+        if kind == 'D':
+            continue
+        changes.append(ChangedFile(
+            status={'A': 'added', 'C': 'added', 'R': 'renamed'}.get(kind, 'modified'),
+            path=path.decode('utf-8', 'surrogateescape'),
+            old_path=None if kind in 'AC' else old_path.decode('utf-8', 'surrogateescape'),
+            old_oid=None if kind in 'AC' or old_oid == NULL_OID else old_oid,
+            new_oid=new_oid,
+        ))
+    return changes
+
+def read_blobs(oids):
+    """
+    Read blob contents through a single ``git cat-file --batch`` process.
+
+    Args:
+        oids (iterable): Blob ids
+
+    Returns:
+        dict: Blob id to content bytes
+    """
+    oids = list(dict.fromkeys(oids))
+    if not oids:
+        return {}
+    output = _git('cat-file', '--batch', input=''.join(f'{oid}\n' for oid in oids).encode('ascii'))
+
+    blobs = {}
+    position = 0
+    for oid in oids:
+        header_end = output.index(b'\n', position)
+        header = output[position:header_end].split(b' ')
+        if header[-1] == b'missing':
+            raise GitError(f'Blob {oid} is missing')
+        size = int(header[2])
+        start = header_end + 1
+        blobs[oid] = output[start:start + size]
+        position = start + size + 1
+    return blobs
+
+def _git(*args, input=None):
+    try:
+        completed = subprocess.run(
+            ['git', *args], input=input, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False
+        )
+    except OSError as e:
+        raise GitError(f'Could not run git: {e}')
+    if completed.returncode != 0:
+        raise GitError(completed.stderr.decode('utf-8', 'replace').strip())
+    return completed.stdout
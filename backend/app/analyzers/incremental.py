@@ -0,0 +1,198 @@
+import re
+from collections import OrderedDict
+
+from . import js_facts, py_facts
+from .js_analyzer import score_javascript
+from .line_stats import LineStats, line_record
+from .py_analyzer import score_python
+from .py_facts import parses_piece, parses_pieces
+from .rules import SYNTAX, fact_groups, required_inputs, select_rules
+from .source import decode_source
+from .timing import PhaseTimer
+
+# Full-line comment and block comment prefixes, as the analyzers use them
+COMMENT_PREFIXES = {
+    'python': (('#',), ()),
+    'javascript': (('//',), ('/*',)),
+}
+
+# Lines that may start a top-level statement, and so a new chunk. A chunk
+# only becomes a separate piece if the text before it parses on its own,
+# so a false start (e.g. inside a multi-line string) only costs a merge.
+CHUNK_START = {
+    'python': py_facts.STATEMENT_START,
+    'javascript': re.compile(r'(?:export|import|function|async|const|let|var|class)\b'),
+}
+
+# Facts modules and scoring functions per language
+LANGUAGE_FACTS = {
+    'python': (py_facts, score_python),
+    'javascript': (js_facts, score_javascript),
+}
+
+# Memoized pieces kept per document, relative to its number of chunks
+MEMO_ENTRIES_PER_CHUNK = 4
+MIN_MEMO_ENTRIES = 256
+
+class IncrementalDocument:
+    """
+    A source file kept in memory and re-analyzed as it is edited.
+
+    Line statistics are memoized per line, so after an edit only the
+    touched lines are reduced again. The rest is memoized per piece of the
+    text, which is split into chunks at lines that can start a top-level
+    statement:
+
+    - Python syntax is checked on pieces made of a chunk, or of a run of
+      chunks when a statement spans several, that parse on their own.
+    - The costliest fact groups (PIECEWISE_GROUPS of the facts modules) are
+      collected on pieces joined wherever one of their patterns may match
+      across a chunk boundary (see join_pieces()), and merged.
+
+    Each result is memoized by the piece's text, so only the touched pieces
+    are parsed and matched again. The other patterns are matched over the
+    whole text, as they may span any number of statements or the whole
+    file (function and component bodies, docstrings, imports of React).
+    """
+
+    def __init__(self, language, text=''):
+        if language not in COMMENT_PREFIXES:
+            raise ValueError(f"Unsupported language: {language}")
+        self.language = language
+        self.lines = decode_source(text).split('\n')
+        self._line_records = {}
+        self._pieces = OrderedDict()
+        self._piece_facts = OrderedDict()
+
+    @property
+    def text(self):
+        """The current document text."""
+        return '\n'.join(self.lines)
+
+    def replace(self, text):
+        """Replace the whole document."""
+        self.lines = decode_source(text).split('\n')
+
+    def apply_edit(self, start, end, text):
+        """
+        Replace a range of the document, like an editor change event.
+
+        Args:
+            start (tuple): (line, character) where the range starts, 0-based
+            end (tuple): (line, character) where the range ends, exclusive
+            text (str): Replacement text; its line breaks are normalized
+                (see decode_source())
+
+        Raises:
+            ValueError: If the range is reversed or outside the document
+        """
+        (start_line, start_character), (end_line, end_character) = start, end
+        lines = self.lines
+        if not 0 <= start_line <= end_line < len(lines):
+            raise ValueError(f"Edit lines {start_line}-{end_line} are outside the document ({len(lines)} lines)")
+        if not 0 <= start_character <= len(lines[start_line]) or not 0 <= end_character <= len(lines[end_line]):
+            raise ValueError("Edit characters are outside their lines")
+        if start_line == end_line and end_character < start_character:
+            raise ValueError("Edit range ends before it starts")
+
+        replacement = lines[start_line][:start_character] + decode_source(text) + lines[end_line][end_character:]
+        lines[start_line:end_line + 1] = replacement.split('\n')
+
+    def analyze(self, profile=False, categories=None, rules=None):
+        """
+        Analyze the current text.
+
+        The lines are copied first, so the analysis can run in a worker
+        thread while edits are applied on the event loop, as long as only
+        one analysis of the document runs at a time.
+
+        Args:
+            profile (bool): Add per-phase timings in milliseconds as "timings_ms"
+            categories (iterable): Categories to score, or None for all six
+            rules (iterable): Rule ids to run, or None for every rule
+
+        Returns:
+            dict: Analysis results, identical to analyze_*_source(text)
+        """
+        timer = PhaseTimer()
+        needs = required_inputs(select_rules(self.language, categories, rules))
+        lines = self.lines[:]
+
+        stats = self._line_stats(lines)
+        timer.lap("line_stats")
+
+        facts_module, score = LANGUAGE_FACTS[self.language]
+        groups = fact_groups(needs)
+        piecewise = groups & facts_module.PIECEWISE_GROUPS.keys()
+        # Only Python syntax is checked
+        syntax = SYNTAX in needs and self.language == 'python'
+        facts = facts_module.collect_facts('\n'.join(lines) if groups - piecewise else '', groups - piecewise)
+        chunks = self._chunks(lines) if piecewise or syntax else []
+        if piecewise:
+            self._merge_piece_facts(facts_module, chunks, piecewise, facts)
+        if groups:
+            timer.lap("facts")
+        if syntax:
+            facts.parsed = parses_pieces(chunks, self._piece)
+            timer.lap("parse")
+
+        # Forget the pieces that have not been used for a while
+        limit = max(MIN_MEMO_ENTRIES, MEMO_ENTRIES_PER_CHUNK * len(chunks))
+        for memo in (self._pieces, self._piece_facts):
+            while len(memo) > limit:
+                memo.popitem(last=False)
+
+        return score(facts, stats, timer if profile else None, categories, rules)
+
+    def _line_stats(self, lines):
+        comment_prefixes, block_comment_prefixes = COMMENT_PREFIXES[self.language]
+        known = self._line_records
+        current = {}
+        records = []
+        for line in lines:
+            record = known.get(line)
+            if record is None:
+                record = line_record(line, comment_prefixes, block_comment_prefixes)
+            current[line] = record
+            records.append(record)
+        self._line_records = current
+        return LineStats.from_records(records)
+
+    def _chunks(self, lines):
+        """Split the lines into chunks, each starting where a statement may start."""
+        start_pattern = CHUNK_START[self.language]
+        chunks = []
+        start = 0
+        for index in range(1, len(lines)):
+            if start_pattern.match(lines[index]):
+                chunks.append('\n'.join(lines[start:index]) + '\n')
+                start = index
+        chunks.append('\n'.join(lines[start:]))
+        return chunks
+
+    def _merge_piece_facts(self, facts_module, chunks, groups, facts):
+        """
+        Collect piecewise fact groups from each piece of the chunks, reusing
+        the memoized parts of pieces seen before, and merge them into facts.
+        """
+        memo = self._piece_facts
+        parts = []
+        for piece in facts_module.join_pieces(chunks):
+            part = memo.get(piece)
+            if part is None:
+                part = memo[piece] = {}
+            else:
+                memo.move_to_end(piece)
+            missing = [group for group in groups if group not in part]
+            if missing:
+                part.update(facts_module.collect_piece(piece, missing))
+            parts.append(part)
+        facts_module.merge_pieces(parts, groups, facts)
+
+    def _piece(self, text):
+        parsed = self._pieces.get(text)
+        if parsed is None:
+            parsed = self._pieces[text] = parses_piece(text)
+        else:
+            self._pieces.move_to_end(text)
+        return parsed
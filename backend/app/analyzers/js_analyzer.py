@@ -1,329 +1,337 @@
-import re
-import os
-import json
+from .js_facts import collect_facts
+from .line_stats import COMMENT, LineStats, StreamingLineStats
+from .rules import CATEGORY_POINTS, RULES, STATS, fact_groups, required_inputs, rule, run_category, run_rules, select_rules
+from .source import decode_source
+from .timing import PhaseTimer
+
+LANGUAGE = 'javascript'
+
+# Full-line comments, and block comments (whose lines are not code but
+# still count for indentation)
+COMMENT_PREFIXES = ('//',)
+BLOCK_COMMENT_PREFIXES = ('/*',)
 
 def analyze_javascript(file_path):
     """
     Analyze a JavaScript/React file for code quality.
-    
+
     Args:
         file_path (str): Path to the JavaScript file
-        
+
     Returns:
         dict: Analysis results with scores and recommendations
     """
     with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-    
-    # Initialize scores for each category
-    naming_score = 0
-    modularity_score = 0
-    comments_score = 0
-    formatting_score = 0
-    reusability_score = 0
-    best_practices_score = 0
-    
+        return analyze_javascript_source(file.read())
+
+def analyze_javascript_source(content, profile=False, categories=None, rules=None):
+    """
+    Analyze JavaScript/React source code for code quality.
+
+    Only the selected rules run, and only the passes they need (line
+    statistics, the fact groups they read) are computed.
+
+    Args:
+        content (str | bytes): Source code; bytes are decoded as UTF-8, and
+            line breaks are normalized (see decode_source())
+        profile (bool): Add per-phase timings in milliseconds as "timings_ms"
+        categories (iterable): Categories to score, or None for all six
+        rules (iterable): Rule ids to run, or None for every rule
+
+    Returns:
+        dict: Analysis results with scores and recommendations
+
+    Raises:
+        ValueError: If a category or rule id is unknown
+    """
+    timer = PhaseTimer()
+    content = decode_source(content)
+
+    selected = select_rules(LANGUAGE, categories, rules)
+    needs = required_inputs(selected)
+
+    # Compute per-line statistics once for all categories
+    stats = None
+    if STATS in needs:
+        stats = LineStats.from_content(content, COMMENT_PREFIXES, BLOCK_COMMENT_PREFIXES)
+        timer.lap("line_stats")
+
+    return _analyze(content, stats, selected, needs, timer, profile, categories is not None or rules is not None)
+
+def analyze_javascript_stream(chunks, profile=False, categories=None, rules=None):
+    """
+    Analyze JavaScript/React source code that arrives in chunks, such as a
+    large upload.
+
+    The line statistics are accumulated chunk by chunk. The full text is
+    only kept when a selected rule needs facts matched over it, so selecting
+    line-based rules only (indentation, line length, file length, duplicate
+    blocks) analyzes any file in constant memory.
+
+    Args:
+        chunks (iterable): Pieces of the source, as str or UTF-8 bytes
+        profile (bool): Add per-phase timings in milliseconds as "timings_ms"
+        categories (iterable): Categories to score, or None for all six
+        rules (iterable): Rule ids to run, or None for every rule
+
+    Returns:
+        dict: Analysis results, identical to analyze_javascript_source()
+
+    Raises:
+        ValueError: If a category or rule id is unknown
+    """
+    timer = PhaseTimer()
+    selected = select_rules(LANGUAGE, categories, rules)
+    needs = required_inputs(selected)
+
+    stats = StreamingLineStats(COMMENT_PREFIXES, BLOCK_COMMENT_PREFIXES)
+    parts = [] if fact_groups(needs) else None
+    for chunk in chunks:
+        text = stats.feed(chunk)
+        if parts is not None:
+            parts.append(text)
+    # A final "\r" is only known to be a line break once the chunks end
+    rest = stats.close()
+    if parts is not None:
+        parts.append(rest)
+    timer.lap("line_stats")
+
+    content = ''.join(parts) if parts is not None else ''
+    return _analyze(content, stats, selected, needs, timer, profile, categories is not None or rules is not None)
+
+def score_javascript(facts, stats, timer=None, categories=None, rules=None):
+    """
+    Score facts and line statistics collected elsewhere, e.g. incrementally.
+
+    Args:
+        facts (JavaScriptFacts): Facts for the whole source
+        stats (LineStats | StreamingLineStats): Line statistics for the whole source
+        timer (PhaseTimer): Add its laps as "timings_ms" when given
+        categories (iterable): Categories to score, or None for all six
+        rules (iterable): Rule ids to run, or None for every rule
+
+    Returns:
+        dict: Analysis results, as analyze_javascript_source() returns them
+    """
+    selected = select_rules(LANGUAGE, categories, rules)
+    return _score(facts, stats, selected, timer or PhaseTimer(), timer is not None,
+                  categories is not None or rules is not None)
+
+def _analyze(content, stats, selected, needs, timer, profile, filtered):
+    """Run the selected rules on content and its line statistics."""
+    # Match the patterns of the fact groups the rules read, once each over
+    # the whole text
+    facts = collect_facts(content, fact_groups(needs))
+    timer.lap("facts")
+    return _score(facts, stats, selected, timer, profile, filtered)
+
+def _score(facts, stats, selected, timer, profile, filtered):
+    """Run the selected rules on the facts and line statistics."""
     # Initialize recommendations
     recommendations = []
-    
-    # Split content into lines for analysis
-    lines = content.split('\n')
-    
-    # Analyze naming conventions (10 points)
-    naming_score, naming_recs = analyze_naming_conventions(content, lines)
-    recommendations.extend(naming_recs)
-    
-    # Analyze function length and modularity (20 points)
-    modularity_score, modularity_recs = analyze_modularity(content, lines)
-    recommendations.extend(modularity_recs)
-    
-    # Analyze comments and documentation (20 points)
-    comments_score, comments_recs = analyze_comments(content, lines)
-    recommendations.extend(comments_recs)
-    
-    # Analyze formatting/indentation (15 points)
-    formatting_score, formatting_recs = analyze_formatting(content, lines)
-    recommendations.extend(formatting_recs)
-    
-    # Analyze reusability and DRY (15 points)
-    reusability_score, reusability_recs = analyze_reusability(content, lines)
-    recommendations.extend(reusability_recs)
-    
-    # Analyze best practices in web dev (20 points)
-    best_practices_score, best_practices_recs = analyze_best_practices(content, lines)
-    recommendations.extend(best_practices_recs)
-    
-    # Calculate overall score (out of 100)
-    overall_score = (
-        naming_score + 
-        modularity_score + 
-        comments_score + 
-        formatting_score + 
-        reusability_score + 
-        best_practices_score
-    )
-    
+
+    # Score each category (naming 10, modularity 20, comments 20,
+    # formatting 15, reusability 15, best practices 20 points)
+    breakdown, category_recs = run_rules(selected, facts, stats, timer)
+    recommendations.extend(category_recs)
+
+    # Calculate overall score (out of 100 when every category runs)
+    overall_score = sum(breakdown.values())
+
     # Limit to top 5 recommendations
     recommendations = recommendations[:5]
-    
+
     # Prepare result in required JSON format
     result = {
         "overall_score": overall_score,
-        "breakdown": {
-            "naming": naming_score,
-            "modularity": modularity_score,
-            "comments": comments_score,
-            "formatting": formatting_score,
-            "reusability": reusability_score,
-            "best_practices": best_practices_score
-        },
+        "breakdown": breakdown,
         "recommendations": recommendations
     }
-    
+    if filtered:
+        result["max_score"] = sum(CATEGORY_POINTS[category] for category in breakdown)
+
+    if profile:
+        result["timings_ms"] = timer.as_dict()
     return result
 
-def analyze_naming_conventions(content, lines):
+def _category(category, facts, stats):
+    rules = [registered for registered in RULES[LANGUAGE].values() if registered.category == category]
+    return run_category(rules, CATEGORY_POINTS[category], facts, stats)
+
+def analyze_naming_conventions(facts, stats):
     """Analyze naming conventions in JavaScript code."""
-    score = 10  # Start with full score and deduct based on issues
-    recommendations = []
-    
-    # Check for camelCase variables (common in JS)
-    non_camel_case_vars = re.findall(r'(?:let|var|const)\s+([A-Z][a-zA-Z0-9_]*|[a-z][a-z0-9_]*_[a-z0-9_]*)\s*=', content)
-    
-    if non_camel_case_vars:
-        score -= min(5, len(non_camel_case_vars))
-        recommendations.append(f"Use camelCase for variable names (found: {', '.join(non_camel_case_vars[:3])})")
-    
-    # Check for PascalCase components (React convention)
-    component_declarations = re.findall(r'(?:function|const)\s+([a-z][a-zA-Z0-9_]*)\s*(?:=\s*\([^)]*\)\s*=>|\([^)]*\)\s*{)', content)
-    
-    if component_declarations and any("render" in line or "return <" in line or "React" in line for line in lines):
-        non_pascal_components = [name for name in component_declarations if name[0].islower()]
-        if non_pascal_components:
-            score -= min(3, len(non_pascal_components))
-            recommendations.append("Use PascalCase for React component names")
-    
-    # Check for ALL_CAPS constants
-    non_caps_constants = re.findall(r'const\s+([a-z][a-zA-Z0-9_]*)\s*=\s*[\'"]?[A-Z0-9_]+[\'"]?', content)
-    
-    if non_caps_constants:
-        score -= min(2, len(non_caps_constants))
-        recommendations.append("Consider using ALL_CAPS for constant values")
-    
-    return max(0, score), recommendations
-
-def analyze_modularity(content, lines):
+    return _category("naming", facts, stats)
+
+def analyze_modularity(facts, stats):
     """Analyze function length and modularity."""
-    score = 20  # Start with full score
-    recommendations = []
-    
-    # Find all function declarations
-    function_blocks = re.findall(r'(function\s+\w+\s*\([^)]*\)\s*{[^}]*}|const\s+\w+\s*=\s*(?:\([^)]*\)|function\s*)\s*=>\s*{[^}]*}|const\s+\w+\s*=\s*function\s*\([^)]*\)\s*{[^}]*})', content, re.DOTALL)
-    
-    # Check function length
-    long_functions = []
-    for func in function_blocks:
-        func_lines = func.count('\n') + 1
-        if func_lines > 30:
-            long_functions.append(func_lines)
-    
-    if long_functions:
-        deduction = min(10, len(long_functions) * 3)
-        score -= deduction
-        recommendations.append(f"Break down functions that are too long (found {len(long_functions)} functions over 30 lines)")
-    
-    # Check for deeply nested conditions/loops
-    nested_pattern = r'if\s*\([^)]*\)\s*{(?:[^{}]|{[^{}]*})*{(?:[^{}]|{[^{}]*})*{[^}]*}'
-    deep_nesting = re.findall(nested_pattern, content)
-    
-    if deep_nesting:
-        deduction = min(5, len(deep_nesting) * 2)
-        score -= deduction
-        recommendations.append("Reduce nesting depth in conditions and loops")
-    
-    # Check for large file size
-    if len(lines) > 300:
-        score -= 5
-        recommendations.append("Consider splitting this large file into multiple modules")
-    
-    return max(0, score), recommendations
-
-def analyze_comments(content, lines):
+    return _category("modularity", facts, stats)
+
+def analyze_comments(facts, stats):
     """Analyze comments and documentation."""
-    score = 20  # Start with full score
-    recommendations = []
-    
-    # Count comments
-    single_line_comments = len(re.findall(r'^\s*//.*$', content, re.MULTILINE))
-    multi_line_comments = len(re.findall(r'/\*[\s\S]*?\*/', content))
-    jsdoc_comments = len(re.findall(r'/\*\*[\s\S]*?\*/', content))
-    
-    total_comments = single_line_comments + multi_line_comments
-    code_to_comment_ratio = len(lines) / max(1, total_comments)
-    
-    # Check if functions have JSDoc comments
-    function_count = len(re.findall(r'function\s+\w+|const\s+\w+\s*=\s*(?:function|\([^)]*\)\s*=>)', content))
-    
-    if function_count > jsdoc_comments:
-        score -= min(10, (function_count - jsdoc_comments) * 2)
-        recommendations.append("Add JSDoc comments to document functions and their parameters")
-    
-    # Check code-to-comment ratio
-    if code_to_comment_ratio > 15:
-        score -= 5
-        recommendations.append("Add more comments to explain complex logic (current ratio: 1 comment per ~{:.1f} lines)".format(code_to_comment_ratio))
-    
-    # Check for commented-out code
-    commented_code = re.findall(r'^\s*//\s*(const|let|var|function|if|for|while)', content, re.MULTILINE)
-    if commented_code:
-        score -= min(5, len(commented_code))
-        recommendations.append("Remove commented-out code that is no longer needed")
-    
-    return max(0, score), recommendations
-
-def analyze_formatting(content, lines):
+    return _category("comments", facts, stats)
+
+def analyze_formatting(facts, stats):
     """Analyze code formatting and indentation."""
-    score = 15  # Start with full score
-    recommendations = []
-    
-    # Check consistent indentation
-    indent_levels = []
-    for line in lines:
-        if line.strip() and not line.strip().startswith('//'):
-            indent = len(line) - len(line.lstrip())
-            if indent > 0:
-                indent_levels.append(indent)
-    
-    if indent_levels:
-        # Check if indentation is consistently divisible by 2 or 4
-        indent_divisible_by_2 = all(level % 2 == 0 for level in indent_levels)
-        indent_divisible_by_4 = all(level % 4 == 0 for level in indent_levels)
-        
-        if not (indent_divisible_by_2 or indent_divisible_by_4):
-            score -= 5
-            recommendations.append("Use consistent indentation (2 or 4 spaces)")
-    
-    # Check for consistent semicolon usage
-    lines_with_semicolon = len(re.findall(r';\s*$', content, re.MULTILINE))
-    lines_without_semicolon = len(re.findall(r'(const|let|var|return|await).*[^;]\s*$', content, re.MULTILINE))
-    
+    return _category("formatting", facts, stats)
+
+def analyze_reusability(facts, stats):
+    """Analyze code reusability and DRY principles."""
+    return _category("reusability", facts, stats)
+
+def analyze_best_practices(facts, stats):
+    """Analyze adherence to web development best practices."""
+    return _category("best_practices", facts, stats)
+
+# Naming conventions (10 points)
+
+@rule(LANGUAGE, "naming", "camel_case", points=5, needs=["variable_names"])
+def check_camel_case(facts, stats):
+    """Variables use camelCase."""
+    if facts.non_camel_case_vars:
+        return len(facts.non_camel_case_vars), f"Use camelCase for variable names (found: {', '.join(facts.non_camel_case_vars[:3])})"
+
+@rule(LANGUAGE, "naming", "pascal_case_components", points=3, needs=["components"])
+def check_pascal_case_components(facts, stats):
+    """Functions in files that render React components are PascalCase."""
+    if facts.lowercase_components and facts.mentions_rendering:
+        return facts.lowercase_components, "Use PascalCase for React component names"
+
+@rule(LANGUAGE, "naming", "upper_case_constants", points=2, needs=["constants"])
+def check_upper_case_constants(facts, stats):
+    """Constant values use ALL_CAPS."""
+    if facts.non_caps_constants:
+        return facts.non_caps_constants, "Consider using ALL_CAPS for constant values"
+
+# Function length and modularity (20 points)
+
+@rule(LANGUAGE, "modularity", "function_length", points=10, needs=["function_blocks"])
+def check_function_length(facts, stats):
+    """Functions are at most 30 lines long."""
+    long_functions = [length for length in facts.function_lengths if length > 30]
+    if long_functions:
+        return len(long_functions) * 3, f"Break down functions that are too long (found {len(long_functions)} functions over 30 lines)"
+
+@rule(LANGUAGE, "modularity", "nesting_depth", points=5, needs=["deep_nesting"])
+def check_nesting_depth(facts, stats):
+    """No if block holds blocks nested 2 more levels deep."""
+    if facts.deep_nesting:
+        return facts.deep_nesting * 2, "Reduce nesting depth in conditions and loops"
+
+@rule(LANGUAGE, "modularity", "file_length", points=5, needs=[STATS])
+def check_file_length(facts, stats):
+    """Files are at most 300 lines long."""
+    if stats.line_count > 300:
+        return 5, "Consider splitting this large file into multiple modules"
+
+# Comments and documentation (20 points)
+
+@rule(LANGUAGE, "comments", "jsdoc", points=10, needs=["functions", "jsdoc"])
+def check_jsdoc(facts, stats):
+    """Every function has a JSDoc comment."""
+    if facts.function_count > facts.jsdoc_comments:
+        return (facts.function_count - facts.jsdoc_comments) * 2, "Add JSDoc comments to document functions and their parameters"
+
+@rule(LANGUAGE, "comments", "comment_ratio", points=5, needs=["block_comments", STATS])
+def check_comment_ratio(facts, stats):
+    """There is at least one comment per 15 lines."""
+    total_comments = stats.count(COMMENT) + facts.block_comments
+    code_to_comment_ratio = stats.line_count / max(1, total_comments)
+    if code_to_comment_ratio > 15:
+        return 5, "Add more comments to explain complex logic (current ratio: 1 comment per ~{:.1f} lines)".format(code_to_comment_ratio)
+
+@rule(LANGUAGE, "comments", "commented_out_code", points=5, needs=["commented_code"])
+def check_commented_out_code(facts, stats):
+    """No commented-out code is left behind."""
+    if facts.commented_code:
+        return facts.commented_code, "Remove commented-out code that is no longer needed"
+
+# Formatting and indentation (15 points)
+
+@rule(LANGUAGE, "formatting", "indentation", points=5, needs=[STATS])
+def check_indentation(facts, stats):
+    """Indentation is a multiple of 2 spaces (which covers 4)."""
+    if not stats.indents_multiple_of(2):
+        return 5, "Use consistent indentation (2 or 4 spaces)"
+
+@rule(LANGUAGE, "formatting", "semicolons", points=5, needs=["semicolons"])
+def check_semicolons(facts, stats):
+    """At least 80% of statement lines agree on using semicolons."""
+    lines_with_semicolon = facts.semicolon_lines
+    lines_without_semicolon = facts.missing_semicolon_lines
+
     semicolon_consistency = max(lines_with_semicolon, lines_without_semicolon) / max(1, lines_with_semicolon + lines_without_semicolon)
-    
+
     if semicolon_consistency < 0.8:  # Less than 80% consistent
-        score -= 5
-        recommendations.append("Be consistent with semicolon usage")
-    
-    # Check for long lines
-    long_lines = [i for i, line in enumerate(lines, 1) if len(line) > 100]
-    if long_lines:
-        score -= min(5, len(long_lines))
-        recommendations.append(f"Break down long lines that exceed 100 characters (found on lines: {', '.join(str(x) for x in long_lines[:3])})")
-    
-    return max(0, score), recommendations
-
-def analyze_reusability(content, lines):
-    """Analyze code reusability and DRY principles."""
-    score = 15  # Start with full score
-    recommendations = []
-    
-    # Check for repeated code blocks
-    code_blocks = []
-    current_block = []
-    for line in lines:
-        stripped = line.strip()
-        if stripped and not stripped.startswith('//') and not stripped.startswith('/*'):
-            current_block.append(stripped)
-        elif current_block:
-            if len(current_block) >= 3:  # Only consider blocks of 3+ lines
-                code_blocks.append('\n'.join(current_block))
-            current_block = []
-    
-    # Add the last block if there is one
-    if current_block and len(current_block) >= 3:
-        code_blocks.append('\n'.join(current_block))
-    
-    # Check for duplicated blocks
-    seen_blocks = set()
-    duplicated_blocks = []
-    
-    for block in code_blocks:
-        if block in seen_blocks and len(block.split('\n')) >= 3:
-            duplicated_blocks.append(block)
-        seen_blocks.add(block)
-    
+        return 5, "Be consistent with semicolon usage"
+
+@rule(LANGUAGE, "formatting", "line_length", points=5, needs=[STATS])
+def check_line_length(facts, stats):
+    """Lines are at most 100 characters long."""
+    long_line_count, long_lines = stats.long_lines(100)
+    if long_line_count:
+        return long_line_count, f"Break down long lines that exceed 100 characters (found on lines: {', '.join(str(x) for x in long_lines)})"
+
+# Reusability and DRY (15 points)
+
+@rule(LANGUAGE, "reusability", "duplicate_blocks", points=7, needs=[STATS])
+def check_duplicate_blocks(facts, stats):
+    """No block of 3+ lines is repeated."""
+    duplicated_blocks = stats.duplicate_blocks(min_lines=3)
     if duplicated_blocks:
-        score -= min(7, len(duplicated_blocks) * 2)
-        recommendations.append("Extract repeated code blocks into reusable functions")
-    
-    # Check for hardcoded values that should be constants
-    hardcoded_values = re.findall(r'["\']\w+["\']\s*:|=\s*["\'][^"\']+["\']', content)
-    if len(hardcoded_values) > 5:
-        score -= min(4, (len(hardcoded_values) - 5) // 2)
-        recommendations.append("Extract hardcoded strings/values into named constants")
-    
-    # Check for helper/utility functions
-    if len(lines) > 100 and len(re.findall(r'function\s+\w+|const\s+\w+\s*=\s*function', content)) < 3:
-        score -= 4
-        recommendations.append("Create utility functions for common operations")
-    
-    return max(0, score), recommendations
-
-def analyze_best_practices(content, lines):
-    """Analyze adherence to web development best practices."""
-    score = 20  # Start with full score
-    recommendations = []
-    
-    # Check for React-specific best practices if it seems to be a React file
-    is_react = 'import React' in content or 'from "react"' in content or 'from \'react\'' in content
-    
-    if is_react:
-        # Check for useEffect dependencies
-        effects_without_deps = re.findall(r'useEffect\(\s*\(\)\s*=>\s*{[^}]*}\s*\)', content)
-        if effects_without_deps:
-            score -= min(5, len(effects_without_deps))
-            recommendations.append("Specify dependency arrays in useEffect hooks")
-        
-        # Check for large components
-        component_sizes = []
-        for component in re.findall(r'(?:function|const)\s+([A-Z]\w*)[^{]*{[^}]*return\s*\([\s\S]*?\);', content, re.DOTALL):
-            component_code = re.search(rf'{component}[^{{]*{{[\s\S]*?return\s*\([\s\S]*?\);', content, re.DOTALL)
-            if component_code:
-                size = component_code.group(0).count('\n')
-                component_sizes.append((component, size))
-        
-        large_components = [(name, size) for name, size in component_sizes if size > 100]
-        if large_components:
-            score -= min(5, len(large_components))
-            recommendations.append(f"Break down large React components ({', '.join(name for name, _ in large_components[:2])}) into smaller ones")
-    
-    # Check for console.log statements
-    console_logs = re.findall(r'console\.log\(', content)
-    if console_logs:
-        score -= min(3, len(console_logs))
-        recommendations.append("Remove console.log statements before production")
-    
-    # Check for error handling
-    try_catch_blocks = re.findall(r'try\s*{', content)
-    promise_calls = re.findall(r'\.then\(', content)
-    async_funcs = re.findall(r'async\s+\w+|async\s*\(', content)
-    
-    if (promise_calls or async_funcs) and not try_catch_blocks:
-        score -= 4
-        recommendations.append("Add error handling for asynchronous operations")
-    
-    # Check for undefined/null checks
-    if re.search(r'\.\w+\s*\.\w+', content) and not re.search(r'[?!]\.\w+', content):
-        score -= 3
-        recommendations.append("Add null/undefined checks for nested object properties")
-    
-    # Check for accessibility in React components
-    if is_react and ('<img' in content or '<button' in content):
-        if '<img' in content and not 'alt=' in content:
-            score -= 3
-            recommendations.append("Add alt attributes to img elements for accessibility")
-        
-        if '<button' in content and not 'aria-' in content:
-            score -= 2
-            recommendations.append("Add ARIA attributes for better accessibility")
-    
-    return max(0, score), recommendations 
\ No newline at end of file
+        return duplicated_blocks * 2, "Extract repeated code blocks into reusable functions"
+
+@rule(LANGUAGE, "reusability", "hardcoded_strings", points=4, needs=["hardcoded_strings"])
+def check_hardcoded_strings(facts, stats):
+    """At most 5 hardcoded strings appear outside named constants."""
+    if facts.hardcoded_strings > 5:
+        return (facts.hardcoded_strings - 5) // 2, "Extract hardcoded strings/values into named constants"
+
+@rule(LANGUAGE, "reusability", "utility_functions", points=4, needs=["utility_functions", STATS])
+def check_utility_functions(facts, stats):
+    """Files over 100 lines define at least 3 functions."""
+    if stats.line_count > 100 and facts.utility_function_count < 3:
+        return 4, "Create utility functions for common operations"
+
+# Web development best practices (20 points)
+
+@rule(LANGUAGE, "best_practices", "effect_dependencies", points=5, needs=["react", "effects"])
+def check_effect_dependencies(facts, stats):
+    """React useEffect hooks declare a dependency array."""
+    if facts.is_react and facts.effects_without_deps:
+        return facts.effects_without_deps, "Specify dependency arrays in useEffect hooks"
+
+@rule(LANGUAGE, "best_practices", "component_size", points=5, needs=["react", "large_components"])
+def check_component_size(facts, stats):
+    """React components are at most 100 lines long."""
+    if facts.is_react and facts.large_components:
+        return len(facts.large_components), f"Break down large React components ({', '.join(facts.large_components[:2])}) into smaller ones"
+
+@rule(LANGUAGE, "best_practices", "console_log", points=3, needs=["console_logs"])
+def check_console_log(facts, stats):
+    """No console.log statements are left in."""
+    if facts.console_logs:
+        return facts.console_logs, "Remove console.log statements before production"
+
+@rule(LANGUAGE, "best_practices", "async_error_handling", points=4, needs=["async"])
+def check_async_error_handling(facts, stats):
+    """Files with promises or async functions use try blocks."""
+    if (facts.promise_chains or facts.async_functions) and not facts.try_blocks:
+        return 4, "Add error handling for asynchronous operations"
+
+@rule(LANGUAGE, "best_practices", "null_checks", points=3, needs=["member_access"])
+def check_null_checks(facts, stats):
+    """Nested property access is guarded with optional chaining."""
+    if facts.nested_member_access and not facts.optional_chaining:
+        return 3, "Add null/undefined checks for nested object properties"
+
+@rule(LANGUAGE, "best_practices", "image_alt", points=3, needs=["react", "markup"])
+def check_image_alt(facts, stats):
+    """React img elements have alt attributes."""
+    if facts.is_react and facts.has_images and not facts.has_alt_attributes:
+        return 3, "Add alt attributes to img elements for accessibility"
+
+@rule(LANGUAGE, "best_practices", "aria_attributes", points=2, needs=["react", "markup"])
+def check_aria_attributes(facts, stats):
+    """React files with buttons use ARIA attributes."""
+    if facts.is_react and facts.has_buttons and not facts.has_aria_attributes:
+        return 2, "Add ARIA attributes for better accessibility"
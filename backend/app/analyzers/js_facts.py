@@ -0,0 +1,697 @@
+import re
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from .scanning import CharFinder, cut_summary as summarize_cut, join_pieces as join_chunks, piece_starts as find_piece_starts
+
+# The facts are the matches of the original analyzer's patterns (see
+# legacy/js_analyzer.py), counted exactly as it counts them, so both
+# engines score every file the same. Most patterns run once as they are;
+# the few whose backtracking grows with the square of the input (deep
+# nesting, component sizes, unclosed block comments, statement lines
+# without a semicolon, the "[^)]*\)" and "{[^}]*}" parts that every match
+# attempt would scan up to the same ")" or "}") are rewritten so that they
+# never retry the same text, or are replaced by equivalent scans below.
+
+# Variables, as matched by r'(?:let|var|const)\s+([A-Z][a-zA-Z0-9_]*|
+# [a-z][a-z0-9_]*_[a-z0-9_]*)\s*='. Its second branch would try each "_" of
+# a long name in turn and scan the rest of the name from each; wherever it
+# matches, its name runs to the end of the "[a-z0-9_]" characters, so the
+# lookahead only checks for one "_" before the name is taken whole.
+NON_CAMEL_CASE_VARS = re.compile(r'(?:let|var|const)\s+([A-Z][a-zA-Z0-9_]*|[a-z](?=[a-z0-9_]*_)[a-z0-9_]*)\s*=')
+LOWERCASE_COMPONENTS = re.compile(r'(?:function|const)\s+([a-z][a-zA-Z0-9_]*)\s*(?:=\s*\([^)]*\)\s*=>|\([^)]*\)\s*{)')
+NON_CAPS_CONSTANTS = re.compile(r'const\s+([a-z][a-zA-Z0-9_]*)\s*=\s*[\'"]?[A-Z0-9_]+[\'"]?')
+
+FUNCTION_BLOCKS = re.compile(
+    r'(function\s+\w+\s*\([^)]*\)\s*{[^}]*}'
+    r'|const\s+\w+\s*=\s*(?:\([^)]*\)|function\s*)\s*=>\s*{[^}]*}'
+    r'|const\s+\w+\s*=\s*function\s*\([^)]*\)\s*{[^}]*})',
+    re.DOTALL,
+)
+FUNCTIONS = re.compile(r'function\s+\w+|const\s+\w+\s*=\s*(?:function|\([^)]*\)\s*=>)')
+
+# How far the patterns below look for the ")" or "}" that ends one of
+# their "[^)]*\)" or "{[^}]*}" parts
+CLOSER_REACH = 256
+
+def _near(closer, rest=''):
+    """
+    r'[^)]*\\)' + rest (or the same with "}"), where the ")" is at most
+    CLOSER_REACH characters ahead; where it is farther, an empty group
+    ends the match instead, for _find_all() to finish it.
+    """
+    others = f'[^{closer}]'
+    return rf'(?:{others}{{0,{CLOSER_REACH}}}\{closer}{rest}|(?={others}{{{CLOSER_REACH + 1}}})())'
+
+# LOWERCASE_COMPONENTS, FUNCTION_BLOCKS, FUNCTIONS and EFFECTS_WITHOUT_DEPS
+# with their "[^)]*\)" and "{[^}]*}" parts as _near() ones, and no other
+# group (none may enclose a whole branch either: the search then tries
+# every position instead of only those where "function" or "const"
+# starts). Each match attempt scans a bounded stretch of text; branches
+# that only differ after a part are split there, and the "const" ones of
+# FUNCTION_BLOCKS share their start.
+NEAR_LOWERCASE_COMPONENTS = re.compile(
+    r'(?:function|const)\s+[a-z][a-zA-Z0-9_]*\s*(?:=\s*\(' + _near(')', r'\s*=>') + r'|\(' + _near(')', r'\s*{') + ')'
+)
+NEAR_FUNCTION_BLOCKS = re.compile(
+    r'function\s+\w+\s*\(' + _near(')', r'\s*{' + _near('}'))
+    + r'|const\s+\w+\s*=\s*(?:\(' + _near(')', r'\s*=>\s*{' + _near('}'))
+    + r'|function\s*(?:=>\s*{' + _near('}') + r'|\(' + _near(')', r'\s*{' + _near('}')) + '))'
+)
+NEAR_FUNCTIONS = re.compile(r'function\s+\w+|const\s+\w+\s*=\s*(?:function|\(' + _near(')', r'\s*=>') + ')')
+NEAR_EFFECTS_WITHOUT_DEPS = re.compile(r'useEffect\(\s*\(\)\s*=>\s*{' + _near('}', r'\s*\)'))
+
+# The same patterns up to their first "[^)]*\)" or "{[^}]*}", with a group
+# per branch; the rest is matched from the ")" or "}" (see _Closers), once
+# for all the attempts that reach the same one
+LOWERCASE_COMPONENT_HEADERS = re.compile(r'(?:function|const)\s+[a-z][a-zA-Z0-9_]*\s*(=\s*)?\(')
+FUNCTION_BLOCK_HEADERS = re.compile(
+    r'function\s+\w+\s*(?P<function>\()|const\s+\w+\s*=\s*(?:(?P<arrow>\()|(?P<expression>function))'
+)
+FUNCTION_HEADERS = re.compile(r'function\s+\w+|const\s+\w+\s*=\s*(?:function|(\())')
+EFFECT_HEADERS = re.compile(r'useEffect\(\s*\(\)\s*=>\s*{')
+ARROW = re.compile(r'\s*=>')
+ARROW_BODY = re.compile(r'\s*=>\s*{')
+BODY = re.compile(r'\s*{')
+PARAMETERS = re.compile(r'\s*\(')
+CALL_END = re.compile(r'\s*\)')
+UTILITY_FUNCTIONS = re.compile(r'function\s+\w+|const\s+\w+\s*=\s*function')
+
+# Commented-out code, as matched by
+# r'^\s*//\s*(const|let|var|function|if|for|while)' (re.MULTILINE): from
+# the "//", which only whitespace may precede on its line. The "//" are
+# searched for (see _count_commented_code()) instead of trying the pattern
+# at each line, after the indentation, and at every line of a run of blank
+# lines, scanning the run each time.
+COMMENTED_CODE = re.compile(r'//\s*(?:const|let|var|function|if|for|while)')
+
+SEMICOLON_LINES = re.compile(r';\s*$', re.MULTILINE)
+
+# Statement lines without a semicolon, as matched by
+# r'(const|let|var|return|await).*[^;]\s*$'. Where that fails after a line's
+# first keyword it fails after the later ones too, so the second branch
+# takes the rest of the line instead of retrying from each of them; only
+# the matches of the first branch are counted.
+MISSING_SEMICOLON_LINES = re.compile(r'(?:const|let|var|return|await)(?:(.*[^;]\s*$)|.*)', re.MULTILINE)
+
+HARDCODED_STRINGS = re.compile(r'["\']\w+["\']\s*:|=\s*["\'][^"\']+["\']')
+
+EFFECTS_WITHOUT_DEPS = re.compile(r'useEffect\(\s*\(\)\s*=>\s*{[^}]*}\s*\)')
+CONSOLE_LOGS = re.compile(r'console\.log\(')
+TRY_BLOCKS = re.compile(r'try\s*{')
+PROMISE_CHAINS = re.compile(r'\.then\(')
+ASYNC_FUNCTIONS = re.compile(r'async\s+\w+|async\s*\(')
+NESTED_MEMBER_ACCESS = re.compile(r'\.\w+\s*\.\w+')
+OPTIONAL_CHAINING = re.compile(r'[?!]\.\w+')
+
+# Three levels of nested braces after an "if (...) {", as matched by
+# r'if\s*\([^)]*\)\s*{(?:[^{}]|{[^{}]*})*{(?:[^{}]|{[^{}]*})*{[^}]*}'. Each
+# "(?=(...))\1" takes its run of text and "{...}" pairs for good, so a
+# failed match does not backtrack through the runs; when the second run
+# is not followed by "{...}", the match ends at the last pair it skipped.
+DEEP_NESTING = re.compile(
+    r'if\s*\([^)]*\)\s*{(?=((?:[^{}]|{[^{}]*})*))\1{'
+    r'(?:(?=((?:[^{}]|{[^{}]*})*))\2{[^}]*}|(?:[^{}]*{[^{}]*})+)'
+)
+# An "if (" inside another one's parentheses: the headers then share their
+# ")" and each would scan to it again
+NESTED_IF_HEADERS = re.compile(r'if\s*\([^)]*if\s*\(')
+
+# React components: a PascalCase function or const with a "return (...);"
+COMPONENT_DECLARATIONS = re.compile(r'(?:function|const)\s+([A-Z]\w*)')
+RETURN_PARENS = re.compile(r'return\s*\(')
+
+WHITESPACE = re.compile(r'\s*')
+
+@dataclass
+class JavaScriptFacts:
+    """Everything the JavaScript category checks need, collected group by group (see FACT_GROUPS)."""
+
+    # Naming
+    non_camel_case_vars: list = field(default_factory=list)
+    lowercase_components: int = 0
+    mentions_rendering: bool = False
+    non_caps_constants: int = 0
+
+    # Structure
+    function_lengths: list = field(default_factory=list)
+    function_count: int = 0
+    utility_function_count: int = 0
+    deep_nesting: int = 0
+
+    # Comments
+    block_comments: int = 0
+    jsdoc_comments: int = 0
+    commented_code: int = 0
+
+    # Literals and formatting
+    hardcoded_strings: int = 0
+    semicolon_lines: int = 0
+    missing_semicolon_lines: int = 0
+
+    # Best practices
+    is_react: bool = False
+    effects_without_deps: int = 0
+    large_components: list = field(default_factory=list)
+    console_logs: int = 0
+    try_blocks: int = 0
+    promise_chains: int = 0
+    async_functions: int = 0
+    nested_member_access: bool = False
+    optional_chaining: bool = False
+    has_images: bool = False
+    has_alt_attributes: bool = False
+    has_buttons: bool = False
+    has_aria_attributes: bool = False
+
+def collect_facts(content, groups=None):
+    """
+    Collect the facts used by the JavaScript category checks.
+
+    Args:
+        content (str): Source code
+        groups (iterable): Names of the fact groups to collect (keys of
+            FACT_GROUPS), or None for all of them; the facts of the other
+            groups keep their defaults
+
+    Returns:
+        JavaScriptFacts: Collected facts
+
+    Raises:
+        KeyError: If a group is unknown
+    """
+    facts = JavaScriptFacts()
+    for group in FACT_GROUPS if groups is None else groups:
+        FACT_GROUPS[group](content, facts)
+    return facts
+
+def _count(pattern, content):
+    return sum(1 for _ in pattern.finditer(content))
+
+def _collect_variable_names(content, facts):
+    facts.non_camel_case_vars = NON_CAMEL_CASE_VARS.findall(content)
+
+def _collect_components(content, facts):
+    facts.lowercase_components = len(_lowercase_component_spans(content))
+    # Only looked for once there are lowercase components to report, and
+    # in React files mostly found at once
+    facts.mentions_rendering = facts.lowercase_components > 0 and (
+        'React' in content or 'render' in content or 'return <' in content
+    )
+
+def _collect_constants(content, facts):
+    facts.non_caps_constants = _count_constants(content)
+
+def _count_constants(content):
+    return _count(NON_CAPS_CONSTANTS, content)
+
+def _collect_function_blocks(content, facts):
+    facts.function_lengths = [content.count('\n', start, end) + 1 for start, end in _function_block_spans(content)]
+
+def _collect_functions(content, facts):
+    facts.function_count = _count_functions(content)
+
+def _collect_utility_functions(content, facts):
+    # Only files over 100 lines are checked for utility functions
+    if content.count('\n') >= 100:
+        facts.utility_function_count = _count(UTILITY_FUNCTIONS, content)
+
+def _utility_functions(content):
+    return content.count('\n'), _count(UTILITY_FUNCTIONS, content)
+
+def _merge_utility_functions(pieces, facts):
+    if sum(line_breaks for line_breaks, _ in pieces) >= 100:
+        facts.utility_function_count = sum(count for _, count in pieces)
+
+def _collect_deep_nesting(content, facts):
+    facts.deep_nesting = count_deep_nesting(content)
+
+def _collect_block_comments(content, facts):
+    facts.block_comments = count_block_comments(content, '/*')
+
+def _collect_jsdoc(content, facts):
+    facts.jsdoc_comments = count_block_comments(content, '/**')
+
+def _collect_commented_code(content, facts):
+    facts.commented_code = _count_commented_code(content)
+
+def _count_commented_code(content):
+    count = 0
+    match = COMMENTED_CODE.search(content)
+    while match is not None:
+        start = match.start()
+        line_start = content.rfind('\n', 0, start) + 1
+        if line_start == start or content[line_start:start].isspace():
+            count += 1
+            match = COMMENTED_CODE.search(content, match.end())
+        else:
+            # Neither this "//" nor any later one on its line starts it
+            line_end = content.find('\n', start)
+            match = COMMENTED_CODE.search(content, line_end) if line_end >= 0 else None
+    return count
+
+def _collect_hardcoded_strings(content, facts):
+    facts.hardcoded_strings = _count_hardcoded_strings(content)
+
+def _count_hardcoded_strings(content):
+    return _count(HARDCODED_STRINGS, content)
+
+def _collect_semicolons(content, facts):
+    facts.semicolon_lines = _count(SEMICOLON_LINES, content)
+    facts.missing_semicolon_lines = _count_missing_semicolons(content)
+
+def _count_missing_semicolons(content):
+    missing = MISSING_SEMICOLON_LINES.findall(content)
+    return len(missing) - missing.count('')
+
+def _semicolons(content):
+    missing = followed = _count_missing_semicolons(content)
+    if content.endswith('\n'):
+        # Followed by a line that starts with a keyword, a statement on the
+        # last line is only missing its semicolon if something other than
+        # one ends it, while at the end of the text the line break does
+        last_line = content[content.rfind('\n', 0, -1) + 1:]
+        followed += _count_missing_semicolons(last_line + 'x') - _count_missing_semicolons(last_line)
+    return _count(SEMICOLON_LINES, content), missing, followed
+
+def _merge_semicolons(pieces, facts):
+    facts.semicolon_lines = sum(lines for lines, _, _ in pieces)
+    # Every piece is followed by the next one, except the last
+    facts.missing_semicolon_lines = sum(followed for _, _, followed in pieces[:-1]) + sum(missing for _, missing, _ in pieces[-1:])
+
+def _is_react(content):
+    return 'import React' in content or 'from "react"' in content or "from 'react'" in content
+
+def _collect_react(content, facts):
+    facts.is_react = _is_react(content)
+
+# Hooks and components are only looked for in React files; the groups
+# check that themselves, so they need not be collected with "react"
+
+def _collect_effects(content, facts):
+    if _is_react(content):
+        facts.effects_without_deps = _count_effects_without_deps(content)
+
+def _collect_large_components(content, facts):
+    if _is_react(content):
+        facts.large_components = find_large_components(content, 100)
+
+def _collect_console_logs(content, facts):
+    facts.console_logs = _count(CONSOLE_LOGS, content)
+
+def _collect_async(content, facts):
+    facts.try_blocks = _count(TRY_BLOCKS, content)
+    facts.promise_chains = _count(PROMISE_CHAINS, content)
+    facts.async_functions = _count(ASYNC_FUNCTIONS, content)
+
+def _collect_member_access(content, facts):
+    facts.nested_member_access = NESTED_MEMBER_ACCESS.search(content) is not None
+    # Optional chaining only matters where members are accessed in chains
+    facts.optional_chaining = facts.nested_member_access and OPTIONAL_CHAINING.search(content) is not None
+
+def _collect_markup(content, facts):
+    facts.has_images = '<img' in content
+    facts.has_buttons = '<button' in content
+    # The attributes only matter where there are elements to have them
+    facts.has_alt_attributes = facts.has_images and 'alt=' in content
+    facts.has_aria_attributes = facts.has_buttons and 'aria-' in content
+
+class _Closers:
+    """
+    Where the "[^)]*\\)" and "{[^}]*}" parts of a pattern end, found from
+    where they start, and what follows them: each ")" or "}" is looked for
+    once and each part after one is matched once, not once per attempt.
+    """
+
+    def __init__(self, content):
+        self.content = content
+        self.paren = CharFinder(content, ')')
+        self.brace = CharFinder(content, '}')
+        self.matched = {}
+
+    def after_paren(self, opened, pattern):
+        """End of r'[^)]*\\)' + pattern matched from opened, or -1."""
+        close = self.paren(opened)
+        return self.match(pattern, close + 1) if close >= 0 else -1
+
+    def after_brace(self, opened):
+        """End of r'[^}]*}' matched from opened, or -1."""
+        close = self.brace(opened)
+        return close + 1 if close >= 0 else -1
+
+    def match(self, pattern, position):
+        """End of pattern matched at position, or -1."""
+        key = (pattern, position)
+        if key not in self.matched:
+            match = pattern.match(self.content, position)
+            self.matched[key] = match.end() if match is not None else -1
+        return self.matched[key]
+
+def _find_all(content, near, headers, match_end):
+    """
+    The (start, end) spans a findall() of the pattern would match.
+
+    Its near version (see _near()) finds them, except where a ")" or "}"
+    is too far: from there, the pattern's start up to a branch point
+    (headers) and match_end(header, closers), which returns where the rest
+    of the pattern ends after the header or -1, decide, and the search
+    goes on after the match, or after the start of the failed attempt.
+    """
+    closers = _Closers(content)
+    spans = []
+    position = 0
+    while True:
+        for match in near.finditer(content, position):
+            if match.lastindex is None:
+                spans.append(match.span())
+                continue
+            start = match.start()
+            end = match_end(headers.match(content, start), closers)
+            if end < 0:
+                position = start + 1
+            else:
+                spans.append((start, end))
+                position = end
+            break
+        else:
+            return spans
+
+def _lowercase_component_spans(content):
+    """The spans matched by LOWERCASE_COMPONENTS."""
+    def match_end(header, closers):
+        return closers.after_paren(header.end(), ARROW if header.group(1) is not None else BODY)
+    return _find_all(content, NEAR_LOWERCASE_COMPONENTS, LOWERCASE_COMPONENT_HEADERS, match_end)
+
+def _function_block_spans(content):
+    """The spans matched by FUNCTION_BLOCKS."""
+    def match_end(header, closers):
+        if header.group('expression') is None:
+            body = closers.after_paren(header.end(), ARROW_BODY if header.group('arrow') else BODY)
+            return closers.after_brace(body) if body >= 0 else -1
+        # "function" without a name: an arrow after it, then a parameter list
+        for pattern, parameters in ((ARROW_BODY, False), (PARAMETERS, True)):
+            body = closers.match(pattern, header.end())
+            if body >= 0 and parameters:
+                body = closers.after_paren(body, BODY)
+            end = closers.after_brace(body) if body >= 0 else -1
+            if end >= 0:
+                return end
+        return -1
+    return _find_all(content, NEAR_FUNCTION_BLOCKS, FUNCTION_BLOCK_HEADERS, match_end)
+
+def _count_functions(content):
+    """The number of FUNCTIONS matches."""
+    def match_end(header, closers):
+        if header.group(1) is None:
+            return header.end()
+        return closers.after_paren(header.end(), ARROW)
+    return len(_find_all(content, NEAR_FUNCTIONS, FUNCTION_HEADERS, match_end))
+
+def _count_effects_without_deps(content):
+    """The number of EFFECTS_WITHOUT_DEPS matches."""
+    def match_end(header, closers):
+        end = closers.after_brace(header.end())
+        return closers.match(CALL_END, end) if end >= 0 else -1
+    return len(_find_all(content, NEAR_EFFECTS_WITHOUT_DEPS, EFFECT_HEADERS, match_end))
+
+def count_block_comments(content, opener):
+    """
+    Count the matches of opener + r'[\\s\\S]*?\\*/', e.g. /\\*[\\s\\S]*?\\*/.
+
+    Once an opener has no closing "*/" after it, neither has any later one,
+    so the count stops there instead of scanning to the end again for each.
+    """
+    count = 0
+    position = content.find(opener)
+    while position >= 0:
+        end = content.find('*/', position + len(opener))
+        if end < 0:
+            break
+        count += 1
+        position = content.find(opener, end + 2)
+    return count
+
+def count_deep_nesting(content):
+    """
+    Count the matches of the deep nesting pattern (see DEEP_NESTING).
+
+    The pattern runs as it is, up to the last "}" (a match ends at one), unless
+    some "if (" headers share their ")": those are found by looking up the
+    braces and ")"s in precomputed lists instead.
+
+    After the "if (...) {", each "(?:[^{}]|{[^{}]*})*" skips text and
+    empty-of-braces "{...}" pairs, so only the sequence of braces matters:
+    the first brace it cannot skip must be a "{" (any earlier stop leaves
+    the next one at a "}"), and after it the second run ends either at a
+    "{" that some "}" follows, or else at the "}" of the last pair it
+    skipped. Skips over consecutive pairs are precomputed once.
+    """
+    if NESTED_IF_HEADERS.search(content) is None:
+        return len(DEEP_NESTING.findall(content, 0, content.rfind('}') + 1))
+
+    braces = [(match.start(), match.group()) for match in re.finditer(r'[{}]', content)]
+    positions = [position for position, _ in braces]
+    opens = [brace == '{' for _, brace in braces]
+    count = len(braces)
+
+    # skip[i]: the first brace from i on that does not start a "{}" pair
+    skip = list(range(count + 1))
+    for index in range(count - 2, -1, -1):
+        if opens[index] and not opens[index + 1]:
+            skip[index] = skip[index + 2]
+
+    # next_close[i]: the first "}" from i on
+    next_close = [count] * (count + 1)
+    for index in range(count - 1, -1, -1):
+        next_close[index] = next_close[index + 1] if opens[index] else index
+
+    closing_parens = [match.start() for match in re.finditer(r'\)', content)]
+
+    matches = 0
+    position = content.find('if')
+    while position >= 0:
+        end = _nested_match_end(content, position, positions, opens, skip, next_close, closing_parens)
+        if end is None:
+            position = content.find('if', position + 1)
+        else:
+            matches += 1
+            position = content.find('if', end)
+    return matches
+
+def _nested_match_end(content, start, positions, opens, skip, next_close, closing_parens):
+    """End of a deep nesting match starting at "if" at start, or None."""
+    # The "if\s*\([^)]*\)\s*{" header
+    paren = WHITESPACE.match(content, start + 2).end()
+    if content[paren:paren + 1] != '(':
+        return None
+    index = bisect_left(closing_parens, paren + 1)
+    if index == len(closing_parens):
+        return None
+    brace = WHITESPACE.match(content, closing_parens[index] + 1).end()
+    if content[brace:brace + 1] != '{':
+        return None
+
+    # The first "{" the first run cannot skip
+    count = len(positions)
+    first = skip[bisect_left(positions, brace + 1)]
+    if first == count or not opens[first]:
+        return None
+
+    # The second run, then "{[^}]*}"
+    second = skip[first + 1]
+    if second < count and opens[second] and next_close[second + 1] < count:
+        return positions[next_close[second + 1]] + 1
+    if second > first + 1:
+        return positions[second - 1] + 1
+    return None
+
+def find_large_components(content, max_lines):
+    """
+    Find React components longer than max_lines, as the original analyzer
+    measures them.
+
+    Components are the names matched by
+    r'(?:function|const)\\s+([A-Z]\\w*)[^{]*{[^}]*return\\s*\\([\\s\\S]*?\\);'
+    and the size of each is the number of line breaks from the first
+    occurrence of its name, over the next "{" and the next "return (", to
+    the next ");". The "return ("s and ");"s are looked up in sorted
+    position lists instead of backtracking over the text, and as the
+    declarations are tried in order, the braces found for one are reused
+    for the next while they still follow it.
+
+    Returns:
+        list: Names of the large components, repeated as often as matched
+    """
+    returns = list(RETURN_PARENS.finditer(content))
+    return_starts = [match.start() for match in returns]
+    return_ends = [match.end() for match in returns]
+    closers = [match.start() for match in re.finditer(r'\);', content)]
+    if not closers or not return_starts:
+        return []
+    last_closer = closers[-1]
+
+    sizes = {}
+    large = []
+    brace = close = -1
+    candidate = COMPONENT_DECLARATIONS.search(content)
+    while candidate is not None:
+        if brace < candidate.end(1):
+            brace = content.find('{', candidate.end(1))
+            if brace < 0:
+                break
+            close = content.find('}', brace + 1)
+            if close < 0:
+                close = len(content)
+
+        # The last "return (" inside the braces that some ");" follows; a
+        # declaration may also start inside the name of one that failed
+        index = min(bisect_left(return_starts, close), bisect_right(return_ends, last_closer)) - 1
+        if index < 0 or return_starts[index] <= brace:
+            candidate = COMPONENT_DECLARATIONS.search(content, candidate.start() + 1)
+            continue
+
+        name = candidate.group(1)
+        if name not in sizes:
+            sizes[name] = _component_size(content, name, return_starts, return_ends, closers)
+        if sizes[name] is not None and sizes[name] > max_lines:
+            large.append(name)
+        candidate = COMPONENT_DECLARATIONS.search(content, _next_position(closers, return_ends[index]) + 2)
+    return large
+
+def _component_size(content, name, return_starts, return_ends, closers):
+    """Line breaks in the first match of name + r'[^{]*{[\\s\\S]*?return\\s*\\([\\s\\S]*?\\);'."""
+    start = content.find(name)
+    brace = content.find('{', start + len(name))
+    if brace < 0:
+        return None
+    index = bisect_left(return_starts, brace + 1)
+    if index == len(return_starts):
+        return None
+    closer = _next_position(closers, return_ends[index])
+    if closer is None:
+        return None
+    return content.count('\n', start, closer + 2)
+
+def _next_position(positions, minimum):
+    """The first of the sorted positions at or after minimum, or None."""
+    index = bisect_left(positions, minimum)
+    return positions[index] if index < len(positions) else None
+
+# The facts in groups, each collected on its own by its function: rules
+# name the groups they read, so an analysis only matches the patterns of
+# the groups its selected rules need
+FACT_GROUPS = {
+    'variable_names': _collect_variable_names,
+    'components': _collect_components,
+    'constants': _collect_constants,
+    'function_blocks': _collect_function_blocks,
+    'functions': _collect_functions,
+    'utility_functions': _collect_utility_functions,
+    'deep_nesting': _collect_deep_nesting,
+    'block_comments': _collect_block_comments,
+    'jsdoc': _collect_jsdoc,
+    'commented_code': _collect_commented_code,
+    'hardcoded_strings': _collect_hardcoded_strings,
+    'semicolons': _collect_semicolons,
+    'react': _collect_react,
+    'effects': _collect_effects,
+    'large_components': _collect_large_components,
+    'console_logs': _collect_console_logs,
+    'async': _collect_async,
+    'member_access': _collect_member_access,
+    'markup': _collect_markup,
+}
+
+def _merge_variable_names(pieces, facts):
+    facts.non_camel_case_vars = [name for names in pieces for name in names]
+
+def _summed(name):
+    """Merge function of a piecewise group that counts one fact."""
+    def merge(pieces, facts):
+        setattr(facts, name, sum(pieces))
+    return merge
+
+# The costliest groups can also be collected piece by piece, for text cut
+# into pieces by join_pieces(), and merged (see IncrementalDocument): the
+# function collects the part of the facts of one piece (counts, names)
+# that the merge function adds up into the facts of the whole text
+PIECEWISE_GROUPS = {
+    'variable_names': (NON_CAMEL_CASE_VARS.findall, _merge_variable_names),
+    'constants': (_count_constants, _summed('non_caps_constants')),
+    'utility_functions': (_utility_functions, _merge_utility_functions),
+    'commented_code': (_count_commented_code, _summed('commented_code')),
+    'hardcoded_strings': (_count_hardcoded_strings, _summed('hardcoded_strings')),
+    'semicolons': (_semicolons, _merge_semicolons),
+}
+
+# Last characters of a chunk after which a match of the piecewise groups'
+# patterns could run on into the next chunk: a comment sign before
+# commented-out code, the "=" of a string or function assigned there, or
+# the keyword before a name
+OPEN_ENDINGS = ('//', '=', 'function', 'const')
+LITERAL_QUOTES = '\'"'
+
+def _continues(head):
+    # Chunks start with a keyword (see incremental.CHUNK_START), which the
+    # patterns only run on into after one of OPEN_ENDINGS, never from a
+    # name or number before it as in Python
+    return False
+
+def cut_summary(content):
+    """What piece_starts() needs to know about a chunk (see scanning.cut_summary())."""
+    return summarize_cut(content, LITERAL_QUOTES)
+
+def piece_starts(summaries):
+    """
+    Find the chunks that start a piece PIECEWISE_GROUPS can be collected
+    from on its own.
+
+    The chunks must start with a declaration keyword (see
+    incremental.CHUNK_START), which none of the piecewise groups' patterns
+    can continue into except after an open ending (OPEN_ENDINGS) or inside
+    a string opened by an "=".
+
+    Args:
+        summaries (list): cut_summary() of each chunk, in order
+
+    Returns:
+        list: Indexes of the chunks that start a piece, from 0
+    """
+    return find_piece_starts(summaries, OPEN_ENDINGS, _continues)
+
+def join_pieces(chunks):
+    """
+    Join text cut into chunks into the pieces found by piece_starts().
+
+    Args:
+        chunks (list): The text in chunks, each ending with its line break
+            except the last
+
+    Returns:
+        list: The pieces, each one chunk or several joined, in order
+    """
+    return join_chunks(chunks, LITERAL_QUOTES, OPEN_ENDINGS, _continues)
+
+def collect_piece(content, groups):
+    """
+    Collect the parts of piecewise groups' facts found in one piece.
+
+    Args:
+        content (str): A piece from join_pieces()
+        groups (iterable): Keys of PIECEWISE_GROUPS
+
+    Returns:
+        dict: Group name to the piece's part of its facts
+    """
+    return {group: PIECEWISE_GROUPS[group][0](content) for group in groups}
+
+def merge_pieces(pieces, groups, facts):
+    """
+    Fill in the facts of piecewise groups from the parts of every piece.
+
+    Args:
+        pieces (list): collect_piece() of each piece of the text, in order
+        groups (iterable): Keys of PIECEWISE_GROUPS, collected in every piece
+        facts (JavaScriptFacts): Facts of the whole text to fill in
+    """
+    for group in groups:
+        PIECEWISE_GROUPS[group][1]([piece[group] for piece in pieces], facts)
@@ -0,0 +1,4 @@
+# The original regex-based analyzers, kept as they were as the "legacy"
+# engine, so that changes to the rewritten "fast" engine can be checked
+# against the scores teams already rely on. Only the entry points were
+# split so they accept source code instead of a file path.
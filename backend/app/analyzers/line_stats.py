@@ -0,0 +1,690 @@
+import codecs
+import hashlib
+import io
+import math
+import re
+from array import array
+
+# Bit flags stored per line
+BLANK = 1
+COMMENT = 2
+TRAILING_WHITESPACE = 4
+BLOCK_COMMENT = 8  # Starts a block comment: not code, but its indent is checked
+
+# Lines that end a run of code lines (a "block")
+NOT_CODE = BLANK | COMMENT | BLOCK_COMMENT
+
+# NumPy only pays off once there are enough lines to amortize its overhead
+NUMPY_MIN_BYTES = 64 * 1024
+
+# The vectorized scan works on windows of whole lines of about this size, so
+# its per-character temporaries stay bounded however large the file is
+NUMPY_WINDOW_BYTES = 256 * 1024
+
+# The scan without NumPy works on windows of whole lines of about this many
+# characters, for the same reason: it keeps a few lists per line
+SCAN_WINDOW_CHARS = 4 * 1024
+
+# Flags to b'c' for code lines and b'.' for the others, so runs of code
+# lines are found with one regular expression
+_CODE_LINES = bytes(b'.'[0] if flag & NOT_CODE else b'c'[0] for flag in range(256))
+_CODE_RUNS = re.compile(rb'c+')
+
+_numpy = None
+
+def _load_numpy():
+    """Import NumPy on first use, returning None when it is not installed."""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
+def line_record(line, comment_prefixes, block_comment_prefixes=()):
+    """
+    Reduce one line to what LineStats keeps of it.
+
+    Args:
+        line (str): Line without its newline
+        comment_prefixes (tuple): Prefixes that mark a full-line comment
+        block_comment_prefixes (tuple): Prefixes that mark the start of a
+            block comment
+
+    Returns:
+        tuple: (indent width, length, flags, stripped text)
+    """
+    stripped = line.strip()
+    flag = 0
+    if not stripped:
+        flag |= BLANK
+    elif stripped.startswith(comment_prefixes):
+        flag |= COMMENT
+    elif stripped.startswith(block_comment_prefixes):
+        flag |= BLOCK_COMMENT
+    if line and line[-1].isspace():
+        flag |= TRAILING_WHITESPACE
+    return len(line) - len(line.lstrip()), len(line), flag, stripped
+
+class LineStats:
+    """
+    Per-line statistics for one file, computed in a single pass and shared
+    by every category check.
+
+    Lines are split on '\\n' exactly like ``content.split('\\n')``, but no
+    per-line strings are kept: each line is reduced to its indent width,
+    length and flags, and every run of consecutive code lines (a "block")
+    to its boundaries and a digest of its stripped text, hashed as the
+    lines go by.
+    """
+
+    __slots__ = (
+        'line_count', 'indents', 'lengths', 'flags',
+        'block_starts', 'block_sizes', 'block_digests',
+    )
+
+    def __init__(self):
+        self.line_count = 0
+        self.indents = array('I')
+        self.lengths = array('I')
+        self.flags = bytearray()
+        self.block_starts = array('I')
+        self.block_sizes = array('I')
+        self.block_digests = array('Q')
+
+    @classmethod
+    def from_content(cls, content, comment_prefixes, block_comment_prefixes=()):
+        """
+        Build the statistics table for a file.
+
+        Args:
+            content (str): File content
+            comment_prefixes (tuple): Prefixes that mark a full-line comment
+            block_comment_prefixes (tuple): Prefixes that mark the start of
+                a block comment
+
+        Returns:
+            LineStats: Statistics for every line of the file
+        """
+        stats = cls()
+        numpy = _load_numpy() if len(content) >= NUMPY_MIN_BYTES and content.isascii() else None
+        if numpy is not None:
+            stats._scan_vectorized(numpy, content, comment_prefixes, block_comment_prefixes)
+        else:
+            stats._scan(content, comment_prefixes, block_comment_prefixes)
+        return stats
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Build the statistics table from per-line records.
+
+        Args:
+            records (iterable): line_record() results, one per line
+
+        Returns:
+            LineStats: Statistics for every line, as from_content() computes them
+        """
+        stats = cls()
+        indents, lengths, flags = stats.indents, stats.lengths, stats.flags
+        block = None
+        line_number = 0
+        for indent, length, flag, stripped in records:
+            indents.append(indent)
+            lengths.append(length)
+            flags.append(flag)
+            if flag & NOT_CODE:
+                block = stats._close_block(block)
+            else:
+                block = stats._extend_block(block, line_number, stripped)
+            line_number += 1
+
+        stats._close_block(block)
+        stats.line_count = line_number
+        return stats
+
+    @classmethod
+    def concatenate(cls, parts):
+        """
+        Join the statistics of consecutive pieces of a file.
+
+        Every piece but the last must end with a line that is not code, so
+        that no block runs from one piece into the next; the blocks of the
+        pieces are then exactly the blocks of the whole file.
+
+        Args:
+            parts (iterable): LineStats of the pieces, in file order
+
+        Returns:
+            LineStats: Statistics for every line, as from_content() computes them
+        """
+        stats = cls()
+        for part in parts:
+            offset = stats.line_count
+            stats.indents.extend(part.indents)
+            stats.lengths.extend(part.lengths)
+            stats.flags += part.flags
+            stats.block_starts.extend(start + offset for start in part.block_starts)
+            stats.block_sizes.extend(part.block_sizes)
+            stats.block_digests.extend(part.block_digests)
+            stats.line_count += part.line_count
+        return stats
+
+    def _scan(self, content, comment_prefixes, block_comment_prefixes):
+        kinds = _LineKinds(comment_prefixes, block_comment_prefixes)
+        block = None
+        position = 0
+        size = len(content)
+        while True:
+            # Windows end at a line break, so every line is in one window
+            end = content.find('\n', position + SCAN_WINDOW_CHARS) if position + SCAN_WINDOW_CHARS < size else -1
+            if end == -1:
+                end = size
+            # A window of the whole text (e.g. one long line) is not copied first
+            lines = (content if end - position == size else content[position:end]).split('\n')
+            block = self._scan_lines(lines, kinds, block)
+            if end == size:
+                break
+            position = end + 1
+        self._close_block(block)
+
+    def _scan_lines(self, lines, kinds, block):
+        """
+        Add the lines of one window of the text.
+
+        Args:
+            lines (list): Whole lines, without their line breaks
+            kinds (_LineKinds): Flags of the stripped lines' first characters
+            block (list): Block still open from the previous window, or None
+
+        Returns:
+            list: The block still open at the end of the window, or None
+        """
+        stripped = list(map(str.strip, lines))
+        head = kinds.head_length
+        flags = bytes([
+            kinds[text[:head]] | (TRAILING_WHITESPACE if line[-1:].isspace() else 0)
+            for line, text in zip(lines, stripped)
+        ])
+        self.indents.fromlist([len(line) - len(line.lstrip()) for line in lines])
+        self.lengths.fromlist([len(line) for line in lines])
+        self.flags += flags
+        line_offset = self.line_count
+        self.line_count += len(lines)
+
+        # Blocks are runs of code lines; the stripped lines of a run, each
+        # followed by a line break, hash as they would one line at a time
+        code = flags.translate(_CODE_LINES)
+        if block is not None and not code.startswith(b'c'):
+            block = self._close_block(block)
+        for run in _CODE_RUNS.finditer(code):
+            run_start, run_end = run.span()
+            if block is None:
+                block = [line_offset + run_start, 0, hashlib.blake2b(digest_size=8)]
+            block[2].update(('\n'.join(stripped[run_start:run_end]) + '\n').encode('utf-8'))
+            block[1] += run_end - run_start
+            # A run that reaches the end of the window may go on in the next one
+            if run_end < len(lines):
+                block = self._close_block(block)
+        return block
+
+    def _scan_vectorized(self, np, content, comment_prefixes, block_comment_prefixes):
+        encoded = content.encode('ascii')
+        size = len(encoded)
+        block = None
+        position = 0
+        while True:
+            # Windows end at a line break, so every line is in one window
+            end = encoded.find(b'\n', position + NUMPY_WINDOW_BYTES) if position + NUMPY_WINDOW_BYTES < size else -1
+            if end == -1:
+                end = size
+            block = self._scan_window(np, memoryview(encoded)[position:end], comment_prefixes, block_comment_prefixes, block)
+            if end == size:
+                break
+            position = end + 1
+        self._close_block(block)
+
+    def _scan_window(self, np, window, comment_prefixes, block_comment_prefixes, block):
+        """
+        Add the lines of one window of the text, vectorized.
+
+        Args:
+            window (memoryview): ASCII text of whole lines, without the line
+                break that ends the window
+            block (list): Block still open from the previous window, or None
+
+        Returns:
+            list: The block still open at the end of the window, or None
+        """
+        if not len(window):
+            # The empty line after a final line break
+            self.indents.append(0)
+            self.lengths.append(0)
+            self.flags.append(BLANK)
+            self.line_count += 1
+            return self._close_block(block)
+
+        data = np.frombuffer(window, dtype=np.uint8)
+        size = len(data)
+
+        newlines = np.flatnonzero(data == 10)
+        starts = np.concatenate(([0], newlines + 1))
+        ends = np.concatenate((newlines, [size]))
+        lengths = ends - starts
+        del newlines
+
+        # Same character set as str.strip() for ASCII text: \t to \r, the
+        # separators \x1c to \x1f, and the space
+        is_space = ((data >= 9) & (data <= 13)) | ((data >= 28) & (data <= 32))
+        solid = np.flatnonzero(~is_space & (data != 10))
+        if len(solid) == 0:
+            solid = np.array([size], dtype=np.int64)
+
+        # First and last non-whitespace character of each line
+        first = solid[np.minimum(np.searchsorted(solid, starts), len(solid) - 1)]
+        first = np.where(first < starts, ends, np.minimum(first, ends))
+        last_index = np.searchsorted(solid, ends) - 1
+        last = solid[np.maximum(last_index, 0)]
+        del solid, last_index
+
+        blank = first >= ends
+        comment = _prefix_mask(np, data, first, ends, blank, comment_prefixes)
+        block_comment = _prefix_mask(np, data, first, ends, blank | comment, block_comment_prefixes)
+        trailing = (lengths > 0) & is_space[np.maximum(ends - 1, 0)]
+        del is_space
+
+        flags = blank * BLANK | comment * COMMENT | trailing * TRAILING_WHITESPACE | block_comment * BLOCK_COMMENT
+        line_offset = self.line_count
+        line_count = len(starts)
+        self.line_count += line_count
+        self.indents.frombytes(np.where(blank, lengths, first - starts).astype(np.uint32).tobytes())
+        self.lengths.frombytes(lengths.astype(np.uint32).tobytes())
+        self.flags += flags.astype(np.uint8).tobytes()
+
+        # Blocks are runs of code lines; find where each run starts and stops
+        code = np.concatenate(([False], ~(blank | comment | block_comment), [False])).astype(np.int8)
+        edges = np.diff(code)
+        run_starts = np.flatnonzero(edges == 1).tolist()
+        run_ends = np.flatnonzero(edges == -1).tolist()
+        if block is not None and (not run_starts or run_starts[0] != 0):
+            block = self._close_block(block)
+        if run_starts:
+            stripped, offsets = _stripped_code_lines(np, data, first, last, code[1:-1].astype(bool))
+            for run_start, run_end in zip(run_starts, run_ends):
+                # The stripped lines of a run, each followed by a line break,
+                # hash as they would one line at a time
+                if block is None:
+                    block = [line_offset + run_start, 0, hashlib.blake2b(digest_size=8)]
+                block[2].update(stripped[offsets[run_start]:offsets[run_end]])
+                block[1] += run_end - run_start
+                # A run that reaches the end of the window may go on in the next one
+                if run_end < line_count:
+                    block = self._close_block(block)
+        return block
+
+    def _extend_block(self, block, line_number, stripped):
+        """
+        Add a code line to the open block, opening one if needed.
+
+        Args:
+            block (list): [first line, line count, blake2b] of the open
+                block, or None
+            line_number (int): 0-based number of the line
+            stripped (str | bytes | memoryview): Stripped text of the line
+
+        Returns:
+            list: The open block
+        """
+        if block is None:
+            block = [line_number, 0, hashlib.blake2b(digest_size=8)]
+        hasher = block[2]
+        hasher.update(stripped.encode('utf-8') if isinstance(stripped, str) else stripped)
+        hasher.update(b'\n')
+        block[1] += 1
+        return block
+
+    def _close_block(self, block):
+        """Record the open block, if any; returns None, the new open block."""
+        if block is not None:
+            self.block_starts.append(block[0])
+            self.block_sizes.append(block[1])
+            self.block_digests.append(int.from_bytes(block[2].digest(), 'little'))
+        return None
+
+    def _vector_backend(self):
+        """NumPy when it is installed and the table is large enough, else None."""
+        return _load_numpy() if self.line_count * 4 >= NUMPY_MIN_BYTES else None
+
+    def _view(self, values, np):
+        return np.frombuffer(values, dtype=np.uint32)
+
+    def _code_indents(self):
+        """Indent widths of non-blank, non-comment lines (block comment starts included)."""
+        flags = self.flags
+        return (indent for indent, flag in zip(self.indents, flags) if not flag & (BLANK | COMMENT))
+
+    def max_indent(self):
+        """Deepest indentation of any code line."""
+        numpy = self._vector_backend()
+        if numpy is not None:
+            code = (numpy.frombuffer(self.flags, dtype=numpy.uint8) & (BLANK | COMMENT)) == 0
+            indents = self._view(self.indents, numpy)[code]
+            return int(indents.max()) if len(indents) else 0
+        return max(self._code_indents(), default=0)
+
+    def indents_multiple_of(self, width):
+        """Check that every indented code line is indented by a multiple of width."""
+        numpy = self._vector_backend()
+        if numpy is not None:
+            code = (numpy.frombuffer(self.flags, dtype=numpy.uint8) & (BLANK | COMMENT)) == 0
+            return not numpy.any(self._view(self.indents, numpy)[code] % width)
+        return all(indent % width == 0 for indent in self._code_indents())
+
+    def long_lines(self, limit, first=3):
+        """
+        Find lines longer than limit.
+
+        Returns:
+            tuple: (number of long lines, 1-based numbers of the first few)
+        """
+        numpy = self._vector_backend()
+        if numpy is not None:
+            found = numpy.flatnonzero(self._view(self.lengths, numpy) > limit)
+            return len(found), [int(index) + 1 for index in found[:first]]
+
+        count = 0
+        numbers = []
+        for index, length in enumerate(self.lengths):
+            if length > limit:
+                count += 1
+                if len(numbers) < first:
+                    numbers.append(index + 1)
+        return count, numbers
+
+    def count(self, flag):
+        """Count lines with the given flag set."""
+        numpy = self._vector_backend()
+        if numpy is not None:
+            return int(numpy.count_nonzero(numpy.frombuffer(self.flags, dtype=numpy.uint8) & flag))
+        return sum(1 for value in self.flags if value & flag)
+
+    def duplicate_blocks(self, min_lines=3):
+        """Count blocks of at least min_lines lines that repeat an earlier block."""
+        return _count_duplicate_blocks(self.block_sizes, self.block_digests, min_lines)
+
+class _LineKinds(dict):
+    """
+    BLANK, COMMENT, BLOCK_COMMENT or 0 for a stripped line, by its first
+    characters (as many as the longest prefix has): the lines of a file
+    start with few different ones, so each is only classified once.
+    """
+
+    def __init__(self, comment_prefixes, block_comment_prefixes):
+        super().__init__()
+        self.comment_prefixes = comment_prefixes
+        self.block_comment_prefixes = block_comment_prefixes
+        self.head_length = max([1] + [len(prefix) for prefix in comment_prefixes + block_comment_prefixes])
+
+    def __missing__(self, head):
+        if not head:
+            kind = BLANK
+        elif head.startswith(self.comment_prefixes):
+            kind = COMMENT
+        elif head.startswith(self.block_comment_prefixes):
+            kind = BLOCK_COMMENT
+        else:
+            kind = 0
+        self[head] = kind
+        return kind
+
+def _prefix_mask(np, data, first, ends, skip, prefixes):
+    """Lines whose stripped text starts with one of prefixes, except those in skip."""
+    size = len(data)
+    found = np.zeros(len(first), dtype=bool)
+    for prefix in prefixes:
+        matches = ~skip
+        for offset, char in enumerate(prefix.encode('ascii')):
+            position = first + offset
+            matches &= (position < ends) & (data[np.minimum(position, size - 1)] == char)
+        found |= matches
+    return found
+
+
+def _stripped_code_lines(np, data, first, last, code):
+    """
+    Gather the stripped code lines of a window, each followed by a line break.
+
+    Args:
+        data (ndarray): Bytes of the window
+        first (ndarray): Position of the first non-whitespace byte of each line
+        last (ndarray): Position of the last non-whitespace byte of each line
+        code (ndarray): Which lines are code lines
+
+    Returns:
+        tuple: (bytes of the code lines, offset of each line in them, plus
+        one past the last), so lines a to b are bytes[offsets[a]:offsets[b]]
+    """
+    first, last = first[code], last[code]
+
+    # Each code line keeps its stripped text and one byte after it, which
+    # becomes its line break (past the window's end for its last line)
+    buffer = np.empty(len(data) + 1, dtype=np.uint8)
+    buffer[:-1] = data
+    buffer[last + 1] = 10
+    edges = np.zeros(len(data) + 2, dtype=np.int8)
+    edges[first] = 1
+    edges[last + 2] -= 1
+    kept = buffer[np.cumsum(edges[:-1], dtype=np.int8).astype(bool)]
+
+    sizes = np.zeros(len(code) + 1, dtype=np.int64)
+    sizes[1:][code] = last - first + 2
+    return kept, np.cumsum(sizes).tolist()
+
+def _count_duplicate_blocks(sizes, digests, min_lines):
+    seen = set()
+    duplicates = 0
+    for size, digest in zip(sizes, digests):
+        if size < min_lines:
+            continue
+        if digest in seen:
+            duplicates += 1
+        seen.add(digest)
+    return duplicates
+
+class StreamingLineStats:
+    """
+    Line statistics accumulated chunk by chunk, for uploads too large to
+    hold in memory.
+
+    Answers the same queries as LineStats with the same results, but keeps
+    running totals instead of per-line tables: memory grows with the number
+    of code blocks, not with the size of the file. A line split across
+    chunks is processed piece by piece, so even a single very long line
+    (e.g. a minified bundle) is never held as a whole.
+
+    Long lines are counted for one limit, fixed when the stats are created.
+    """
+
+    def __init__(self, comment_prefixes, block_comment_prefixes=(), long_line_limit=100, first_long_lines=3):
+        self.comment_prefixes = comment_prefixes
+        self.block_comment_prefixes = block_comment_prefixes
+        self.long_line_limit = long_line_limit
+        self.first_long_lines = first_long_lines
+        self.line_count = 0
+        self.block_sizes = array('I')
+        self.block_digests = array('Q')
+        self._prefix_length = max(len(prefix) for prefix in comment_prefixes + block_comment_prefixes)
+        # Universal newlines: "\r\n" and "\r" become "\n", even when split
+        # between chunks
+        self._decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder('utf-8')(), translate=True)
+        self._newlines = io.IncrementalNewlineDecoder(None, translate=True)
+        self._flag_counts = [0] * 16
+        self._max_indent = 0
+        self._indent_gcd = 0
+        self._long_line_count = 0
+        self._long_line_numbers = []
+        self._block = None  # blake2b of the open block
+        self._block_size = 0
+        self._closed = False
+        self._reset_line()
+
+    def _reset_line(self):
+        self._length = 0
+        self._indent = 0
+        self._solid = False  # Seen a non-whitespace character
+        self._kind = None  # 'code', 'comment' or 'block comment' once the prefix is known
+        self._head = ''  # Stripped text held until the kind is known
+        self._pending = ''  # Whitespace that is only stripped text if more follows
+        self._last_space = False
+
+    def feed(self, chunk):
+        """
+        Add the next chunk of the file.
+
+        Args:
+            chunk (str | bytes): Next piece of the file; bytes are decoded
+                as UTF-8, even when a character is split between chunks
+
+        Returns:
+            str: The chunk as text, with its line breaks normalized to '\n';
+                a final '\r' is held back until the next chunk or close()
+        """
+        decoder = self._decoder if isinstance(chunk, bytes) else self._newlines
+        chunk = decoder.decode(chunk)
+        pieces = chunk.split('\n')
+        for piece in pieces[:-1]:
+            self._feed_piece(piece)
+            self._end_line()
+        self._feed_piece(pieces[-1])
+        return chunk
+
+    def close(self):
+        """
+        Finish the last line; call once after the final chunk.
+
+        Returns:
+            str: Text held back by feed() (a final '\r' or an incomplete
+                character), to append to the chunks it returned
+        """
+        rest = ''
+        if not self._closed:
+            rest = self._decoder.decode(b'', final=True) + self._newlines.decode('', final=True)
+            self.feed(rest)
+            self._end_line()
+            self._close_block()
+            self._closed = True
+        return rest
+
+    def _feed_piece(self, piece):
+        if not piece:
+            return
+        self._length += len(piece)
+        self._last_space = piece[-1].isspace()
+        if self._kind in ('comment', 'block comment'):
+            return
+        if not self._solid:
+            rest = piece.lstrip()
+            self._indent += len(piece) - len(rest)
+            if not rest:
+                return
+            self._solid = True
+            piece = rest
+
+        core = piece.rstrip()
+        if not core:
+            self._pending += piece
+            return
+        text = self._pending + core
+        self._pending = piece[len(core):]
+
+        if self._kind == 'code':
+            self._block.update(text.encode('utf-8'))
+            return
+        self._head += text
+        if len(self._head) >= self._prefix_length:
+            self._decide()
+
+    def _decide(self):
+        """Classify the current line from its first stripped characters."""
+        head, self._head = self._head, ''
+        if head.startswith(self.comment_prefixes):
+            self._kind = 'comment'
+            self._close_block()
+            return
+        if head.startswith(self.block_comment_prefixes):
+            self._kind = 'block comment'
+            self._close_block()
+            return
+        self._kind = 'code'
+        if self._block is None:
+            self._block = hashlib.blake2b(digest_size=8)
+            self._block_size = 0
+        self._block.update(head.encode('utf-8'))
+
+    def _end_line(self):
+        if not self._solid:
+            flag = BLANK
+            self._close_block()
+        else:
+            if self._kind is None:
+                self._decide()
+            if self._kind == 'comment':
+                flag = COMMENT
+            else:
+                if self._kind == 'block comment':
+                    flag = BLOCK_COMMENT
+                else:
+                    flag = 0
+                    self._block.update(b'\n')
+                    self._block_size += 1
+                self._max_indent = max(self._max_indent, self._indent)
+                self._indent_gcd = math.gcd(self._indent_gcd, self._indent)
+        if self._last_space:
+            flag |= TRAILING_WHITESPACE
+        self._flag_counts[flag] += 1
+
+        self.line_count += 1
+        if self._length > self.long_line_limit:
+            self._long_line_count += 1
+            if len(self._long_line_numbers) < self.first_long_lines:
+                self._long_line_numbers.append(self.line_count)
+        self._reset_line()
+
+    def _close_block(self):
+        if self._block is not None:
+            self.block_sizes.append(self._block_size)
+            self.block_digests.append(int.from_bytes(self._block.digest(), 'little'))
+            self._block = None
+
+    def max_indent(self):
+        """Deepest indentation of any code line."""
+        return self._max_indent
+
+    def indents_multiple_of(self, width):
+        """Check that every indented code line is indented by a multiple of width."""
+        # Every indent is a multiple of width exactly when their gcd is
+        return self._indent_gcd % width == 0
+
+    def long_lines(self, limit, first=3):
+        """
+        Find lines longer than limit.
+
+        Returns:
+            tuple: (number of long lines, 1-based numbers of the first few)
+
+        Raises:
+            ValueError: If limit is not the limit the stats were created with
+        """
+        if limit != self.long_line_limit:
+            raise ValueError(f"Long lines were counted for a limit of {self.long_line_limit}, not {limit}")
+        return self._long_line_count, self._long_line_numbers[:first]
+
+    def count(self, flag):
+        """Count lines with the given flag set."""
+        return sum(count for value, count in enumerate(self._flag_counts) if value & flag)
+
+    def duplicate_blocks(self, min_lines=3):
+        """Count blocks of at least min_lines lines that repeat an earlier block."""
+        return _count_duplicate_blocks(self.block_sizes, self.block_digests, min_lines)
@@ -0,0 +1,184 @@
+import re
+from .incremental import CHUNK_START, COMMENT_PREFIXES, LANGUAGE_FACTS
+from .line_stats import LineStats
+from .py_facts import parses
+from .rules import STATS, SYNTAX, fact_groups, required_inputs, select_rules
+from .source import decode_source
+from .timing import PhaseTimer
+
+# Map-reduce analysis of one large file: the file is cut into pieces of
+# whole lines, the line statistics, the piecewise fact groups (see
+# PIECEWISE_GROUPS in the facts modules) and, for Python, the syntax check
+# of each piece are computed separately, in parallel with one pass matching
+# the other patterns over the whole file (by the caller), and
+# reduce_pieces() merges them into the result the serial analyzer returns
+# for the file.
+
+# Pieces are cut after a blank line, before a line that may start a
+# top-level statement: no block of code lines runs across the cut, so the
+# line statistics join exactly, and the piece before it usually parses on
+# its own (see IncrementalDocument). The start patterns may anchor at the
+# start of a line (with re.MULTILINE), as the cut is right after a break.
+BOUNDARY_PATTERNS = {
+    language: re.compile(rb'\n[ \t\r\f\v]*\n(?=' + pattern.pattern.encode('ascii') + rb')', re.MULTILINE)
+    for language, pattern in CHUNK_START.items()
+}
+
+# Bytes read at a time while looking for a cut, and their overlap
+BOUNDARY_WINDOW_BYTES = 64 * 1024
+BOUNDARY_OVERLAP_BYTES = 256
+
+def piece_plan(language, categories=None, rules=None):
+    """
+    What each piece has to compute for a rule selection.
+
+    Returns:
+        tuple: (the fact groups matched over the whole file, the piecewise
+            fact groups collected from each piece, whether each piece checks
+            its syntax, whether the line statistics are needed)
+
+    Raises:
+        ValueError: If a category or rule id is unknown
+    """
+    needs = required_inputs(select_rules(language, categories, rules))
+    groups = fact_groups(needs)
+    piecewise = groups & LANGUAGE_FACTS[language][0].PIECEWISE_GROUPS.keys()
+    return groups - piecewise, piecewise, SYNTAX in needs and language == 'python', STATS in needs
+
+def piece_boundaries(language, file, size, piece_bytes):
+    """
+    Find where to cut a file into pieces of about piece_bytes.
+
+    Each cut is looked for from piece_bytes after the previous one; a file
+    without suitable cuts (e.g. a minified bundle) stays in one piece.
+
+    Args:
+        language (str): 'python' or 'javascript'
+        file (file): File opened in binary mode
+        size (int): Size of the file in bytes
+        piece_bytes (int): Target size of a piece
+
+    Returns:
+        list: (start, end) byte offsets of the pieces, covering the file
+    """
+    pattern = BOUNDARY_PATTERNS[language]
+    cuts = [0]
+    position = piece_bytes
+    while position < size:
+        file.seek(position)
+        window = file.read(BOUNDARY_WINDOW_BYTES)
+        found = pattern.search(window)
+        if found is None:
+            if position + len(window) >= size:
+                break
+            # Look further on, overlapping so a cut across windows is not missed
+            position += max(len(window) - BOUNDARY_OVERLAP_BYTES, 1)
+            continue
+        cut = position + found.end()
+        cuts.append(cut)
+        position = cut + piece_bytes
+    return list(zip(cuts, cuts[1:] + [size]))
+
+def analyze_piece(language, text, last, with_syntax, with_stats, piecewise=()):
+    """
+    Compute the partial results of one piece of a file (the map step).
+
+    Args:
+        language (str): 'python' or 'javascript'
+        text (str | bytes): The piece, whole lines up to and including the
+            line break before the next piece; bytes are decoded as UTF-8
+            and line breaks normalized (see decode_source())
+        last (bool): Whether the piece ends the file
+        with_syntax (bool): Whether to check that the piece parses (Python)
+        with_stats (bool): Whether to compute the line statistics
+        piecewise (iterable): Piecewise fact groups to collect
+
+    Returns:
+        dict: "lines" (line breaks in the piece), "stats" (LineStats or
+            None), "parsed" (whether the piece parses on its own, or None),
+            and with piecewise groups "facts" (the piece's parts of them,
+            see collect_piece()) and "cut" (see cut_summary())
+    """
+    text = decode_source(text)
+
+    stats = None
+    if with_stats:
+        # The line break before the next piece does not start a line here
+        stats = LineStats.from_content(text if last else text[:-1], *COMMENT_PREFIXES[language])
+
+    parsed = parses(text) if with_syntax else None
+    result = {"lines": text.count('\n'), "stats": stats, "parsed": parsed}
+    if piecewise:
+        facts_module = LANGUAGE_FACTS[language][0]
+        result["facts"] = facts_module.collect_piece(text, piecewise)
+        result["cut"] = facts_module.cut_summary(text)
+    return result
+
+def piece_runs(language, cuts):
+    """
+    Group consecutive pieces into the runs that the piecewise fact groups
+    can be collected from on their own; the pieces of a run that has more
+    than one must be collected again as one, as a match may run across
+    the cuts between them.
+
+    Args:
+        language (str): 'python' or 'javascript'
+        cuts (list): The "cut" of every piece, from analyze_piece(), in order
+
+    Returns:
+        list: (first, end) piece indexes of each run, end excluded
+    """
+    starts = LANGUAGE_FACTS[language][0].piece_starts(cuts)
+    return list(zip(starts, starts[1:] + [len(cuts)]))
+
+def collect_patterns(language, text, groups=None):
+    """
+    Match the patterns over a whole file, next to the pieces.
+
+    Args:
+        language (str): 'python' or 'javascript'
+        text (str | bytes): The whole file; bytes are decoded as UTF-8 and
+            line breaks normalized (see decode_source())
+        groups (iterable): Fact groups to collect, or None for all of them
+
+    Returns:
+        PythonFacts | JavaScriptFacts: Facts of the file, without "parsed"
+    """
+    text = decode_source(text)
+    return LANGUAGE_FACTS[language][0].collect_facts(text, groups)
+
+def reduce_pieces(language, stats, facts, parts, parsed, profile=False, categories=None, rules=None):
+    """
+    Merge the partial results of a file's pieces and score them (the reduce
+    step).
+
+    Args:
+        language (str): 'python' or 'javascript'
+        stats (list): LineStats of every piece in file order, or None when
+            the selection does not need them
+        facts (PythonFacts | JavaScriptFacts): From collect_patterns(), or
+            None when the selection needs no groups matched over the whole file
+        parts (list): The parts of the piecewise fact groups of every run of
+            pieces (see piece_runs()) in file order, or None when the
+            selection needs none
+        parsed (bool): Whether the whole file parses (Python), as decided
+            from its pieces, or None
+        profile (bool): Add per-phase timings in milliseconds as "timings_ms"
+        categories (iterable): Categories to score, or None for all six
+        rules (iterable): Rule ids to run, or None for every rule
+
+    Returns:
+        dict: Analysis results, identical to analyze_*_source() on the
+            whole file
+    """
+    timer = PhaseTimer()
+    facts_module, score = LANGUAGE_FACTS[language]
+    merged_stats = LineStats.concatenate(stats) if stats is not None else None
+    if facts is None:
+        facts = facts_module.collect_facts('', ())
+    if parts is not None:
+        facts_module.merge_pieces(parts, parts[0].keys(), facts)
+    if parsed is not None:
+        facts.parsed = parsed
+    timer.lap("merge")
+    return score(facts, merged_stats, timer if profile else None, categories, rules)
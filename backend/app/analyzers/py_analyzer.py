@@ -1,387 +1,367 @@
-import re
-import os
-import ast
+from .line_stats import COMMENT, LineStats, StreamingLineStats, TRAILING_WHITESPACE
+from .py_facts import collect_facts, parses
+from .rules import (
+    CATEGORY_POINTS, RULES, STATS, SYNTAX, fact_groups, required_inputs, rule, run_category, run_rules, select_rules,
+)
+from .source import decode_source
+from .timing import PhaseTimer
+
+LANGUAGE = 'python'
 
 def analyze_python(file_path):
     """
     Analyze a Python file for code quality.
-    
+
     Args:
         file_path (str): Path to the Python file
-        
+
     Returns:
         dict: Analysis results with scores and recommendations
     """
     with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-    
-    # Initialize scores for each category
-    naming_score = 0
-    modularity_score = 0
-    comments_score = 0
-    formatting_score = 0
-    reusability_score = 0
-    best_practices_score = 0
-    
+        return analyze_python_source(file.read())
+
+def analyze_python_source(content, profile=False, categories=None, rules=None):
+    """
+    Analyze Python source code for code quality.
+
+    Only the selected rules run, and only the passes they need (line
+    statistics, the fact groups they read) are computed; the syntax is
+    only checked when every rule runs.
+
+    Args:
+        content (str | bytes): Source code; bytes are decoded as UTF-8, and
+            line breaks are normalized (see decode_source())
+        profile (bool): Add per-phase timings in milliseconds as "timings_ms"
+        categories (iterable): Categories to score, or None for all six
+        rules (iterable): Rule ids to run, or None for every rule
+
+    Returns:
+        dict: Analysis results with scores and recommendations
+
+    Raises:
+        ValueError: If a category or rule id is unknown
+    """
+    timer = PhaseTimer()
+    content = decode_source(content)
+
+    selected = select_rules(LANGUAGE, categories, rules)
+    needs = required_inputs(selected)
+
+    # Compute per-line statistics once for all categories
+    stats = None
+    if STATS in needs:
+        stats = LineStats.from_content(content, comment_prefixes=('#',))
+        timer.lap("line_stats")
+
+    return _analyze(content, stats, selected, needs, timer, profile, categories is not None or rules is not None)
+
+def analyze_python_stream(chunks, profile=False, categories=None, rules=None):
+    """
+    Analyze Python source code that arrives in chunks, such as a large upload.
+
+    The line statistics are accumulated chunk by chunk. The full text is
+    only kept when a selected rule needs facts matched over it, so
+    selecting line-based rules only (indentation, line length, file length,
+    duplicate blocks) analyzes any file in constant memory.
+
+    Args:
+        chunks (iterable): Pieces of the source, as str or UTF-8 bytes
+        profile (bool): Add per-phase timings in milliseconds as "timings_ms"
+        categories (iterable): Categories to score, or None for all six
+        rules (iterable): Rule ids to run, or None for every rule
+
+    Returns:
+        dict: Analysis results, identical to analyze_python_source()
+
+    Raises:
+        ValueError: If a category or rule id is unknown
+    """
+    timer = PhaseTimer()
+    selected = select_rules(LANGUAGE, categories, rules)
+    needs = required_inputs(selected)
+
+    stats = StreamingLineStats(comment_prefixes=('#',))
+    parts = [] if needs - {STATS} else None
+    for chunk in chunks:
+        text = stats.feed(chunk)
+        if parts is not None:
+            parts.append(text)
+    # A final "\r" is only known to be a line break once the chunks end
+    rest = stats.close()
+    if parts is not None:
+        parts.append(rest)
+    timer.lap("line_stats")
+
+    content = ''.join(parts) if parts is not None else ''
+    return _analyze(content, stats, selected, needs, timer, profile, categories is not None or rules is not None)
+
+def score_python(facts, stats, timer=None, categories=None, rules=None):
+    """
+    Score facts and line statistics collected elsewhere, e.g. incrementally.
+
+    Args:
+        facts (PythonFacts): Facts for the whole source
+        stats (LineStats | StreamingLineStats): Line statistics for the whole source
+        timer (PhaseTimer): Add its laps as "timings_ms" when given
+        categories (iterable): Categories to score, or None for all six
+        rules (iterable): Rule ids to run, or None for every rule
+
+    Returns:
+        dict: Analysis results, as analyze_python_source() returns them
+    """
+    selected = select_rules(LANGUAGE, categories, rules)
+    needs = required_inputs(selected)
+    return _score(facts, stats, selected, needs, timer or PhaseTimer(), timer is not None,
+                  categories is not None or rules is not None)
+
+def _analyze(content, stats, selected, needs, timer, profile, filtered):
+    """Run the selected rules on content and its line statistics."""
+    # Match the patterns of the fact groups the rules read, once each over
+    # the whole text
+    groups = fact_groups(needs)
+    facts = collect_facts(content, groups)
+    if groups:
+        timer.lap("facts")
+    if SYNTAX in needs:
+        facts.parsed = parses(content)
+        timer.lap("parse")
+    return _score(facts, stats, selected, needs, timer, profile, filtered)
+
+def _score(facts, stats, selected, needs, timer, profile, filtered):
+    """Run the selected rules on the facts and line statistics."""
     # Initialize recommendations
     recommendations = []
-    
-    # Split content into lines for analysis
-    lines = content.split('\n')
-    
-    # Parse the AST for better analysis
-    try:
-        tree = ast.parse(content)
-        parsed_successfully = True
-    except SyntaxError:
-        parsed_successfully = False
+    if SYNTAX in needs and not facts.parsed:
         recommendations.append("Fix syntax errors in the code")
-    
-    # Analyze naming conventions (10 points)
-    naming_score, naming_recs = analyze_naming_conventions(content, lines, tree if parsed_successfully else None)
-    recommendations.extend(naming_recs)
-    
-    # Analyze function length and modularity (20 points)
-    modularity_score, modularity_recs = analyze_modularity(content, lines, tree if parsed_successfully else None)
-    recommendations.extend(modularity_recs)
-    
-    # Analyze comments and documentation (20 points)
-    comments_score, comments_recs = analyze_comments(content, lines)
-    recommendations.extend(comments_recs)
-    
-    # Analyze formatting/indentation (15 points)
-    formatting_score, formatting_recs = analyze_formatting(content, lines)
-    recommendations.extend(formatting_recs)
-    
-    # Analyze reusability and DRY (15 points)
-    reusability_score, reusability_recs = analyze_reusability(content, lines, tree if parsed_successfully else None)
-    recommendations.extend(reusability_recs)
-    
-    # Analyze best practices in web dev (20 points)
-    best_practices_score, best_practices_recs = analyze_best_practices(content, lines)
-    recommendations.extend(best_practices_recs)
-    
-    # Calculate overall score (out of 100)
-    overall_score = (
-        naming_score + 
-        modularity_score + 
-        comments_score + 
-        formatting_score + 
-        reusability_score + 
-        best_practices_score
-    )
-    
+
+    # Score each category (naming 10, modularity 20, comments 20,
+    # formatting 15, reusability 15, best practices 20 points)
+    breakdown, category_recs = run_rules(selected, facts, stats, timer)
+    recommendations.extend(category_recs)
+
+    # Calculate overall score (out of 100 when every category runs)
+    overall_score = sum(breakdown.values())
+
     # Limit to top 5 recommendations
     recommendations = recommendations[:5]
-    
+
     # Prepare result in required JSON format
     result = {
         "overall_score": overall_score,
-        "breakdown": {
-            "naming": naming_score,
-            "modularity": modularity_score,
-            "comments": comments_score,
-            "formatting": formatting_score,
-            "reusability": reusability_score,
-            "best_practices": best_practices_score
-        },
+        "breakdown": breakdown,
         "recommendations": recommendations
     }
-    
+    if filtered:
+        result["max_score"] = sum(CATEGORY_POINTS[category] for category in breakdown)
+
+    if profile:
+        result["timings_ms"] = timer.as_dict()
     return result
 
-def analyze_naming_conventions(content, lines, tree):
+def _category(category, facts, stats):
+    rules = [registered for registered in RULES[LANGUAGE].values() if registered.category == category]
+    return run_category(rules, CATEGORY_POINTS[category], facts, stats)
+
+def analyze_naming_conventions(facts, stats):
     """Analyze naming conventions in Python code."""
-    score = 10  # Start with full score and deduct based on issues
-    recommendations = []
-    
-    # Check for snake_case variables and functions (PEP8)
-    camel_case_vars = re.findall(r'([a-z]+[A-Z][a-zA-Z0-9]*)\s*=', content)
-    pascal_case_vars = re.findall(r'([A-Z][a-z]+[A-Za-z0-9]*)\s*=', content)
-    
-    # Check function names
-    camel_case_funcs = re.findall(r'def\s+([a-z]+[A-Z][a-zA-Z0-9]*)\s*\(', content)
-    pascal_case_funcs = re.findall(r'def\s+([A-Z][a-z]+[a-zA-Z0-9]*)\s*\(', content)
-    
-    non_snake_case = camel_case_vars + pascal_case_vars + camel_case_funcs + pascal_case_funcs
-    
-    if non_snake_case:
-        score -= min(5, len(non_snake_case))
-        recommendations.append(f"Use snake_case for variable and function names (found: {', '.join(non_snake_case[:3])})")
-    
-    # Check for UPPERCASE constants
-    non_upper_constants = []
-    constants_pattern = r'([a-z][A-Za-z0-9_]*)\s*=\s*(?:True|False|None|[\'"]{1,3}[^\'"]*[\'"]{1,3}|\d+)'
-    
-    for match in re.finditer(constants_pattern, content):
-        var_name = match.group(1)
-        # Look for constant declaration at module level
-        if re.search(fr'^{var_name}\s*=', content, re.MULTILINE) and not var_name.isupper():
-            non_upper_constants.append(var_name)
-    
-    if non_upper_constants:
-        score -= min(3, len(non_upper_constants))
-        recommendations.append("Use UPPERCASE for constant values")
-    
-    # Check class names (should be PascalCase)
-    non_pascal_classes = re.findall(r'class\s+([a-z][a-zA-Z0-9_]*)\s*[:\(]', content)
-    
-    if non_pascal_classes:
-        score -= min(2, len(non_pascal_classes))
-        recommendations.append("Use PascalCase for class names")
-    
-    return max(0, score), recommendations
-
-def analyze_modularity(content, lines, tree):
+    return _category("naming", facts, stats)
+
+def analyze_modularity(facts, stats):
     """Analyze function length and modularity."""
-    score = 20  # Start with full score
-    recommendations = []
-    
-    # Check for function length
-    function_blocks = re.findall(r'def\s+[a-zA-Z0-9_]+\s*\([^)]*\)(?:\s*->.*?)?\s*:\s*((?:\n\s+.*)+)', content)
-    
-    long_functions = []
-    for func in function_blocks:
-        func_lines = func.count('\n') + 1
-        if func_lines > 30:
-            long_functions.append(func_lines)
-    
-    if long_functions:
-        deduction = min(10, len(long_functions) * 3)
-        score -= deduction
-        recommendations.append(f"Break down functions that are too long (found {len(long_functions)} functions over 30 lines)")
-    
-    # Check for too many arguments
-    many_args_funcs = re.findall(r'def\s+([a-zA-Z0-9_]+)\s*\(([^)]{40,})\)', content)
-    
-    if many_args_funcs:
-        score -= min(5, len(many_args_funcs))
-        recommendations.append("Reduce the number of arguments in functions")
-    
-    # Check for deeply nested conditions/loops
-    indentation_levels = []
-    for line in lines:
-        if line.strip() and not line.strip().startswith('#'):
-            indent = len(line) - len(line.lstrip())
-            indentation_levels.append(indent)
-    
-    if indentation_levels:
-        # Check for deep nesting (more than 4 levels / 16 spaces)
-        max_indent = max(indentation_levels) if indentation_levels else 0
-        if max_indent > 16:
-            score -= 5
-            recommendations.append("Reduce nesting depth in conditions and loops")
-    
-    # Check for large file size
-    if len(lines) > 300:
-        score -= 5
-        recommendations.append("Consider splitting this large file into multiple modules")
-    
-    return max(0, score), recommendations
-
-def analyze_comments(content, lines):
+    return _category("modularity", facts, stats)
+
+def analyze_comments(facts, stats):
     """Analyze comments and documentation."""
-    score = 20  # Start with full score
-    recommendations = []
-    
-    # Count comments
-    single_line_comments = len(re.findall(r'^\s*#.*$', content, re.MULTILINE))
-    
-    # Check for docstrings
-    docstrings = re.findall(r'"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'', content)
-    
-    # Count functions and classes
-    functions = re.findall(r'def\s+[a-zA-Z0-9_]+\s*\(', content)
-    classes = re.findall(r'class\s+[a-zA-Z0-9_]+', content)
-    
-    # Check if each function/class has a docstring
-    if functions and len(docstrings) < len(functions) + len(classes):
-        score -= min(10, (len(functions) + len(classes) - len(docstrings)) * 2)
-        recommendations.append("Add docstrings to document functions and classes")
-    
-    # Check code-to-comment ratio
-    code_to_comment_ratio = len(lines) / max(1, single_line_comments + len(docstrings))
-    
-    if code_to_comment_ratio > 15:
-        score -= 5
-        recommendations.append(f"Add more comments to explain complex logic (current ratio: 1 comment per ~{code_to_comment_ratio:.1f} lines)")
-    
-    # Check for commented-out code
-    commented_code = re.findall(r'^\s*#\s*(def|class|if|for|while|return|import)', content, re.MULTILINE)
-    if commented_code:
-        score -= min(5, len(commented_code))
-        recommendations.append("Remove commented-out code that is no longer needed")
-    
-    # Check for module-level docstring
-    if not content.lstrip().startswith('"""') and not content.lstrip().startswith("'''"):
-        score -= 3
-        recommendations.append("Add a module-level docstring at the beginning of the file")
-    
-    return max(0, score), recommendations
-
-def analyze_formatting(content, lines):
+    return _category("comments", facts, stats)
+
+def analyze_formatting(facts, stats):
     """Analyze code formatting and indentation."""
-    score = 15  # Start with full score
-    recommendations = []
-    
-    # Check consistent indentation
-    indent_levels = []
-    for line in lines:
-        if line.strip() and not line.strip().startswith('#'):
-            indent = len(line) - len(line.lstrip())
-            if indent > 0:
-                indent_levels.append(indent)
-    
-    if indent_levels:
-        # Check if indentation is consistently divisible by 4 (PEP8)
-        indent_divisible_by_4 = all(level % 4 == 0 for level in indent_levels)
-        
-        if not indent_divisible_by_4:
-            score -= 5
-            recommendations.append("Use consistent indentation (4 spaces per PEP8)")
-    
-    # Check line length (should be <= 79 characters as per PEP8)
-    long_lines = [i for i, line in enumerate(lines, 1) if len(line) > 100]
-    if long_lines:
-        score -= min(5, len(long_lines))
-        recommendations.append(f"Break down long lines that exceed 100 characters (found on lines: {', '.join(str(x) for x in long_lines[:3])})")
-    
-    # Check for trailing whitespace
-    trailing_whitespace = sum(1 for line in lines if line.rstrip() != line)
-    if trailing_whitespace > 5:
-        score -= 2
-        recommendations.append("Remove trailing whitespace from lines")
-    
-    # Check for consistent use of quotes
-    single_quotes = len(re.findall(r"'[^']*'", content))
-    double_quotes = len(re.findall(r'"[^"]*"', content))
-    
+    return _category("formatting", facts, stats)
+
+def analyze_reusability(facts, stats):
+    """Analyze code reusability and DRY principles."""
+    return _category("reusability", facts, stats)
+
+def analyze_best_practices(facts, stats):
+    """Analyze adherence to web development best practices."""
+    return _category("best_practices", facts, stats)
+
+# Naming conventions (10 points)
+
+@rule(LANGUAGE, "naming", "snake_case", points=5, needs=["variable_names", "function_names"])
+def check_snake_case(facts, stats):
+    """Variables and functions use snake_case (PEP8)."""
+    non_snake_case = facts.camel_case_vars + facts.pascal_case_vars + facts.camel_case_funcs + facts.pascal_case_funcs
+    if non_snake_case:
+        return len(non_snake_case), f"Use snake_case for variable and function names (found: {', '.join(non_snake_case[:3])})"
+
+@rule(LANGUAGE, "naming", "upper_case_constants", points=3, needs=["constants"])
+def check_upper_case_constants(facts, stats):
+    """Constants assigned at module level are UPPERCASE."""
+    if facts.non_upper_constants:
+        return facts.non_upper_constants, "Use UPPERCASE for constant values"
+
+@rule(LANGUAGE, "naming", "pascal_case_classes", points=2, needs=["class_names"])
+def check_pascal_case_classes(facts, stats):
+    """Class names are PascalCase."""
+    if facts.non_pascal_classes:
+        return facts.non_pascal_classes, "Use PascalCase for class names"
+
+# Function length and modularity (20 points)
+
+@rule(LANGUAGE, "modularity", "function_length", points=10, needs=["functions"])
+def check_function_length(facts, stats):
+    """Functions are at most 30 lines long."""
+    long_functions = [length for length in facts.function_lengths if length > 30]
+    if long_functions:
+        return len(long_functions) * 3, f"Break down functions that are too long (found {len(long_functions)} functions over 30 lines)"
+
+@rule(LANGUAGE, "modularity", "argument_count", points=5, needs=["functions"])
+def check_argument_count(facts, stats):
+    """Parameter lists are shorter than 40 characters (a proxy for too many arguments)."""
+    if facts.many_args_functions:
+        return facts.many_args_functions, "Reduce the number of arguments in functions"
+
+@rule(LANGUAGE, "modularity", "nesting_depth", points=5, needs=[STATS])
+def check_nesting_depth(facts, stats):
+    """Code is indented at most 16 spaces (4 levels) deep."""
+    if stats.max_indent() > 16:
+        return 5, "Reduce nesting depth in conditions and loops"
+
+@rule(LANGUAGE, "modularity", "file_length", points=5, needs=[STATS])
+def check_file_length(facts, stats):
+    """Files are at most 300 lines long."""
+    if stats.line_count > 300:
+        return 5, "Consider splitting this large file into multiple modules"
+
+# Comments and documentation (20 points)
+
+@rule(LANGUAGE, "comments", "docstrings", points=10, needs=["definitions", "docstrings"])
+def check_docstrings(facts, stats):
+    """Every function and class has a docstring."""
+    documentable = facts.function_count + facts.class_count
+    if facts.function_count and facts.docstring_count < documentable:
+        return (documentable - facts.docstring_count) * 2, "Add docstrings to document functions and classes"
+
+@rule(LANGUAGE, "comments", "comment_ratio", points=5, needs=["docstrings", STATS])
+def check_comment_ratio(facts, stats):
+    """There is at least one comment or docstring per 15 lines."""
+    code_to_comment_ratio = stats.line_count / max(1, stats.count(COMMENT) + facts.docstring_count)
+    if code_to_comment_ratio > 15:
+        return 5, f"Add more comments to explain complex logic (current ratio: 1 comment per ~{code_to_comment_ratio:.1f} lines)"
+
+@rule(LANGUAGE, "comments", "commented_out_code", points=5, needs=["commented_code"])
+def check_commented_out_code(facts, stats):
+    """No commented-out code is left behind."""
+    if facts.commented_code:
+        return facts.commented_code, "Remove commented-out code that is no longer needed"
+
+@rule(LANGUAGE, "comments", "module_docstring", points=3, needs=["module_docstring"])
+def check_module_docstring(facts, stats):
+    """The module starts with a docstring."""
+    if not facts.has_module_docstring:
+        return 3, "Add a module-level docstring at the beginning of the file"
+
+# Formatting and indentation (15 points)
+
+@rule(LANGUAGE, "formatting", "indentation", points=5, needs=[STATS])
+def check_indentation(facts, stats):
+    """Indentation is a multiple of 4 spaces (PEP8)."""
+    if not stats.indents_multiple_of(4):
+        return 5, "Use consistent indentation (4 spaces per PEP8)"
+
+@rule(LANGUAGE, "formatting", "line_length", points=5, needs=[STATS])
+def check_line_length(facts, stats):
+    """Lines are at most 100 characters long."""
+    long_line_count, long_lines = stats.long_lines(100)
+    if long_line_count:
+        return long_line_count, f"Break down long lines that exceed 100 characters (found on lines: {', '.join(str(x) for x in long_lines)})"
+
+@rule(LANGUAGE, "formatting", "trailing_whitespace", points=2, needs=[STATS])
+def check_trailing_whitespace(facts, stats):
+    """At most 5 lines end in whitespace."""
+    if stats.count(TRAILING_WHITESPACE) > 5:
+        return 2, "Remove trailing whitespace from lines"
+
+@rule(LANGUAGE, "formatting", "quote_consistency", points=3, needs=["quotes"])
+def check_quote_consistency(facts, stats):
+    """At least 80% of string literals use the same quote style."""
+    single_quotes = facts.single_quotes
+    double_quotes = facts.double_quotes
+
     if single_quotes > 0 and double_quotes > 0:
         quote_consistency = max(single_quotes, double_quotes) / (single_quotes + double_quotes)
         if quote_consistency < 0.8:  # Less than 80% consistent
-            score -= 3
-            recommendations.append("Be consistent with string quotes (either single or double)")
-    
-    return max(0, score), recommendations
+            return 3, "Be consistent with string quotes (either single or double)"
 
-def analyze_reusability(content, lines, tree):
-    """Analyze code reusability and DRY principles."""
-    score = 15  # Start with full score
-    recommendations = []
-    
-    # Check for repeated code blocks
-    code_blocks = []
-    current_block = []
-    for line in lines:
-        stripped = line.strip()
-        if stripped and not stripped.startswith('#'):
-            current_block.append(stripped)
-        elif current_block:
-            if len(current_block) >= 3:  # Only consider blocks of 3+ lines
-                code_blocks.append('\n'.join(current_block))
-            current_block = []
-    
-    # Add the last block if there is one
-    if current_block and len(current_block) >= 3:
-        code_blocks.append('\n'.join(current_block))
-    
-    # Check for duplicated blocks
-    seen_blocks = set()
-    duplicated_blocks = []
-    
-    for block in code_blocks:
-        if block in seen_blocks and len(block.split('\n')) >= 3:
-            duplicated_blocks.append(block)
-        seen_blocks.add(block)
-    
+# Reusability and DRY (15 points)
+
+@rule(LANGUAGE, "reusability", "duplicate_blocks", points=7, needs=[STATS])
+def check_duplicate_blocks(facts, stats):
+    """No block of 3+ lines is repeated."""
+    duplicated_blocks = stats.duplicate_blocks(min_lines=3)
     if duplicated_blocks:
-        score -= min(7, len(duplicated_blocks) * 2)
-        recommendations.append("Extract repeated code blocks into reusable functions")
-    
-    # Check for magic numbers
-    magic_numbers = re.findall(r'[^_a-zA-Z0-9](\d+)[^_a-zA-Z0-9]', content)
-    magic_numbers = [num for num in magic_numbers if num not in ['0', '1', '2']]
-    
-    if len(magic_numbers) > 5:
-        score -= min(4, (len(magic_numbers) - 5) // 2)
-        recommendations.append("Replace magic numbers with named constants")
-    
-    # Check for utility functions and helper classes
-    if len(lines) > 100 and len(re.findall(r'def\s+[a-zA-Z0-9_]+\s*\(', content)) < 3:
-        score -= 4
-        recommendations.append("Create utility functions for common operations")
-    
-    return max(0, score), recommendations
-
-def analyze_best_practices(content, lines):
-    """Analyze adherence to web development best practices."""
-    score = 20  # Start with full score
-    recommendations = []
-    
-    # Check for FastAPI-specific best practices if it seems to be a FastAPI file
-    is_fastapi = 'from fastapi import' in content or 'import fastapi' in content
-    
-    if is_fastapi:
-        # Check for proper path parameters
-        path_params = re.findall(r'@\w+\.(?:get|post|put|delete)\s*\(["\']{1}([^"\']*\{[^}]*\}[^"\']*)["\']', content)
-        
-        missing_type_path_params = []
-        for path in path_params:
-            params = re.findall(r'\{([^}:]*)\}', path)
-            params_with_type = re.findall(r'\{([^}:]*:[^}]*)\}', path)
-            
-            if len(params) > len(params_with_type):
-                missing_type_path_params.append(path)
-        
-        if missing_type_path_params:
-            score -= min(4, len(missing_type_path_params) * 2)
-            recommendations.append("Add type hints to path parameters in FastAPI routes")
-        
-        # Check for response_model usage
-        if 'def' in content and '@app.' in content and 'response_model=' not in content:
-            score -= 3
-            recommendations.append("Use response_model parameter in FastAPI route decorators for better API documentation")
-    
-    # Check for print statements
-    print_statements = re.findall(r'print\s*\(', content)
-    if print_statements:
-        score -= min(3, len(print_statements))
-        recommendations.append("Replace print statements with proper logging")
-    
-    # Check for exception handling
-    try_blocks = re.findall(r'try\s*:', content)
-    except_blocks = re.findall(r'except\s+', content)
-    
-    if try_blocks and not except_blocks:
-        score -= 3
-        recommendations.append("Add proper exception handling (except blocks) after try statements")
-    
-    # Check for bare except clauses
-    bare_excepts = re.findall(r'except\s*:', content)
-    if bare_excepts:
-        score -= 3
-        recommendations.append("Avoid bare 'except:' clauses; catch specific exceptions")
-    
-    # Check for wildcard imports
-    wildcard_imports = re.findall(r'from\s+[a-zA-Z0-9_.]+\s+import\s+\*', content)
-    if wildcard_imports:
-        score -= 2
-        recommendations.append("Avoid wildcard imports (from module import *)")
-    
-    # Check for proper type hints in Python 3
-    function_defs = re.findall(r'def\s+[a-zA-Z0-9_]+\s*\(([^)]*)\)(?:\s*->.*?)?:', content)
-    functions_with_hints = re.findall(r'def\s+[a-zA-Z0-9_]+\s*\([^)]*\)\s*->', content)
-    
-    if function_defs and len(functions_with_hints) < len(function_defs) / 2:
-        score -= 3
-        recommendations.append("Add return type hints to functions")
-    
-    # Check for properly annotated arguments
-    param_annotations = sum(param.strip().count(':') for param in function_defs if param.strip())
-    total_params = sum(len(re.findall(r'[a-zA-Z0-9_]+', param)) for param in function_defs if param.strip())
-    
-    if total_params > 5 and param_annotations < total_params / 2:
-        score -= 2
-        recommendations.append("Add type annotations to function parameters")
-    
-    return max(0, score), recommendations 
\ No newline at end of file
+        return duplicated_blocks * 2, "Extract repeated code blocks into reusable functions"
+
+@rule(LANGUAGE, "reusability", "magic_numbers", points=4, needs=["magic_numbers"])
+def check_magic_numbers(facts, stats):
+    """At most 5 magic numbers appear outside named constants."""
+    if facts.magic_numbers > 5:
+        return (facts.magic_numbers - 5) // 2, "Replace magic numbers with named constants"
+
+@rule(LANGUAGE, "reusability", "utility_functions", points=4, needs=["definitions", STATS])
+def check_utility_functions(facts, stats):
+    """Files over 100 lines define at least 3 functions."""
+    if stats.line_count > 100 and facts.function_count < 3:
+        return 4, "Create utility functions for common operations"
+
+# Web development best practices (20 points)
+
+@rule(LANGUAGE, "best_practices", "typed_path_parameters", points=4, needs=["fastapi"])
+def check_typed_path_parameters(facts, stats):
+    """FastAPI path parameters have type hints."""
+    if facts.is_fastapi and facts.untyped_path_routes:
+        return facts.untyped_path_routes * 2, "Add type hints to path parameters in FastAPI routes"
+
+@rule(LANGUAGE, "best_practices", "response_model", points=3, needs=["fastapi"])
+def check_response_model(facts, stats):
+    """FastAPI routes declare a response_model."""
+    if facts.is_fastapi and facts.missing_response_model:
+        return 3, "Use response_model parameter in FastAPI route decorators for better API documentation"
+
+@rule(LANGUAGE, "best_practices", "print_statements", points=3, needs=["print_calls"])
+def check_print_statements(facts, stats):
+    """Logging is used instead of print()."""
+    if facts.print_calls:
+        return facts.print_calls, "Replace print statements with proper logging"
+
+@rule(LANGUAGE, "best_practices", "exception_handling", points=3, needs=["exceptions"])
+def check_exception_handling(facts, stats):
+    """try statements have except blocks."""
+    if facts.try_blocks and not facts.except_blocks:
+        return 3, "Add proper exception handling (except blocks) after try statements"
+
+@rule(LANGUAGE, "best_practices", "bare_except", points=3, needs=["exceptions"])
+def check_bare_except(facts, stats):
+    """No bare 'except:' clauses."""
+    if facts.bare_excepts:
+        return 3, "Avoid bare 'except:' clauses; catch specific exceptions"
+
+@rule(LANGUAGE, "best_practices", "wildcard_imports", points=2, needs=["wildcard_imports"])
+def check_wildcard_imports(facts, stats):
+    """No wildcard imports."""
+    if facts.wildcard_imports:
+        return 2, "Avoid wildcard imports (from module import *)"
+
+@rule(LANGUAGE, "best_practices", "return_type_hints", points=3, needs=["functions"])
+def check_return_type_hints(facts, stats):
+    """At least half of the functions have return type hints."""
+    if facts.signature_count and facts.functions_with_return_hints < facts.signature_count / 2:
+        return 3, "Add return type hints to functions"
+
+@rule(LANGUAGE, "best_practices", "parameter_annotations", points=2, needs=["functions"])
+def check_parameter_annotations(facts, stats):
+    """At least half of the parameters have type annotations."""
+    if facts.total_params > 5 and facts.annotated_params < facts.total_params / 2:
+        return 2, "Add type annotations to function parameters"
@@ -0,0 +1,585 @@
+import ast
+import re
+from dataclasses import dataclass, field
+from .scanning import CharFinder, cut_summary as summarize_cut, join_pieces as join_chunks, piece_starts as find_piece_starts
+
+# The facts are the matches of the original analyzer's patterns (see
+# legacy/py_analyzer.py), counted exactly as it counts them, so both
+# engines score every file the same. What changed is how they are found:
+# each pattern runs once, line-based checks read LineStats, and nothing
+# is searched once per match. Patterns whose retries would scan the same
+# text again and again (a long identifier, parameters without a ")") are
+# rewritten to match from where a match can start only, or replaced by
+# equivalent scans below.
+
+CAMEL_CASE_VARS = re.compile(r'([a-z]+[A-Z][a-zA-Z0-9]*)\s*=')
+PASCAL_CASE_VARS = re.compile(r'([A-Z][a-z]+[A-Za-z0-9]*)\s*=')
+# Both variable patterns can only match the tail of a run of letters and
+# digits with an uppercase letter in it, followed by "\s*=". Such runs are
+# found from their first character only, and the tail is looked for in
+# the run: retried from each of its characters, the patterns would scan
+# the rest of the run every time.
+ASSIGNED_WORDS = re.compile(r'(?<![a-zA-Z0-9])[a-z0-9]*[A-Z][a-zA-Z0-9]*(?=\s*=)')
+CAMEL_CASE_TAIL = re.compile(r'(?<![a-z])[a-z]+[A-Z]')
+PASCAL_CASE_TAIL = re.compile(r'[A-Z][a-z]')
+CAMEL_CASE_FUNCS = re.compile(r'def\s+([a-z]+[A-Z][a-zA-Z0-9]*)\s*\(')
+PASCAL_CASE_FUNCS = re.compile(r'def\s+([A-Z][a-z]+[a-zA-Z0-9]*)\s*\(')
+
+# Assignments of literals, and the names assigned at the start of a line;
+# an assignment only counts as a constant if its name is in both
+CONSTANT_ASSIGNMENTS = re.compile(r'([a-z][A-Za-z0-9_]*)\s*=\s*(?:True|False|None|[\'"]{1,3}[^\'"]*[\'"]{1,3}|\d+)')
+LINE_START_ASSIGNMENTS = re.compile(r'^([a-z][A-Za-z0-9_]*)\s*=', re.MULTILINE)
+# A constant assignment is the tail of a run of name characters, from its
+# first lowercase letter, followed by the literal; as with the variables,
+# the runs are found from their first character only
+LITERAL_ASSIGNMENT = re.compile(r'\s*=\s*(?:True|False|None|[\'"]{1,3}[^\'"]*[\'"]{1,3}|\d+)')
+ASSIGNED_NAMES = re.compile(r'(?<![A-Za-z0-9_])[A-Za-z0-9_]+(?=' + LITERAL_ASSIGNMENT.pattern + ')')
+LOWERCASE = re.compile(r'[a-z]')
+
+NON_PASCAL_CLASSES = re.compile(r'class\s+([a-z][a-zA-Z0-9_]*)\s*[:\(]')
+
+# A function's body runs over the indented lines after its signature (and
+# over blank lines into the line after them)
+FUNCTION_BLOCKS = re.compile(r'def\s+[a-zA-Z0-9_]+\s*\([^)]*\)(?:\s*->.*?)?\s*:\s*((?:\n\s+.*)+)')
+MANY_ARGS = re.compile(r'def\s+([a-zA-Z0-9_]+)\s*\(([^)]{40,})\)')
+FUNCTIONS = re.compile(r'def\s+[a-zA-Z0-9_]+\s*\(')
+CLASSES = re.compile(r'class\s+[a-zA-Z0-9_]+')
+
+# The function patterns (FUNCTION_BLOCKS, MANY_ARGS, FUNCTION_SIGNATURES,
+# RETURN_HINTS) all start with a FUNCTIONS match and run to the first ")"
+# after it; the rest of each is matched from that ")" (see
+# _collect_functions()), once for all the signatures that share it
+RETURN_ARROW = re.compile(r'\s*->')
+FUNCTION_BODY = re.compile(r'(?:\n\s+.*)+')
+NON_SPACE = re.compile(r'\S')
+
+DOCSTRINGS = re.compile(r'"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'')
+MODULE_DOCSTRING = re.compile(r'\s*(?:"""|\'\'\')')
+# Commented-out code, matched from the start of the comment's own line:
+# "^\s*#" only matches where that line starts with "#", but retried at
+# every line of a run of blank lines it would scan the run each time
+COMMENTED_CODE = re.compile(r'^[^\S\n]*#\s*(def|class|if|for|while|return|import)', re.MULTILINE)
+
+MAGIC_NUMBERS = re.compile(r'[^_a-zA-Z0-9](\d+)[^_a-zA-Z0-9]')
+
+# Numbers that are too common to count as magic numbers
+TRIVIAL_NUMBERS = {'0', '1', '2'}
+
+# FastAPI route paths with parameters, e.g. "/items/{item_id}", as matched
+# by ROUTE_PATHS; the path is found after the opening quote by _route_path_end()
+ROUTE_PATHS = re.compile(r'@\w+\.(?:get|post|put|delete)\s*\(["\']{1}([^"\']*\{[^}]*\}[^"\']*)["\']')
+ROUTE_OPENINGS = re.compile(r'@\w+\.(?:get|post|put|delete)\s*\(["\']')
+QUOTES = re.compile(r'["\']')
+# The parameters in a path with and without a type, counted as
+# r'\{([^}:]*)\}' and r'\{([^}:]*:[^}]*)\}' count them. Either can only end
+# at the first "}" or ":" after its "{", so a match may as well start at
+# the last "{" before that, instead of being retried from every "{" up to
+# it; typed parameters are only looked for up to the last "}".
+PATH_PARAMS = re.compile(r'\{[^{}:]*\}')
+TYPED_PATH_PARAMS = re.compile(r'\{[^{}:]*:[^}]*\}')
+
+PRINT_CALLS = re.compile(r'print\s*\(')
+TRY_BLOCKS = re.compile(r'try\s*:')
+EXCEPT_BLOCKS = re.compile(r'except\s+')
+BARE_EXCEPTS = re.compile(r'except\s*:')
+WILDCARD_IMPORTS = re.compile(r'from\s+[a-zA-Z0-9_.]+\s+import\s+\*')
+
+# Signatures (their parameter lists) and signatures with a return type
+FUNCTION_SIGNATURES = re.compile(r'def\s+[a-zA-Z0-9_]+\s*\(([^)]*)\)(?:\s*->.*?)?:')
+RETURN_HINTS = re.compile(r'def\s+[a-zA-Z0-9_]+\s*\([^)]*\)\s*->')
+PARAM_WORDS = re.compile(r'[a-zA-Z0-9_]+')
+
+@dataclass
+class PythonFacts:
+    """Everything the Python category checks need, collected group by group (see FACT_GROUPS)."""
+    parsed: bool = False
+
+    # Naming
+    camel_case_vars: list = field(default_factory=list)
+    pascal_case_vars: list = field(default_factory=list)
+    camel_case_funcs: list = field(default_factory=list)
+    pascal_case_funcs: list = field(default_factory=list)
+    non_upper_constants: int = 0
+    non_pascal_classes: int = 0
+
+    # Structure
+    function_count: int = 0
+    class_count: int = 0
+    function_lengths: list = field(default_factory=list)
+    many_args_functions: int = 0
+
+    # Documentation
+    has_module_docstring: bool = False
+    docstring_count: int = 0
+    commented_code: int = 0
+
+    # Literals
+    single_quotes: int = 0
+    double_quotes: int = 0
+    magic_numbers: int = 0
+
+    # Best practices
+    is_fastapi: bool = False
+    missing_response_model: bool = False
+    untyped_path_routes: int = 0
+    print_calls: int = 0
+    try_blocks: int = 0
+    except_blocks: int = 0
+    bare_excepts: int = 0
+    wildcard_imports: int = 0
+    signature_count: int = 0
+    functions_with_return_hints: int = 0
+    total_params: int = 0
+    annotated_params: int = 0
+
+# Lines that may start a top-level statement, and so a new chunk of the
+# text to parse. A chunk only becomes a separate piece if the text before
+# it parses on its own, so a false start (e.g. inside a multi-line string)
+# only costs a merge.
+STATEMENT_START = re.compile(r'^(?!(?:else|elif|except|finally)\b)[^\s#)\]}]', re.MULTILINE)
+
+def parses(content):
+    """
+    Check whether content is valid Python syntax, as ast.parse() decides.
+
+    The content is parsed piece by piece (see parses_pieces()), so only the
+    syntax tree of one piece is held at a time.
+    """
+    return parses_pieces(statement_chunks(content))
+
+def statement_chunks(content):
+    """Split content into chunks, each starting where a statement may start."""
+    starts = [match.start() for match in STATEMENT_START.finditer(content, 1)]
+    return [content[start:end] for start, end in zip([0] + starts, starts + [len(content)])]
+
+def parses_pieces(chunks, parse_piece=None):
+    """
+    Check whether the text of the chunks parses, piece by piece.
+
+    A piece starts as one chunk and doubles in size until it parses, or it
+    reaches the end of the text. When every piece parses so does the text,
+    and when the last one does not, neither does the text.
+
+    Args:
+        chunks (list): The text, split where statements may start
+        parse_piece (callable): Checks whether the text of one piece
+            parses, parses_piece() by default
+
+    Returns:
+        bool: Whether the text parses
+    """
+    parse_piece = parse_piece or parses_piece
+    index = 0
+    parsed = True
+    while index < len(chunks):
+        size = 1
+        while True:
+            end = min(index + size, len(chunks))
+            parsed = parse_piece(''.join(chunks[index:end]))
+            if parsed or end == len(chunks):
+                break
+            size *= 2
+        index = end
+    return parsed
+
+def parses_piece(text):
+    """Check whether text parses on its own, with ast.parse()."""
+    try:
+        ast.parse(text)
+    except SyntaxError:
+        return False
+    return True
+
+def collect_facts(content, groups=None):
+    """
+    Collect the facts used by the Python category checks.
+
+    Whether the source parses is left for the caller to fill in as
+    "parsed" (see parses()), as it can be decided piece by piece.
+
+    Args:
+        content (str): Source code
+        groups (iterable): Names of the fact groups to collect (keys of
+            FACT_GROUPS), or None for all of them; the facts of the other
+            groups keep their defaults
+
+    Returns:
+        PythonFacts: Collected facts
+
+    Raises:
+        KeyError: If a group is unknown
+    """
+    facts = PythonFacts()
+    for group in FACT_GROUPS if groups is None else groups:
+        FACT_GROUPS[group](content, facts)
+    return facts
+
+def _count(pattern, content):
+    return sum(1 for _ in pattern.finditer(content))
+
+def _collect_variable_names(content, facts):
+    facts.camel_case_vars, facts.pascal_case_vars = _variable_names(content)
+
+def _variable_names(content):
+    camel_case_vars = []
+    pascal_case_vars = []
+    for match in ASSIGNED_WORDS.finditer(content):
+        start, end = match.span()
+        camel = CAMEL_CASE_TAIL.search(content, start, end)
+        if camel is not None:
+            camel_case_vars.append(content[camel.start():end])
+        pascal = PASCAL_CASE_TAIL.search(content, start, end)
+        if pascal is not None:
+            pascal_case_vars.append(content[pascal.start():end])
+    return camel_case_vars, pascal_case_vars
+
+def _merge_variable_names(pieces, facts):
+    facts.camel_case_vars = [name for camel_case_vars, _ in pieces for name in camel_case_vars]
+    facts.pascal_case_vars = [name for _, pascal_case_vars in pieces for name in pascal_case_vars]
+
+def _collect_function_names(content, facts):
+    facts.camel_case_funcs = CAMEL_CASE_FUNCS.findall(content)
+    facts.pascal_case_funcs = PASCAL_CASE_FUNCS.findall(content)
+
+def _collect_constants(content, facts):
+    _merge_constants([_constants(content)], facts)
+
+def _constants(content):
+    return _constant_names(content), set(LINE_START_ASSIGNMENTS.findall(content))
+
+def _merge_constants(pieces, facts):
+    # Constants are literals assigned to a name that is also assigned at
+    # module level (at the start of a line) anywhere in the text; such
+    # names start lowercase, so none of them is UPPERCASE
+    assigned = set().union(*(line_start_names for _, line_start_names in pieces))
+    facts.non_upper_constants = sum(1 for names, _ in pieces for name in names if name in assigned)
+
+def _collect_class_names(content, facts):
+    facts.non_pascal_classes = _count(NON_PASCAL_CLASSES, content)
+
+def _constant_names(content):
+    """The names matched by CONSTANT_ASSIGNMENTS, in order."""
+    names = []
+    # Where the previous match ended; a run may start inside it
+    position = 0
+    for match in ASSIGNED_NAMES.finditer(content):
+        start, end = match.span()
+        if end <= position:
+            continue
+        first = LOWERCASE.search(content, max(start, position), end)
+        if first is None:
+            continue
+        names.append(content[first.start():end])
+        position = LITERAL_ASSIGNMENT.match(content, end).end()
+    return names
+
+def _collect_definitions(content, facts):
+    facts.function_count = _count(FUNCTIONS, content)
+    facts.class_count = _count(CLASSES, content)
+
+def _collect_module_docstring(content, facts):
+    facts.has_module_docstring = MODULE_DOCSTRING.match(content) is not None
+
+def _collect_docstrings(content, facts):
+    facts.docstring_count = _count(DOCSTRINGS, content)
+
+def _collect_commented_code(content, facts):
+    facts.commented_code = _count_commented_code(content)
+
+def _count_commented_code(content):
+    return _count(COMMENTED_CODE, content)
+
+def _collect_functions(content, facts):
+    """
+    Match FUNCTION_BLOCKS, MANY_ARGS, FUNCTION_SIGNATURES and RETURN_HINTS
+    from the FUNCTIONS matches.
+
+    Each pattern keeps its own position, where its previous match ended, as
+    findall() would, and what follows a ")" is worked out once for all the
+    signatures before it. Where the text has no ")" left, none of them can
+    match any more.
+    """
+    next_paren = CharFinder(content, ')')
+    next_colon = CharFinder(content, ':')
+    next_line_break = CharFinder(content, '\n')
+    bodies = {}
+    lines = {}
+
+    function_lengths = []
+    signatures = []
+    many_args = hints = 0
+    many_args_position = hint_position = signature_position = block_position = 0
+    close = -1
+    for match in FUNCTIONS.finditer(content):
+        start, opened = match.span()
+        if opened > close:
+            close = next_paren(opened)
+            if close < 0:
+                break
+            arrow = RETURN_ARROW.match(content, close + 1)
+            line_end = body = None
+            if arrow is not None:
+                line_end = next_line_break(arrow.end())
+                if line_end < 0:
+                    line_end = len(content)
+
+        if start >= many_args_position and close - opened >= 40:
+            many_args += 1
+            many_args_position = close + 1
+        if start >= hint_position and arrow is not None:
+            hints += 1
+            hint_position = arrow.end()
+
+        if start >= signature_position:
+            # r'\)(?:\s*->.*?)?:' ends at the first ":" on the arrow's line,
+            # or else right after the ")"
+            if arrow is not None:
+                colon = next_colon(arrow.end())
+                if 0 <= colon < line_end:
+                    signatures.append(content[opened:close])
+                    signature_position = colon + 1
+            elif content.startswith(':', close + 1):
+                signatures.append(content[opened:close])
+                signature_position = close + 2
+
+        if start >= block_position:
+            if body is None:
+                body = _function_body(content, close, arrow, line_end, bodies, lines) or ()
+            if body:
+                function_lengths.append(content.count('\n', *body) + 1)
+                block_position = body[1]
+
+    facts.function_lengths = function_lengths
+    facts.many_args_functions = many_args
+    facts.functions_with_return_hints = hints
+    facts.signature_count = len(signatures)
+    facts.annotated_params = sum(params.count(':') for params in signatures)
+    facts.total_params = sum(len(PARAM_WORDS.findall(params)) for params in signatures)
+
+def _function_body(content, close, arrow, line_end, bodies, lines):
+    """
+    The span of FUNCTION_BLOCKS' body group after the ")" at close, or None.
+
+    r'(?:\s*->.*?)?\s*:' can only be followed by a body at a ":" that ends
+    its line, and the arrow's ".*?" reaches the last character of its line
+    (if that is not blank) and the first one after it, in that order; with
+    no arrow, the ":" is the first character after the ")".
+    """
+    if arrow is None:
+        colons = [NON_SPACE.search(content, close + 1)]
+    else:
+        if line_end not in lines:
+            line_start = content.rfind('\n', 0, line_end) + 1
+            last = line_start + len(content[line_start:line_end].rstrip()) - 1
+            lines[line_end] = (last, NON_SPACE.search(content, line_end))
+        last, following = lines[line_end]
+        colons = [following]
+        if last >= arrow.end():
+            colons.insert(0, NON_SPACE.search(content, last))
+    for colon in colons:
+        if colon is None or colon.group() != ':':
+            continue
+        position = colon.start()
+        if position not in bodies:
+            bodies[position] = _body_after(content, position)
+        if bodies[position] is not None:
+            return bodies[position]
+    return None
+
+def _body_after(content, colon):
+    """
+    The span of r'\s*((?:\n\s+.*)+)' matched after the ":" at colon, or None.
+
+    The greedy "\s*" gives the body the last line break of the whitespace
+    after the ":" that is followed by more whitespace.
+    """
+    following = NON_SPACE.search(content, colon + 1)
+    end = following.start() if following is not None else len(content)
+    line_break = content.rfind('\n', colon + 1, end - 1)
+    if line_break < 0:
+        return None
+    return FUNCTION_BODY.match(content, line_break).span()
+
+def _collect_quotes(content, facts):
+    # Quoted strings are matched in pairs of quote characters
+    facts.single_quotes = content.count("'") // 2
+    facts.double_quotes = content.count('"') // 2
+
+def _collect_magic_numbers(content, facts):
+    facts.magic_numbers = _count_magic_numbers(content)
+
+def _count_magic_numbers(content):
+    return sum(1 for number in MAGIC_NUMBERS.findall(content) if number not in TRIVIAL_NUMBERS)
+
+def _collect_fastapi(content, facts):
+    facts.is_fastapi = 'from fastapi import' in content or 'import fastapi' in content
+    if facts.is_fastapi:
+        facts.missing_response_model = 'def' in content and '@app.' in content and 'response_model=' not in content
+        facts.untyped_path_routes = sum(
+            1 for path in _route_paths(content)
+            if _count(PATH_PARAMS, path) > len(TYPED_PATH_PARAMS.findall(path, 0, path.rfind('}') + 1))
+        )
+
+def _collect_print_calls(content, facts):
+    facts.print_calls = _count(PRINT_CALLS, content)
+
+def _collect_exceptions(content, facts):
+    facts.try_blocks = _count(TRY_BLOCKS, content)
+    facts.except_blocks = _count(EXCEPT_BLOCKS, content)
+    facts.bare_excepts = _count(BARE_EXCEPTS, content)
+
+def _collect_wildcard_imports(content, facts):
+    facts.wildcard_imports = _count(WILDCARD_IMPORTS, content)
+
+def _route_paths(content):
+    """The paths matched by ROUTE_PATHS, in order."""
+    paths = []
+    position = 0
+    while True:
+        opening = ROUTE_OPENINGS.search(content, position)
+        if opening is None:
+            return paths
+        end = _route_path_end(content, opening.end())
+        if end is None:
+            position = opening.start() + 1
+        else:
+            paths.append(content[opening.end():end])
+            position = end + 1
+
+def _route_path_end(content, start):
+    """
+    Where r'[^"\']*\{[^}]*\}[^"\']*["\']' matched from start ends its path,
+    or None.
+
+    The "{" is tried from the last one before the first quote backwards;
+    for each, the first "}" after it and the first quote after that are
+    only looked for up to the ones found for the "{" tried before.
+    """
+    quote = QUOTES.search(content, start)
+    brace = content.rfind('{', start, quote.start() if quote is not None else len(content))
+    close = end = None
+    while brace >= 0:
+        if close is None:
+            close = content.find('}', brace + 1)
+            end = QUOTES.search(content, close + 1) if close >= 0 else None
+        else:
+            nearer = content.find('}', brace + 1, previous)
+            if nearer >= 0:
+                limit = close + 1 if close >= 0 else len(content)
+                close = nearer
+                end = QUOTES.search(content, close + 1, limit) or end
+        if close >= 0 and end is not None:
+            return end.start()
+        previous = brace
+        brace = content.rfind('{', start, brace)
+    return None
+
+# The facts in groups, each collected on its own by its function: rules
+# name the groups they read, so an analysis only matches the patterns of
+# the groups its selected rules need
+FACT_GROUPS = {
+    'variable_names': _collect_variable_names,
+    'function_names': _collect_function_names,
+    'constants': _collect_constants,
+    'class_names': _collect_class_names,
+    'definitions': _collect_definitions,
+    # Lengths, parameter lists and return hints, from one scan of the signatures
+    'functions': _collect_functions,
+    'module_docstring': _collect_module_docstring,
+    'docstrings': _collect_docstrings,
+    'commented_code': _collect_commented_code,
+    'quotes': _collect_quotes,
+    'magic_numbers': _collect_magic_numbers,
+    'fastapi': _collect_fastapi,
+    'print_calls': _collect_print_calls,
+    'exceptions': _collect_exceptions,
+    'wildcard_imports': _collect_wildcard_imports,
+}
+
+def _summed(name):
+    """Merge function of a piecewise group that counts one fact."""
+    def merge(pieces, facts):
+        setattr(facts, name, sum(pieces))
+    return merge
+
+# The costliest groups can also be collected piece by piece, for text cut
+# into pieces by join_pieces(), and merged (see IncrementalDocument): the
+# function collects the part of the facts of one piece (counts, names)
+# that the merge function adds up into the facts of the whole text
+PIECEWISE_GROUPS = {
+    'variable_names': (_variable_names, _merge_variable_names),
+    'constants': (_constants, _merge_constants),
+    'magic_numbers': (_count_magic_numbers, _summed('magic_numbers')),
+    'commented_code': (_count_commented_code, _summed('commented_code')),
+}
+
+# Last characters of a chunk after which a match of the piecewise groups'
+# patterns could run on into the next chunk: a comment sign before
+# commented-out code on the next line, or the "=" of a constant's literal
+OPEN_ENDINGS = ('#', '=')
+LITERAL_QUOTES = '\'"'
+
+def _continues(head):
+    # An "=" after a variable name, or a magic number after a line break
+    return head == '=' or head.isdigit()
+
+def cut_summary(content):
+    """What piece_starts() needs to know about a chunk (see scanning.cut_summary())."""
+    return summarize_cut(content, LITERAL_QUOTES)
+
+def piece_starts(summaries):
+    """
+    Find the chunks that start a piece PIECEWISE_GROUPS can be collected
+    from on its own.
+
+    The chunks must start with a character other than whitespace or "#"
+    (see incremental.CHUNK_START). A match of the piecewise groups'
+    patterns can then only run across a cut after an open ending
+    (OPEN_ENDINGS), after the opening quotes of a constant's literal, or
+    into a chunk that starts with an "=" or a digit.
+
+    Args:
+        summaries (list): cut_summary() of each chunk, in order
+
+    Returns:
+        list: Indexes of the chunks that start a piece, from 0
+    """
+    return find_piece_starts(summaries, OPEN_ENDINGS, _continues)
+
+def join_pieces(chunks):
+    """
+    Join text cut into chunks into the pieces found by piece_starts().
+
+    Args:
+        chunks (list): The text in chunks, each ending with its line break
+            except the last
+
+    Returns:
+        list: The pieces, each one chunk or several joined, in order
+    """
+    return join_chunks(chunks, LITERAL_QUOTES, OPEN_ENDINGS, _continues)
+
+def collect_piece(content, groups):
+    """
+    Collect the parts of piecewise groups' facts found in one piece.
+
+    Args:
+        content (str): A piece from join_pieces()
+        groups (iterable): Keys of PIECEWISE_GROUPS
+
+    Returns:
+        dict: Group name to the piece's part of its facts
+    """
+    return {group: PIECEWISE_GROUPS[group][0](content) for group in groups}
+
+def merge_pieces(pieces, groups, facts):
+    """
+    Fill in the facts of piecewise groups from the parts of every piece.
+
+    Args:
+        pieces (list): collect_piece() of each piece of the text, in order
+        groups (iterable): Keys of PIECEWISE_GROUPS, collected in every piece
+        facts (PythonFacts): Facts of the whole text to fill in
+    """
+    for group in groups:
+        PIECEWISE_GROUPS[group][1]([piece[group] for piece in pieces], facts)
@@ -0,0 +1,286 @@
+import argparse
+import json
+import operator
+import os
+import sqlite3
+import sys
+from array import array
+from . import ANALYZER_VERSION
+
+# Positions in the totals of a node; category totals follow as
+# (weight, weighted sum) pairs, in the order of RollupTree.categories
+FILES, BYTES, SCORE = 0, 1, 2
+FIXED_TOTALS = 3
+
+class RollupTree:
+    """
+    Size-weighted score rollups for every directory of a source tree.
+
+    Every file and directory is a node with running totals: the number of
+    files, their bytes, and the byte-weighted sums of their overall and
+    category scores. Scores are integers, so the totals are exact integers
+    too, and a rollup is a weighted sum divided by its weight. Changing a
+    file adds the difference it makes to the totals of each directory on
+    its path to the root, and touches nothing else, so keeping the rollups
+    of a 100k-file tree current costs no more per changed file than the
+    depth of its path.
+
+    Nodes are kept in a SQLite snapshot, one row per node with its totals
+    packed as 64-bit integers, so a query reads one directory row and
+    never the results of the files below it.
+
+    Paths are '/'-separated; the root directory is ''.
+    """
+
+    def __init__(self, path=None):
+        self._db = _open_snapshot(path or ':memory:')
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'categories'").fetchone()
+        self.categories = json.loads(row[0]) if row else []
+        self._category_index = {name: index for index, name in enumerate(self.categories)}
+
+    def close(self):
+        self._db.close()
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM nodes WHERE file = 1").fetchone()[0]
+
+    def set(self, path, result, size):
+        """
+        Add a file's result, or replace the one it had.
+
+        Args:
+            path (str): File path
+            result (dict): Analysis result with "overall_score" and "breakdown"
+            size (int): File size in bytes; its weight in the rollups, at least 1
+
+        Returns:
+            bool: Whether the rollups changed
+        """
+        return self.update([(path, result, size)]) > 0
+
+    def remove(self, path):
+        """
+        Drop a file from the rollups.
+
+        Returns:
+            bool: Whether the file was there
+        """
+        return self.update([(path, None, 0)]) > 0
+
+    def update(self, changes):
+        """
+        Apply many file changes in one transaction.
+
+        Each directory is written once, however many of its files changed,
+        so building the rollups of a whole tree is a single pass.
+
+        Args:
+            changes (iterable): (path, result or None to remove the file, size)
+
+        Returns:
+            int: Files whose entry changed
+        """
+        categories = len(self.categories)
+        files = {}
+        deltas = {}
+        for path, result, size in changes:
+            path = normalize_path(path)
+            new = self._file_totals(result, size) if result is not None else None
+            old = files[path] if path in files else self._read(path, file=True)
+            if _same(old, new):
+                continue
+            files[path] = new
+            _add_into(deltas.setdefault(path.rpartition('/')[0], []), _subtract(new or [], old or []))
+
+        # Carry the changes up one level at a time, deepest directories first
+        for path in list(deltas):
+            while path:
+                path = path.rpartition('/')[0]
+                if path in deltas:
+                    break
+                deltas[path] = []
+        for path in sorted(deltas, key=lambda path: path.count('/') if path else -1, reverse=True):
+            if path:
+                _add_into(deltas[path.rpartition('/')[0]], deltas[path])
+
+        with self._db:
+            if len(self.categories) != categories:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('categories', ?)",
+                    (json.dumps(self.categories),),
+                )
+            for path, totals in files.items():
+                self._write(path, totals, file=True)
+            for path, delta in deltas.items():
+                totals = self._read(path) or []
+                _add_into(totals, delta)
+                self._write(path, totals if totals[FILES] else None)
+        return len(files)
+
+    def prune(self, roots, keep):
+        """
+        Drop the files under the given roots that are not in keep, e.g. the
+        files deleted since the last scan of those roots.
+
+        Returns:
+            int: Files dropped
+        """
+        roots = [normalize_path(root) for root in roots]
+        keep = {normalize_path(path) for path in keep}
+        stale = [
+            path for (path,) in self._db.execute("SELECT path FROM nodes WHERE file = 1")
+            if path not in keep and any(_within(path, root) for root in roots)
+        ]
+        return self.update((path, None, 0) for path in stale)
+
+    def rollup(self, path=''):
+        """
+        Rollup of a directory, or the scores of a single file.
+
+        Returns:
+            dict | None: Path, files, bytes, size-weighted overall_score and
+                breakdown, or None if nothing is known under the path
+        """
+        path = normalize_path(path)
+        row = self._db.execute("SELECT totals FROM nodes WHERE path = ?", (path,)).fetchone()
+        return self._summary(path, _unpack(row[0])) if row else None
+
+    def children(self, path=''):
+        """Rollups of the files and directories directly inside a directory."""
+        rows = self._db.execute(
+            "SELECT path, totals FROM nodes WHERE parent = ? ORDER BY path", (normalize_path(path),)
+        )
+        return [self._summary(child, _unpack(totals)) for child, totals in rows]
+
+    def _summary(self, path, totals):
+        breakdown = {}
+        for index, name in enumerate(self.categories):
+            position = FIXED_TOTALS + 2 * index
+            if position < len(totals) and totals[position]:
+                breakdown[name] = round(totals[position + 1] / totals[position], 1)
+        return {
+            "path": path,
+            "files": totals[FILES],
+            "bytes": totals[BYTES],
+            "overall_score": round(totals[SCORE] / totals[BYTES], 1),
+            "breakdown": breakdown,
+        }
+
+    def _file_totals(self, result, size):
+        """The totals a single file contributes to each of its directories."""
+        size = max(int(size), 1)
+        totals = [1, size, size * result["overall_score"]]
+        for name, score in result.get("breakdown", {}).items():
+            index = self._category_index.get(name)
+            if index is None:
+                index = self._category_index[name] = len(self.categories)
+                self.categories.append(name)
+            position = FIXED_TOTALS + 2 * index
+            if len(totals) <= position:
+                totals.extend([0] * (position + 2 - len(totals)))
+            totals[position] = size
+            totals[position + 1] = size * score
+        return totals
+
+    def _read(self, path, file=False):
+        row = self._db.execute(
+            "SELECT totals FROM nodes WHERE path = ? AND file = ?", (path, int(file))
+        ).fetchone()
+        return _unpack(row[0]) if row else None
+
+    def _write(self, path, totals, file=False):
+        if totals is None:
+            self._db.execute("DELETE FROM nodes WHERE path = ?", (path,))
+            return
+        parent = path.rpartition('/')[0] if path else None
+        self._db.execute(
+            "INSERT OR REPLACE INTO nodes (path, parent, file, totals) VALUES (?, ?, ?, ?)",
+            (path, parent, int(file), array('q', totals).tobytes()),
+        )
+
+def normalize_path(path):
+    """Turn a file system path into a '/'-separated tree path."""
+    parts = path.replace(os.sep, '/').split('/')
+    return '/'.join(part for part in parts if part not in ('', '.'))
+
+def _open_snapshot(path):
+    """Open (and if needed create) a rollup snapshot, emptying one from another analyzer version."""
+    db = sqlite3.connect(path)
+    with db:
+        db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS nodes ("
+            "path TEXT PRIMARY KEY, parent TEXT, file INTEGER NOT NULL, totals BLOB NOT NULL) WITHOUT ROWID"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS nodes_parent ON nodes (parent)")
+        row = db.execute("SELECT value FROM meta WHERE key = 'analyzer_version'").fetchone()
+        if row is None or row[0] != ANALYZER_VERSION:
+            db.execute("DELETE FROM nodes")
+            db.execute("DELETE FROM meta")
+            db.execute("INSERT INTO meta (key, value) VALUES ('analyzer_version', ?)", (ANALYZER_VERSION,))
+    return db
+
+def _within(path, root):
+    return not root or path == root or path.startswith(root + '/')
+
+def _unpack(blob):
+    return array('q', blob).tolist()
+
+def _add_into(totals, delta):
+    if len(totals) < len(delta):
+        totals.extend([0] * (len(delta) - len(totals)))
+    totals[:len(delta)] = map(operator.add, totals, delta)
+
+def _subtract(new, old):
+    difference = new + [0] * (len(old) - len(new))
+    for index, value in enumerate(old):
+        difference[index] -= value
+    return difference
+
+def _same(old, new):
+    if old is None or new is None:
+        return old is new
+    return not any(_subtract(new, old))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m app.analyzers.rollups',
+        description='Show size-weighted score rollups from a snapshot written by --rollup.',
+    )
+    parser.add_argument('snapshot', help='Snapshot file written by python -m app.analyzers --rollup')
+    parser.add_argument('path', nargs='?', default='', help='Directory or file to show (default: the root)')
+    parser.add_argument('--depth', type=int, default=1, help='Directory levels to list below the path (default: 1)')
+    parser.add_argument('--format', choices=['table', 'jsonl'], default='table',
+                        help='Output format (default: table)')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.snapshot):
+        print(f'error: no snapshot at {args.snapshot}', file=sys.stderr)
+        return 1
+    tree = RollupTree(args.snapshot)
+    top = tree.rollup(args.path)
+    if top is None:
+        print(f'error: no results under {args.path or "the root"}', file=sys.stderr)
+        return 1
+
+    rows = [(0, top)]
+    def walk(path, depth):
+        for child in tree.children(path):
+            rows.append((depth, child))
+            if depth < args.depth:
+                walk(child["path"], depth + 1)
+    if args.depth > 0:
+        walk(top["path"], 1)
+
+    if args.format == 'table':
+        sys.stdout.write(f"{'SCORE':>6}  {'FILES':>7}  PATH\n")
+    for depth, rollup in rows:
+        if args.format == 'jsonl':
+            sys.stdout.write(json.dumps(rollup) + '\n')
+        else:
+            name = rollup["path"] or '.'
+            sys.stdout.write(f"{rollup['overall_score']:>6}  {rollup['files']:>7}  {'  ' * depth}{name}\n")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
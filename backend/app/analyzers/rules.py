@@ -0,0 +1,171 @@
+from dataclasses import dataclass
+from collections.abc import Callable
+
+# Points available in each category, in report order
+CATEGORY_POINTS = {
+    "naming": 10,
+    "modularity": 20,
+    "comments": 20,
+    "formatting": 15,
+    "reusability": 15,
+    "best_practices": 20,
+}
+
+# Inputs a rule can need; the analyzers only compute the ones selected
+# rules use. Besides STATS, a rule names the groups of facts it reads (the
+# keys of FACT_GROUPS in py_facts.py and js_facts.py), each matched over
+# the whole text by its own patterns.
+STATS = "stats"  # LineStats table
+# Whether the text parses (Python). No rule reads it, but a full analysis
+# recommends fixing syntax errors, so required_inputs() adds it then.
+SYNTAX = "syntax"
+
+@dataclass(frozen=True)
+class Rule:
+    """One registered check: a deduction of up to points in a category."""
+
+    id: str
+    language: str
+    category: str
+    points: int
+    needs: frozenset
+    check: Callable
+    description: str
+
+# language -> rule id -> Rule, in registration (and so report) order
+RULES = {}
+
+def rule(language, category, name, points, needs):
+    """
+    Register a check function as a rule.
+
+    The check is called as check(facts, stats) and returns None when the
+    code passes, or a (deduction, recommendation) tuple. Deductions are
+    capped at points.
+
+    Args:
+        language (str): 'python' or 'javascript'
+        category (str): Key of CATEGORY_POINTS
+        name (str): Rule name, unique within the category
+        points (int): Most points the rule can deduct
+        needs (tuple): Inputs the check reads: STATS and the names of
+            the fact groups of the language
+
+    Returns:
+        function: Decorator that registers the check and returns it unchanged
+    """
+    def register(check):
+        rule_id = f"{category}.{name}"
+        RULES.setdefault(language, {})[rule_id] = Rule(
+            id=rule_id,
+            language=language,
+            category=category,
+            points=points,
+            needs=frozenset(needs),
+            check=check,
+            description=(check.__doc__ or "").strip(),
+        )
+        return check
+    return register
+
+def select_rules(language, categories=None, rule_ids=None):
+    """
+    Pick the rules to run for one analysis.
+
+    Args:
+        language (str): 'python' or 'javascript'
+        categories (iterable): Categories to run, or None for all
+        rule_ids (iterable): Rule ids to run, or None for all in the categories
+
+    Returns:
+        list: Selected Rule objects in report order
+
+    Raises:
+        ValueError: If a category or rule id is unknown for the language
+    """
+    registered = RULES.get(language, {})
+    if categories is not None:
+        categories = set(categories)
+        unknown = categories - CATEGORY_POINTS.keys()
+        if unknown:
+            raise ValueError(f"Unknown categories: {', '.join(sorted(unknown))}")
+    if rule_ids is not None:
+        rule_ids = set(rule_ids)
+        unknown = rule_ids - registered.keys()
+        if unknown:
+            raise ValueError(f"Unknown {language} rules: {', '.join(sorted(unknown))}")
+
+    return [
+        registered_rule for registered_rule in registered.values()
+        if (categories is None or registered_rule.category in categories)
+        and (rule_ids is None or registered_rule.id in rule_ids)
+    ]
+
+def required_inputs(rules):
+    """
+    Union of the inputs the given rules need, with SYNTAX when they are
+    every rule of their language.
+    """
+    needs = set()
+    for selected in rules:
+        needs |= selected.needs
+    if rules and len(rules) == len(RULES[rules[0].language]):
+        needs.add(SYNTAX)
+    return needs
+
+def fact_groups(needs):
+    """The fact groups among inputs from required_inputs()."""
+    return needs - {STATS, SYNTAX}
+
+def run_rules(rules, facts, stats, timer=None):
+    """
+    Run rules and score the categories they belong to.
+
+    Args:
+        rules (list): Rules from select_rules()
+        facts: Language facts object
+        stats (LineStats | None): Line statistics
+        timer (PhaseTimer | None): Lapped once per category when given
+
+    Returns:
+        tuple: (scores by category in report order, recommendations)
+    """
+    scores = {}
+    recommendations = []
+    for category, points in CATEGORY_POINTS.items():
+        category_rules = [selected for selected in rules if selected.category == category]
+        if not category_rules:
+            continue
+
+        score, category_recommendations = run_category(category_rules, points, facts, stats)
+        scores[category] = score
+        recommendations.extend(category_recommendations)
+        if timer is not None:
+            timer.lap(category)
+    return scores, recommendations
+
+def run_category(rules, points, facts, stats):
+    """Score one category: its points minus the capped rule deductions."""
+    score = points
+    recommendations = []
+    for selected in rules:
+        finding = selected.check(facts, stats)
+        if finding is not None:
+            deduction, recommendation = finding
+            score -= min(selected.points, deduction)
+            recommendations.append(recommendation)
+    return max(0, score), recommendations
+
+def describe_rules():
+    """All registered rules as JSON-ready dicts, for the /rules endpoint."""
+    return [
+        {
+            "id": registered_rule.id,
+            "language": registered_rule.language,
+            "category": registered_rule.category,
+            "points": registered_rule.points,
+            "description": registered_rule.description,
+        }
+        for language_rules in RULES.values()
+        for registered_rule in language_rules.values()
+    ]
@@ -0,0 +1,109 @@
+class CharFinder:
+    """
+    content.find(char, position) for positions that mostly move forward.
+
+    The last answer is reused while the position asked for lies between the
+    position it was found from and the answer itself, so a pattern part
+    like r'[^)]*\\)' costs one scan of the text over all the match attempts
+    instead of one per attempt.
+    """
+    __slots__ = ('content', 'char', 'asked', 'found')
+
+    def __init__(self, content, char):
+        self.content = content
+        self.char = char
+        self.asked = len(content) + 1
+        self.found = -1
+
+    def __call__(self, position):
+        """The first position of the character at or after position, or -1."""
+        if position < self.asked or position > self.found >= 0:
+            self.asked = position
+            self.found = self.content.find(self.char, position)
+        return self.found
+
+def opens_literal(text, quotes, after=''):
+    """
+    Whether the last run of quote characters in text directly follows an
+    "=" (and whitespace), so that it may open a literal assigned there.
+
+    Args:
+        text (str): Text to look in
+        quotes (str): Quote characters
+        after (str): Last non-blank character before text, for a run that
+            starts text
+
+    Returns:
+        bool | None: None when text holds no quote character
+    """
+    quote = max(text.rfind(char) for char in quotes)
+    if quote < 0:
+        return None
+    while quote and text[quote - 1] in quotes:
+        quote -= 1
+    return (text[:quote].rstrip()[-1:] or after) == '='
+
+def cut_summary(text, quotes):
+    """
+    What piece_starts() needs to know about a chunk of text.
+
+    Args:
+        text (str): The chunk
+        quotes (str): Quote characters that open literals
+
+    Returns:
+        tuple: (its first character, opens_literal() of it after text that
+            ends with an "=", and after other text, its last non-blank
+            characters)
+    """
+    return text[:1], opens_literal(text, quotes, '='), opens_literal(text, quotes), text.rstrip()[-16:]
+
+def piece_starts(summaries, open_endings, continues):
+    """
+    Find where a text cut into chunks can be cut into pieces that are each
+    matched on their own, with the same matches as the whole text.
+
+    A cut between chunks is kept unless the text before it is inside a
+    literal opened by an "=" (see opens_literal()), its last non-blank
+    characters are one of open_endings, or the chunk after it continues the
+    text before it.
+
+    Args:
+        summaries (list): cut_summary() of each chunk, in order
+        open_endings (tuple): Endings of the text before a cut that join it
+        continues (callable): Whether a chunk joins the text before it,
+            from its first character
+
+    Returns:
+        list: Indexes of the chunks that start a piece, from 0
+    """
+    starts = []
+    tail = ''
+    in_literal = False
+    for index, (head, opens_after_equals, opens, chunk_tail) in enumerate(summaries):
+        if not (index and (in_literal or tail.endswith(open_endings) or continues(head))):
+            starts.append(index)
+        if tail[-1:] == '=':
+            opens = opens_after_equals
+        if opens is not None:
+            in_literal = opens
+        tail = chunk_tail or tail
+    return starts
+
+def join_pieces(chunks, quotes, open_endings, continues):
+    """
+    Join the chunks of a text into the pieces found by piece_starts().
+
+    Args:
+        chunks (list): The text in chunks, each ending with its line break
+            except the last
+        quotes (str): Quote characters that open literals
+        open_endings (tuple): Endings of the text before a cut that join it
+        continues (callable): Whether a chunk joins the text before it,
+            from its first character
+
+    Returns:
+        list: The pieces, each one chunk or several joined, in order
+    """
+    starts = piece_starts([cut_summary(chunk, quotes) for chunk in chunks], open_endings, continues)
+    return [''.join(chunks[start:end]) for start, end in zip(starts, starts[1:] + [len(chunks)])]
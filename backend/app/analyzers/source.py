@@ -0,0 +1,19 @@
+# Source text as every analyzer reads it: decoded from UTF-8, with "\r\n"
+# and "\r" line breaks turned into "\n", the way reading a file in text
+# mode does, so a file scores the same whatever its line endings.
+
+def decode_source(content):
+    """
+    Decode source code and normalize its line breaks to '\\n'.
+
+    Args:
+        content (str | bytes): Source code; bytes are decoded as UTF-8
+
+    Returns:
+        str: The source text
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8')
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    return content
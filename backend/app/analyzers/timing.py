@@ -0,0 +1,25 @@
+import time
+
+class PhaseTimer:
+    """
+    Measure how long each consecutive phase of an analysis takes.
+
+    Call lap() at the end of every phase; the phase is charged with the time
+    since the previous lap (or since the timer was created).
+    """
+
+    def __init__(self):
+        self.started = self._last = time.perf_counter()
+        self.phases = {}
+
+    def lap(self, phase):
+        """Close the current phase under the given name."""
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def as_dict(self):
+        """Phase durations in milliseconds, plus the total."""
+        timings = {phase: round(seconds * 1000, 3) for phase, seconds in self.phases.items()}
+        timings["total"] = round((self._last - self.started) * 1000, 3)
+        return timings
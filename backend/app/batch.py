@@ -0,0 +1,52 @@
+import tarfile
+import zipfile
+from . import config
+from .analyzers.core import LANGUAGES, language_for
+
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+
+def is_archive(filename):
+    """Check whether an upload is a zip or tar archive."""
+    return (filename or '').lower().endswith(ARCHIVE_SUFFIXES)
+
+def iter_upload_entries(uploads):
+    """
+    Yield every source file in a batch upload, one at a time.
+
+    Plain uploads are yielded as they are, supported or not. Archives are
+    read member by member straight from the upload buffer, without
+    extracting anything to disk, and only their supported source files are
+    yielded. Each entry is read up to one byte past MAX_FILE_BYTES, which is
+    enough for the caller to detect an oversized file.
+
+    Args:
+        uploads (list): FastAPI UploadFile objects
+
+    Yields:
+        tuple: (name, content) with content as bytes
+    """
+    limit = config.MAX_FILE_BYTES + 1
+    for upload in uploads:
+        if is_archive(upload.filename):
+            yield from _iter_archive(upload.filename, upload.file, limit)
+        else:
+            upload.file.seek(0)
+            yield upload.filename, upload.file.read(limit)
+
+def _iter_archive(filename, fileobj, limit):
+    fileobj.seek(0)
+    if filename.lower().endswith('.zip'):
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or language_for(info.filename) is None:
+                    continue
+                with archive.open(info) as member:
+                    yield info.filename, member.read(limit)
+    else:
+        # Stream mode reads members in order without seeking back
+        with tarfile.open(fileobj=fileobj, mode='r|*') as archive:
+            for info in archive:
+                if not info.isfile() or language_for(info.name) is None:
+                    continue
+                member = archive.extractfile(info)
+                yield info.name, member.read(limit)
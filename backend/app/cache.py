@@ -0,0 +1,149 @@
+import hashlib
+import json
+import sqlite3
+from collections import OrderedDict
+from .analyzers import ANALYZER_VERSION
+
+class ResultCache:
+    """
+    Content-addressed cache of analysis results.
+
+    Results are keyed on a hash of the source, its language and
+    ANALYZER_VERSION, so a version bump makes every older entry
+    unreachable. Lookups go to a bounded in-process LRU first and then,
+    when a path is configured, to a SQLite database that several server
+    processes can share.
+    """
+
+    def __init__(self, max_entries, sqlite_path=None):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._entries = OrderedDict()
+        self._db = _open_database(sqlite_path) if sqlite_path else None
+
+    @staticmethod
+    def key(language, content, variant=""):
+        """
+        Compute the cache key for a source file.
+
+        Args:
+            language (str): Analyzer language
+            content (bytes): Source code
+            variant (str): Identifies non-default analyzer options, such as a
+                rule selection; empty for the default full analysis
+
+        Returns:
+            str: Hex digest identifying this source under the current analyzers
+        """
+        return ResultCache.digest_key(language, hashlib.sha256(content).hexdigest(), variant)
+
+    @staticmethod
+    def digest_key(language, digest, variant=""):
+        """
+        Compute the cache key for a source file from its SHA-256 alone.
+
+        This gives the same key as key(language, content, variant), so
+        clients can look up a result by hash without sending the content,
+        and content read in chunks can be hashed as it arrives.
+
+        Args:
+            language (str): Analyzer language
+            digest (str): Hex SHA-256 of the source code
+            variant (str): Same as for key()
+
+        Returns:
+            str: Hex digest identifying this source under the current analyzers
+        """
+        hasher = hashlib.sha256()
+        hasher.update(f"{ANALYZER_VERSION}\0{language}\0".encode('utf-8'))
+        if variant:
+            hasher.update(f"variant\0{variant}\0".encode('utf-8'))
+        hasher.update(f"sha256\0{digest.lower()}".encode('utf-8'))
+        return hasher.hexdigest()
+
+    @staticmethod
+    def blob_key(language, blob_id, engine):
+        """
+        Compute the cache key for a git blob without reading its content.
+
+        Args:
+            language (str): Analyzer language
+            blob_id (str): Git object id of the blob
+            engine (str): Engine that analyzes the blob, 'fast' or 'legacy'
+
+        Returns:
+            str: Hex digest identifying this blob under the current analyzers
+        """
+        hasher = hashlib.sha256()
+        hasher.update(f"{ANALYZER_VERSION}\0{language}\0{engine}\0git-blob\0{blob_id}".encode('utf-8'))
+        return hasher.hexdigest()
+
+    def get(self, key):
+        """Return the cached result for key, or None on a miss."""
+        text = self._entries.get(key)
+        if text is not None:
+            self._entries.move_to_end(key)
+        elif self._db is not None:
+            row = self._db.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                text = row[0]
+                self.disk_hits += 1
+                self._remember(key, text)
+
+        if text is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # Hand out a fresh copy so callers can never alter the cached entry
+        return json.loads(text)
+
+    def put(self, key, result):
+        """Store an analysis result under key."""
+        text = json.dumps(result)
+        self._remember(key, text)
+        if self._db is not None:
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, version, result) VALUES (?, ?, ?)",
+                    (key, ANALYZER_VERSION, text),
+                )
+
+    def stats(self):
+        """Hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "analyzer_version": ANALYZER_VERSION,
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "persistent": self._db is not None,
+        }
+
+    def _remember(self, key, text):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = text
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+def _open_database(path):
+    """Open (and if needed create) the shared SQLite cache."""
+    db = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+    # WAL lets several server processes read while one writes
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.isolation_level = ""
+    with db:
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, version TEXT NOT NULL, result TEXT NOT NULL)"
+        )
+        # Entries from other analyzer versions can never be hit again
+        db.execute("DELETE FROM results WHERE version != ?", (ANALYZER_VERSION,))
+    return db
@@ -0,0 +1,159 @@
+import asyncio
+import json
+import os
+import pstats
+import re
+import time
+import uuid
+from .analyzers import ANALYZER_VERSION
+
+# Capture ids: creation time in milliseconds, so they sort by age, and a random suffix
+CAPTURE_ID_PATTERN = re.compile(r'\d{13}-[0-9a-f]{8}')
+
+class CaptureStore:
+    """
+    Rotating directory of cProfile captures of slow analyses.
+
+    Each capture is a pstats dump ("<id>.prof", readable with
+    `python -m pstats` or any pstats viewer) next to a JSON description
+    ("<id>.json") with the input's hash and size, why it was captured and
+    the functions that took the most time. Only the newest max_captures
+    are kept. Captures made in the background, after a slow analysis, are
+    limited to max_in_flight at a time; others are skipped.
+    """
+
+    def __init__(self, directory, max_captures, max_in_flight=1):
+        self.directory = directory
+        self.max_captures = max_captures
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._tasks = set()
+
+    def save(self, stats, info):
+        """
+        Store a capture and drop the oldest ones beyond max_captures.
+
+        Args:
+            stats (bytes): Marshalled pstats data from a profiled analysis
+            info (dict): Description of the input and the capture, such as
+                "reason", "language", "sha256" and "bytes"
+
+        Returns:
+            dict: The stored description, with its "id", the CPU time the
+                profile covers as "profiled_ms" and the "top" functions by
+                cumulative time
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        capture_id = f"{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}"
+        path = os.path.join(self.directory, f"{capture_id}.prof")
+        with open(path, 'wb') as file:
+            file.write(stats)
+        profile = pstats.Stats(path)
+        info = {
+            "id": capture_id,
+            "created_at": time.time(),
+            "analyzer_version": ANALYZER_VERSION,
+            **info,
+            "profiled_ms": round(profile.total_tt * 1000, 3),
+            "top": top_functions(profile),
+        }
+        # The description is written last; list() ignores captures without one
+        with open(os.path.join(self.directory, f"{capture_id}.json"), 'w', encoding='utf-8') as file:
+            json.dump(info, file)
+        self._rotate()
+        return info
+
+    def submit(self, capture, cleanup=None):
+        """
+        Make a capture in the background, unless max_in_flight are pending.
+
+        Args:
+            capture (callable): Starts the capture; returns an awaitable
+            cleanup (callable): Called once the capture ended or was skipped
+
+        Returns:
+            bool: Whether the capture was started
+        """
+        if self.in_flight >= self.max_in_flight:
+            if cleanup is not None:
+                cleanup()
+            return False
+        self.in_flight += 1
+        task = asyncio.ensure_future(self._run(capture, cleanup))
+        self._tasks.add(task)
+        task.add_done_callback(self._finished)
+        return True
+
+    def cancel(self):
+        """Drop the captures still pending, e.g. at shutdown."""
+        for task in list(self._tasks):
+            task.cancel()
+
+    def list(self):
+        """Descriptions of the stored captures, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        captures = []
+        for capture_id in sorted(self._ids(), reverse=True):
+            try:
+                with open(os.path.join(self.directory, f"{capture_id}.json"), 'r', encoding='utf-8') as file:
+                    captures.append(json.load(file))
+            except (OSError, ValueError):
+                # Still being written, or rotated away by another process
+                continue
+        return captures
+
+    def path(self, capture_id):
+        """Path of a capture's pstats dump, or None if there is no such capture."""
+        if not CAPTURE_ID_PATTERN.fullmatch(capture_id):
+            return None
+        path = os.path.join(self.directory, f"{capture_id}.prof")
+        return path if os.path.exists(path) else None
+
+    def _finished(self, task):
+        self._tasks.discard(task)
+        self.in_flight -= 1
+
+    async def _run(self, capture, cleanup):
+        try:
+            await capture()
+        except Exception:
+            # A failed capture must not bother anyone; the analysis was already answered
+            pass
+        finally:
+            if cleanup is not None:
+                cleanup()
+
+    def _ids(self):
+        ids = {os.path.splitext(name)[0] for name in os.listdir(self.directory)}
+        return [capture_id for capture_id in ids if CAPTURE_ID_PATTERN.fullmatch(capture_id)]
+
+    def _rotate(self):
+        for capture_id in sorted(self._ids())[:-self.max_captures or None]:
+            for extension in (".json", ".prof"):
+                try:
+                    os.unlink(os.path.join(self.directory, capture_id + extension))
+                except FileNotFoundError:
+                    pass
+
+def top_functions(profile, limit=15):
+    """
+    The functions that took the most cumulative time in a profile.
+
+    Args:
+        profile (pstats.Stats): Loaded pstats dump
+        limit (int): Functions to return
+
+    Returns:
+        list: {"function", "calls", "own_ms", "cumulative_ms"} dicts
+    """
+    rows = sorted(profile.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "own_ms": round(own * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+        }
+        for (filename, line, name), (_, calls, own, cumulative, _) in rows
+    ]
@@ -0,0 +1,105 @@
+import os
+import tempfile
+
+def _env_int(name, default):
+    """Read an integer setting from the environment."""
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+def _env_float(name, default):
+    """Read a float setting from the environment."""
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+# Analysis budgets applied to every uploaded file
+MAX_FILE_BYTES = _env_int("CARBON_CRUNCH_MAX_FILE_BYTES", 5 * 1024 * 1024)
+MAX_FILE_LINES = _env_int("CARBON_CRUNCH_MAX_FILE_LINES", 100_000)
+ANALYSIS_TIMEOUT_SECONDS = _env_float("CARBON_CRUNCH_ANALYSIS_TIMEOUT", 10.0)
+
+# Budgets for /analyze-code?stream=true, which reads the upload in chunks;
+# MAX_FILE_BYTES still applies when the selected rules need the full text
+# (full analyses, and any on the legacy engine), which is then buffered
+# in memory
+STREAM_MAX_FILE_BYTES = _env_int("CARBON_CRUNCH_STREAM_MAX_BYTES", 100 * 1024 * 1024)
+STREAM_CHUNK_BYTES = _env_int("CARBON_CRUNCH_STREAM_CHUNK_BYTES", 1024 * 1024)
+STREAM_TIMEOUT_SECONDS = _env_float("CARBON_CRUNCH_STREAM_TIMEOUT", 60.0)
+
+# Live editing sessions on /sessions: analyze once edits pause for the
+# debounce time, or at the latest the maximum delay after the first edit
+SESSION_DEBOUNCE_SECONDS = _env_float("CARBON_CRUNCH_SESSION_DEBOUNCE", 0.025)
+SESSION_MAX_DELAY_SECONDS = _env_float("CARBON_CRUNCH_SESSION_MAX_DELAY", 0.2)
+MAX_SESSIONS = _env_int("CARBON_CRUNCH_MAX_SESSIONS", 100)
+# Worker processes that run session analyses, shared by all sessions; an
+# analysis past ANALYSIS_TIMEOUT_SECONDS is killed with its worker and
+# reported as over its time budget. Session workers keep their documents'
+# memos, so they are recycled far less often than the pool's workers.
+SESSION_WORKERS = max(_env_int("CARBON_CRUNCH_SESSION_WORKERS", 2), 1)
+SESSION_WORKER_MAX_TASKS = _env_int("CARBON_CRUNCH_SESSION_WORKER_MAX_TASKS", 5000)
+
+# Worker processes that run analyses off the event loop
+WORKER_POOL_SIZE = _env_int("CARBON_CRUNCH_WORKERS", os.cpu_count() or 1)
+WORKER_MAX_TASKS = _env_int("CARBON_CRUNCH_WORKER_MAX_TASKS", 200)
+
+# Files from this size on (0 disables it) are analyzed by several workers
+# at once, cut into pieces of about the piece size; smaller files, and
+# analyses with the legacy engine, run in a single worker. Uploads that
+# need the full text stop at MAX_FILE_BYTES, so the threshold stays well
+# below it for /analyze-code?stream=true to use it.
+PARALLEL_MIN_BYTES = _env_int("CARBON_CRUNCH_PARALLEL_MIN_BYTES", 1024 * 1024)
+PARALLEL_PIECE_BYTES = _env_int("CARBON_CRUNCH_PARALLEL_PIECE_BYTES", 256 * 1024)
+
+# Admission control: analyses waiting for a worker (0 for no limit), analyses
+# one client may have queued or running (0 for no limit), and how much a
+# file's size delays it in the queue relative to smaller files
+MAX_QUEUED_ANALYSES = _env_int("CARBON_CRUNCH_MAX_QUEUE", 64)
+MAX_CLIENT_ANALYSES = _env_int("CARBON_CRUNCH_MAX_CLIENT_ANALYSES", 8)
+QUEUE_PRIORITY_BYTES_PER_SECOND = _env_int("CARBON_CRUNCH_QUEUE_PRIORITY_BYTES_PER_SECOND", 1024 * 1024)
+# Request header that identifies the client, e.g. X-Forwarded-For behind a
+# proxy; the peer address is used when unset
+CLIENT_HEADER = os.environ.get("CARBON_CRUNCH_CLIENT_HEADER") or None
+
+# Fraction of fresh analyses whose peak memory is measured with tracemalloc
+# for /metrics (0 disables it); tracing slows the analysis down, so keep it
+# low. Requests can ask for the measurement with ?memory=true.
+MEMORY_SAMPLE_RATE = _env_float("CARBON_CRUNCH_MEMORY_SAMPLE_RATE", 0.0)
+
+# Analysis result cache; set a path to share results on disk between processes
+CACHE_MAX_ENTRIES = _env_int("CARBON_CRUNCH_CACHE_SIZE", 1024)
+CACHE_PATH = os.environ.get("CARBON_CRUNCH_CACHE_PATH") or None
+
+# Most source files analyzed by one /analyze-batch request
+MAX_BATCH_FILES = _env_int("CARBON_CRUNCH_MAX_BATCH_FILES", 1000)
+
+# Asynchronous jobs on /jobs: how long a job is kept after its last update,
+# the time budget of a single-file job, the longest a poll may wait for a
+# job to finish, and the jobs one server process may have queued or running.
+# Set a path to share job status on disk between server processes.
+JOB_TTL_SECONDS = _env_float("CARBON_CRUNCH_JOB_TTL", 3600.0)
+JOB_TIMEOUT_SECONDS = _env_float("CARBON_CRUNCH_JOB_TIMEOUT", 600.0)
+JOB_MAX_WAIT_SECONDS = _env_float("CARBON_CRUNCH_JOB_MAX_WAIT", 30.0)
+MAX_ACTIVE_JOBS = _env_int("CARBON_CRUNCH_MAX_JOBS", 100)
+JOB_MAX_UPLOAD_BYTES = _env_int("CARBON_CRUNCH_JOB_MAX_UPLOAD_BYTES", 512 * 1024 * 1024)
+JOB_STORE_PATH = os.environ.get("CARBON_CRUNCH_JOB_STORE_PATH") or None
+
+# Analyzer engine used when a request does not pick one: "legacy" for the
+# original analyzer, or "fast"; a selection of categories or rules always
+# runs on the fast engine. In shadow mode a sampled fraction of
+# full analyses (0 disables it) is run again with the other engine in the
+# background, and the differences are logged to a local SQLite store.
+ENGINE = os.environ.get("CARBON_CRUNCH_ENGINE") or "legacy"
+SHADOW_SAMPLE_RATE = _env_float("CARBON_CRUNCH_SHADOW_RATE", 0.0)
+SHADOW_STORE_PATH = os.environ.get("CARBON_CRUNCH_SHADOW_STORE") or "carbon-crunch-shadow.sqlite"
+SHADOW_MAX_IN_FLIGHT = _env_int("CARBON_CRUNCH_SHADOW_MAX_IN_FLIGHT", 1)
+
+# Profiling: an analysis slower than the threshold (0, the default, disables
+# it) or past its time budget is run again under cProfile in the background,
+# for at most the profile timeout and never longer than an analysis may run.
+# A request whose profile header holds the token is profiled on the spot.
+# Dumps of the latest captures are kept in the directory, with the input's
+# hash and size, and are only served to requests carrying the token.
+PROFILE_THRESHOLD_SECONDS = _env_float("CARBON_CRUNCH_PROFILE_THRESHOLD", 0.0)
+PROFILE_TIMEOUT_SECONDS = _env_float("CARBON_CRUNCH_PROFILE_TIMEOUT", 120.0)
+PROFILE_DIR = os.environ.get("CARBON_CRUNCH_PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "carbon-crunch-profiles")
+PROFILE_MAX_CAPTURES = max(_env_int("CARBON_CRUNCH_PROFILE_MAX_CAPTURES", 20), 1)
+PROFILE_TOKEN = os.environ.get("CARBON_CRUNCH_PROFILE_TOKEN") or None
+PROFILE_HEADER = "X-Carbon-Crunch-Profile"
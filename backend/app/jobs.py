@@ -0,0 +1,167 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import uuid
+
+# Job states; the last two are final
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+FINAL_STATES = {DONE, FAILED}
+
+class JobStore:
+    """
+    Status, progress and results of analysis jobs, with TTL expiry.
+
+    Jobs are kept in memory by the process that runs them, and expire ttl
+    seconds after their last update. When a path is configured, every
+    update is also written to a SQLite database, so any server process can
+    answer a poll for a job that another process is running.
+    """
+
+    def __init__(self, ttl_seconds, sqlite_path=None):
+        self.ttl_seconds = ttl_seconds
+        self._jobs = {}
+        self._finished = {}  # Job id -> asyncio.Event, for jobs run by this process
+        self._db = _open_database(sqlite_path) if sqlite_path else None
+
+    def create(self, kind, name, total=None):
+        """
+        Record a new queued job.
+
+        Args:
+            kind (str): 'file' for one source file, 'batch' for an archive
+            name (str): Uploaded file name
+            total (int): Files to analyze, or None while unknown
+
+        Returns:
+            dict: The job record
+        """
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "name": name,
+            "status": QUEUED,
+            "progress": {"done": 0, "total": total},
+            "created_at": now,
+            "updated_at": now,
+            "expires_at": now + self.ttl_seconds,
+        }
+        self._jobs[job["id"]] = job
+        self._finished[job["id"]] = asyncio.Event()
+        self._save(job)
+        return job
+
+    def update(self, job_id, **changes):
+        """Apply changes to a job this process runs and extend its expiry."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        job.update(changes)
+        job["updated_at"] = time.time()
+        job["expires_at"] = job["updated_at"] + self.ttl_seconds
+        self._save(job)
+        if job["status"] in FINAL_STATES:
+            self._finished.pop(job_id).set()
+
+    def get(self, job_id):
+        """Return a copy of the job record, or None if it is unknown or expired."""
+        self.purge()
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return json.loads(json.dumps(job))
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT job FROM jobs WHERE id = ? AND expires_at >= ?", (job_id, time.time())
+            ).fetchone()
+            if row is not None:
+                return json.loads(row[0])
+        return None
+
+    async def wait(self, job_id, timeout):
+        """
+        Wait until a job finishes or the timeout passes.
+
+        Returns:
+            dict | None: The job record, as get() returns it
+        """
+        finished = self._finished.get(job_id)
+        if finished is not None:
+            try:
+                await asyncio.wait_for(finished.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            return self.get(job_id)
+
+        # Another process runs the job; poll the shared database
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job["status"] in FINAL_STATES or time.monotonic() >= deadline:
+                return job
+            await asyncio.sleep(min(0.25, max(deadline - time.monotonic(), 0)))
+
+    def delete(self, job_id):
+        """Forget a job."""
+        self._jobs.pop(job_id, None)
+        finished = self._finished.pop(job_id, None)
+        if finished is not None:
+            finished.set()
+        if self._db is not None:
+            with self._db:
+                self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def active(self):
+        """Number of jobs this process has queued or running."""
+        return sum(1 for job in self._jobs.values() if job["status"] not in FINAL_STATES)
+
+    def purge(self):
+        """Drop expired jobs."""
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items() if job["expires_at"] < now]
+        for job_id in expired:
+            del self._jobs[job_id]
+            self._finished.pop(job_id, None)
+        if self._db is not None and expired:
+            with self._db:
+                self._db.execute("DELETE FROM jobs WHERE expires_at < ?", (now,))
+
+    def _save(self, job):
+        if self._db is None:
+            return
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs (id, expires_at, job) VALUES (?, ?, ?)",
+                (job["id"], job["expires_at"], json.dumps(job)),
+            )
+
+class SpooledUpload:
+    """An upload copied to disk, so a job can read it after its request ended."""
+
+    def __init__(self, filename, path):
+        self.filename = filename
+        self.path = path
+        self.file = open(path, 'rb')
+
+    def discard(self):
+        """Close and delete the copy."""
+        self.file.close()
+        os.unlink(self.path)
+
+def _open_database(path):
+    """Open (and if needed create) the shared job database."""
+    db = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.isolation_level = ""
+    with db:
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, expires_at REAL NOT NULL, job TEXT NOT NULL)"
+        )
+        db.execute("DELETE FROM jobs WHERE expires_at < ?", (time.time(),))
+    return db
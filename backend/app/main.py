@@ -1,15 +1,127 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, Header, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import tempfile
-import shutil
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from contextlib import asynccontextmanager
+from typing import List, Optional
+import asyncio
+import hashlib
+import hmac
+import json
 import os
-from .analyzers import analyze_javascript, analyze_python
+import random
+import re
+import tempfile
+import time
+from . import config
+from .analyzers.core import ENGINES, FAST_ENGINE, check_engine
+from .analyzers.rules import STATS, describe_rules, required_inputs, select_rules
+from .batch import LANGUAGES, is_archive, iter_upload_entries, language_for
+from .cache import ResultCache
+from .captures import CaptureStore
+from .jobs import DONE, FAILED, RUNNING, JobStore, SpooledUpload
+from .metrics import LATENCY_BUCKETS, MEMORY_BUCKETS, CallbackMetric, Counter, Histogram, Registry, size_bucket
+from .runner import AnalysisPool, BudgetExceeded, Overloaded
+from .sessions import SessionManager
+from .shadow import ShadowRunner
+
+# Analyses run in worker processes so they never block the event loop; the
+# pool turns work away once its queue is full
+pool = AnalysisPool(
+    config.WORKER_POOL_SIZE,
+    config.WORKER_MAX_TASKS,
+    max_queued=config.MAX_QUEUED_ANALYSES,
+    max_per_client=config.MAX_CLIENT_ANALYSES,
+    priority_bytes_per_second=config.QUEUE_PRIORITY_BYTES_PER_SECOND,
+    on_wait=lambda seconds, size: QUEUE_WAIT_SECONDS.observe(seconds, size=size_bucket(size)),
+)
+cache = ResultCache(config.CACHE_MAX_ENTRIES, config.CACHE_PATH)
+sessions = SessionManager(config.MAX_SESSIONS, config.SESSION_WORKERS, config.SESSION_WORKER_MAX_TASKS)
+jobs = JobStore(config.JOB_TTL_SECONDS, config.JOB_STORE_PATH)
+# Re-runs a sample of analyses through the other engine to catch score drift
+shadows = ShadowRunner(
+    config.SHADOW_SAMPLE_RATE,
+    config.SHADOW_STORE_PATH,
+    max_in_flight=config.SHADOW_MAX_IN_FLIGHT,
+    on_compare=lambda language, outcome: SHADOW_COMPARISONS.inc(language=language, outcome=outcome),
+)
+# cProfile captures of slow analyses, and of analyses profiled on request
+captures = CaptureStore(config.PROFILE_DIR, config.PROFILE_MAX_CAPTURES)
+
+# Background tasks of the jobs this process runs, by job id
+job_tasks = {}
+
+# Content hashes accepted by GET /analyze-code/{sha256}
+SHA256_PATTERN = re.compile(r'[0-9a-fA-F]{64}')
+
+# Metrics served by /metrics
+metrics = Registry()
+ANALYSIS_SECONDS = metrics.register(Histogram(
+    "carbon_crunch_analysis_seconds", "Time to answer one analysis, by language and file size", LATENCY_BUCKETS
+))
+PHASE_SECONDS = metrics.register(Counter(
+    "carbon_crunch_phase_seconds_total", "Worker time spent in each analysis phase and category"
+))
+ANALYSES = metrics.register(Counter(
+    "carbon_crunch_analyses_total", "Analyses by language and outcome (ok, cached, not_modified, budget_exceeded, rejected, error)"
+))
+ANALYZED_BYTES = metrics.register(Counter(
+    "carbon_crunch_analyzed_bytes_total", "Source bytes analyzed by the workers"
+))
+QUEUE_WAIT_SECONDS = metrics.register(Histogram(
+    "carbon_crunch_queue_wait_seconds", "Time analyses waited for a free worker, by file size", LATENCY_BUCKETS
+))
+REJECTED = metrics.register(Counter(
+    "carbon_crunch_rejected_total", "Requests turned away with 429, by the limit that was hit (queue, client)"
+))
+SHADOW_COMPARISONS = metrics.register(Counter(
+    "carbon_crunch_shadow_comparisons_total", "Shadow runs through the other engine, by outcome (match, mismatch, error)"
+))
+PROFILE_CAPTURES = metrics.register(Counter(
+    "carbon_crunch_profile_captures_total", "cProfile captures stored, by reason (threshold, timeout, requested)"
+))
+PEAK_MEMORY_BYTES = metrics.register(Histogram(
+    "carbon_crunch_analysis_peak_memory_bytes", "Peak memory of the sampled analyses, by language and file size",
+    MEMORY_BUCKETS
+))
+metrics.register(CallbackMetric(
+    "carbon_crunch_queue_depth", "Analyses waiting for a free worker", lambda: pool.waiting
+))
+metrics.register(CallbackMetric(
+    "carbon_crunch_busy_workers", "Workers currently running an analysis", lambda: pool.busy
+))
+metrics.register(CallbackMetric(
+    "carbon_crunch_workers", "Size of the worker pool", lambda: pool.size
+))
+metrics.register(CallbackMetric(
+    "carbon_crunch_sessions", "Open live editing sessions", lambda: sessions.active
+))
+metrics.register(CallbackMetric(
+    "carbon_crunch_jobs", "Jobs queued or running in this process", lambda: jobs.active()
+))
+metrics.register(CallbackMetric(
+    "carbon_crunch_cache_hits_total", "Analysis results served from the cache", lambda: cache.hits, kind="counter"
+))
+metrics.register(CallbackMetric(
+    "carbon_crunch_cache_misses_total", "Cache lookups that needed an analysis", lambda: cache.misses, kind="counter"
+))
+
+@asynccontextmanager
+async def lifespan(app):
+    # Pre-warm the workers before serving requests
+    pool.start()
+    yield
+    for task in list(job_tasks.values()):
+        task.cancel()
+    shadows.cancel()
+    captures.cancel()
+    sessions.shutdown()
+    pool.shutdown()
 
 app = FastAPI(
     title="Carbon Crunch",
     description="Code quality analyzer for JavaScript/React and Python/FastAPI files",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -19,6 +131,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Location", "X-Profile-Capture"],
 )
 
 @app.get("/")
@@ -26,33 +139,212 @@ async def root():
     return {"message": "Welcome to Carbon Crunch API! Use /analyze-code endpoint to analyze your code."}
 
 @app.post("/analyze-code")
-async def analyze_code(file: UploadFile = File(...)):
+async def analyze_code(
+    request: Request,
+    file: UploadFile = File(...),
+    profile: bool = False,
+    categories: Optional[str] = None,
+    rules: Optional[str] = None,
+    stream: bool = False,
+    engine: Optional[str] = None,
+    memory: bool = False,
+    if_none_match: Optional[str] = Header(None),
+):
     try:
         # Check if file extension is supported
-        file_extension = os.path.splitext(file.filename)[1].lower()
+        language = language_for(file.filename)
         
-        if file_extension not in ['.js', '.jsx', '.py']:
+        if language is None:
             return JSONResponse(
                 status_code=400,
                 content={"error": "Unsupported file type. Please upload .js, .jsx, or .py files."}
             )
         
-        # Save the uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            shutil.copyfileobj(file.file, temp_file)
-            temp_file_path = temp_file.name
+        # Check the requested categories, rules and engine before reading the upload
+        options = parse_rule_selection(categories, rules, engine)
+        try:
+            selected = check_selection(language, options)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
         
-        # Analyze the file based on its extension
-        if file_extension in ['.js', '.jsx']:
-            result = analyze_javascript(temp_file_path)
-        elif file_extension == '.py':
-            result = analyze_python(temp_file_path)
+        # Large uploads are read in chunks and never held in memory here
+        if stream:
+            return await analyze_upload_stream(
+                language, file, selected, profile, options, if_none_match, client_id(request),
+                profile_requested(request), memory,
+            )
         
-        # Clean up the temp file
-        os.unlink(temp_file_path)
+        # Enforce the size budgets before doing any analysis
+        content = await file.read(config.MAX_FILE_BYTES + 1)
+        exceeded = size_budget_exceeded(content)
+        if exceeded:
+            ANALYSES.inc(language=language, outcome="budget_exceeded")
+            return budget_exceeded_response(413, exceeded.budget, exceeded.limit)
         
-        return result
+        # An admin can have the analysis profiled, bypassing the cache
+        cache_key = source_key(language, content, options)
+        if profile_requested(request):
+            return await captured_response(
+                language, content, len(content), hashlib.sha256(content).hexdigest(), options, cache_key,
+                config.ANALYSIS_TIMEOUT_SECONDS, profile, client_id(request),
+            )
+        
+        # Skip the analysis when the client already holds this result
+        if etag_matches(if_none_match, cache_key):
+            return not_modified_response(language, cache_key)
+        
+        # Analyze the upload buffer based on its extension, within the time budget
+        try:
+            result = await analyze_source(language, content, profile, options, cache_key, client_id(request), memory=memory)
+        except BudgetExceeded as e:
+            return budget_exceeded_response(422, e.budget, e.limit)
+        except Overloaded as e:
+            return overloaded_response(e)
+        return etag_response(result, cache_key)
+    
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"error": f"An error occurred: {str(e)}"}
+        )
+    finally:
+        file.file.close()
+
+@app.get("/analyze-code/{sha256}")
+async def check_by_hash(
+    sha256: str,
+    filename: Optional[str] = None,
+    language: Optional[str] = None,
+    profile: bool = False,
+    categories: Optional[str] = None,
+    rules: Optional[str] = None,
+    engine: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Look up the result for a file by its SHA-256, without uploading it.
+
+    Answers 304 when If-None-Match holds the file's current ETag, the
+    cached result when the server has one, and 404 when the file has to
+    be uploaded to POST /analyze-code.
+    """
+    # Check the hash and the file type
+    if not SHA256_PATTERN.fullmatch(sha256):
+        return JSONResponse(status_code=400, content={"error": "Expected the hex SHA-256 of the file"})
+    if language not in LANGUAGES.values():
+        language = language_for(filename)
+    if language is None:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Unsupported file type. Pass a .js, .jsx, or .py filename."}
+        )
+    
+    options = parse_rule_selection(categories, rules, engine)
+    try:
+        check_selection(language, options)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
     
+    # The ETag only depends on the hash, so an unchanged file needs no lookup
+    cache_key = cache.digest_key(language, sha256, selection_variant(selection_options(options)))
+    if etag_matches(if_none_match, cache_key):
+        return not_modified_response(language, cache_key)
+    
+    result = cache.get(cache_key)
+    if result is None:
+        return JSONResponse(
+            status_code=404,
+            content={"error": "No result for this file yet; upload it to POST /analyze-code"}
+        )
+    ANALYSES.inc(language=language, outcome="cached")
+    if profile:
+        result["timings_ms"] = {"cached": True}
+    return etag_response(result, cache_key)
+
+@app.post("/analyze-batch")
+async def analyze_batch(request: Request, files: List[UploadFile] = File(...), profile: bool = False):
+    """
+    Analyze many files, or the source files inside zip/tar archives.
+
+    Results are streamed as NDJSON: one line per file in completion order,
+    with the ETag of each analyzed file, then a final summary line.
+    """
+    # A batch is admitted as a whole, and bounds its own files in flight;
+    # they count against the client's share while they run
+    client = client_id(request)
+    try:
+        pool.admit(client)
+    except Overloaded as e:
+        REJECTED.inc(reason=e.reason)
+        for file in files:
+            file.file.close()
+        return overloaded_response(e)
+    return StreamingResponse(stream_batch(files, profile, client), media_type="application/x-ndjson")
+
+@app.post("/jobs")
+async def submit_job(
+    file: UploadFile = File(...),
+    profile: bool = False,
+    categories: Optional[str] = None,
+    rules: Optional[str] = None,
+    engine: Optional[str] = None,
+):
+    """
+    Queue a source file or a zip/tar archive for analysis.
+
+    Answers 202 with the job id as soon as the upload is stored; poll
+    GET /jobs/{id} for its status, progress and result.
+    """
+    try:
+        if jobs.active() >= config.MAX_ACTIVE_JOBS:
+            error = Overloaded("jobs", config.MAX_ACTIVE_JOBS, pool.retry_after())
+            REJECTED.inc(reason=error.reason)
+            return overloaded_response(error)
+
+        if is_archive(file.filename):
+            # Archives are analyzed with the full rule set and the default engine, like /analyze-batch
+            if categories or rules or engine:
+                return JSONResponse(
+                    status_code=400,
+                    content={"error": "Categories, rules and engine can only be selected for a single source file"}
+                )
+            try:
+                path, _, _ = await spool_upload(file, config.JOB_MAX_UPLOAD_BYTES, "job_max_upload_bytes")
+            except BudgetExceeded as e:
+                return budget_exceeded_response(413, e.budget, e.limit)
+            job = jobs.create("batch", file.filename)
+            start_job(job["id"], run_batch_job(job["id"], SpooledUpload(file.filename, path), profile))
+        else:
+            # Check if file extension is supported
+            language = language_for(file.filename)
+            if language is None:
+                return JSONResponse(
+                    status_code=400,
+                    content={"error": "Unsupported file type. Please upload .js, .jsx, .py, .zip or .tar files."}
+                )
+
+            # Check the requested categories, rules and engine before storing the upload
+            options = parse_rule_selection(categories, rules, engine)
+            try:
+                selected = check_selection(language, options)
+            except ValueError as e:
+                return JSONResponse(status_code=400, content={"error": str(e)})
+
+            try:
+                path, digest, size = await spool_upload(file, *stream_budgets(selected, options))
+            except BudgetExceeded as e:
+                ANALYSES.inc(language=language, outcome="budget_exceeded")
+                return budget_exceeded_response(413, e.budget, e.limit)
+            job = jobs.create("file", file.filename, total=1)
+            start_job(job["id"], run_file_job(job["id"], language, path, digest, size, profile, options))
+
+        status_url = f"/jobs/{job['id']}"
+        return JSONResponse(
+            status_code=202,
+            content={"job_id": job["id"], "status": job["status"], "status_url": status_url},
+            headers={"Location": status_url},
+        )
+
     except Exception as e:
         return JSONResponse(
             status_code=500,
@@ -61,6 +353,748 @@ async def analyze_code(file: UploadFile = File(...)):
     finally:
         file.file.close()
 
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """
+    Status and progress of a job, and its result once it is done.
+
+    With wait=N the request is held until the job finishes or N seconds
+    pass (at most JOB_MAX_WAIT_SECONDS), so a client can long-poll.
+    """
+    wait = min(max(wait, 0), config.JOB_MAX_WAIT_SECONDS)
+    job = await jobs.wait(job_id, wait) if wait else jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown or expired job"})
+    return job
+
+@app.delete("/jobs/{job_id}")
+async def delete_job(job_id: str):
+    """Cancel a job if it is still running, and forget it."""
+    if jobs.get(job_id) is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown or expired job"})
+    task = job_tasks.get(job_id)
+    if task is not None:
+        task.cancel()
+    jobs.delete(job_id)
+    return {"job_id": job_id, "status": "deleted"}
+
+@app.websocket("/sessions")
+async def edit_session(websocket: WebSocket):
+    """
+    Live editing session: open a document, send edits, and get updated
+    scores back as the edits pause. See SessionManager for the messages.
+    """
+    await sessions.serve(websocket)
+
+@app.get("/rules")
+async def list_rules():
+    """List every rule that /analyze-code can select, by language and category."""
+    return {"rules": describe_rules()}
+
+@app.get("/cache-stats")
+async def cache_stats():
+    return cache.stats()
+
+@app.get("/shadow-stats")
+async def shadow_stats():
+    """Score drift and relative timings logged by shadow mode, per engine pair."""
+    return shadows.report()
+
+@app.get("/profiles")
+async def list_profiles(request: Request):
+    """Recent cProfile captures of slow or profiled analyses, newest first."""
+    if not profiles_allowed(request):
+        return profiles_forbidden_response()
+    return {"captures": captures.list()}
+
+@app.get("/profiles/{capture_id}")
+async def download_profile(request: Request, capture_id: str):
+    """Download the pstats dump of a capture, e.g. for python -m pstats."""
+    if not profiles_allowed(request):
+        return profiles_forbidden_response()
+    path = captures.path(capture_id)
+    if path is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown or rotated capture"})
+    return FileResponse(path, media_type="application/octet-stream", filename=f"carbon-crunch-{capture_id}.prof")
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+async def analyze_source(language, content, profile=False, options=None, cache_key=None, client=None, admit=True,
+                         memory=False):
+    """
+    Analyze source code through the result cache and the worker pool.
+
+    Args:
+        language (str): Analyzer language
+        content (bytes): Source code, already within the size budgets
+        profile (bool): Add per-phase timings in milliseconds as "timings_ms"
+        options (dict): Rule selection from parse_rule_selection(), or None
+            for the full analysis
+        cache_key (str): Key from source_key(), if the caller already has it
+        client (str): Client id from client_id(), for the per-client limit
+        admit (bool): Apply the admission limits (see AnalysisPool.run)
+        memory (bool): Add the analysis' peak memory as "memory" (see run_cached)
+
+    Returns:
+        dict: Analysis results
+
+    Raises:
+        BudgetExceeded: If the analysis ran past its time budget
+        Overloaded: If the analysis queue is full
+    """
+    options = selection_options(options)
+    cache_key = cache_key or cache.key(language, content, selection_variant(options))
+    return await run_cached(
+        language, cache_key, len(content), profile,
+        lambda extra: pool.run(language, content, config.ANALYSIS_TIMEOUT_SECONDS, {**options, **extra}, client, admit),
+        lambda result, timings: shadow_analysis(language, content, options, result, timings),
+        lambda elapsed_ms, reason: capture_slow_analysis(language, content, len(content), options, elapsed_ms, reason),
+        memory,
+    )
+
+def shadow_analysis(language, content, options, result, timings):
+    """
+    Run a sample of fresh full analyses again with the other engine, once
+    the workers have nothing queued, and log how the results differ.
+    """
+    if options.get("categories") or options.get("rules") or pool.waiting or not shadows.sample():
+        return
+    engine = options.get("engine", FAST_ENGINE)
+    alternate = next(name for name in ENGINES if name != engine)
+    shadows.submit(
+        language, engine, alternate, result, timings.get("total"),
+        lambda: pool.run(language, content, config.ANALYSIS_TIMEOUT_SECONDS, {"engine": alternate}, admit=False),
+    )
+
+def capture_slow_analysis(language, source, size, options, elapsed_ms, reason, digest=None):
+    """
+    Profile a slow analysis again in the background, off the request path.
+
+    A file on disk is hard-linked first, so the capture can still read it
+    after the request that spooled it has deleted its copy.
+
+    Args:
+        language (str): Analyzer language
+        source (bytes | str): Source code, or the path of the file analyzed
+        size (int): Source size in bytes
+        options (dict): Resolved options from selection_options()
+        elapsed_ms (float): How long the analysis took
+        reason (str): "threshold" or "timeout"
+        digest (str): Hex SHA-256 of the source, if already known
+    """
+    cleanup = None
+    if isinstance(source, str):
+        link = f"{source}.profile"
+        try:
+            os.link(source, link)
+        except OSError:
+            return
+        source = link
+        cleanup = lambda: os.unlink(link)
+    else:
+        digest = digest or hashlib.sha256(source).hexdigest()
+    captures.submit(
+        lambda: capture_analysis(
+            language, source, size, digest, options, capture_timeout(), reason, elapsed_ms
+        ),
+        cleanup,
+    )
+
+def capture_timeout():
+    """
+    Wall-clock budget of a background capture.
+
+    Captures run outside the admission limits, so they get no more time
+    than an analysis may take; the profile of a timed-out analysis covers
+    the part that ran, which is where it spent its time.
+    """
+    return min(config.PROFILE_TIMEOUT_SECONDS, config.ANALYSIS_TIMEOUT_SECONDS)
+
+async def capture_analysis(language, source, size, digest, options, timeout, reason, elapsed_ms=None,
+                           client=None, admit=False):
+    """
+    Run an analysis under cProfile in the worker pool and store the capture.
+
+    Args:
+        language (str): Analyzer language
+        source (bytes | str): Source code, or the path of a file to analyze
+        size (int): Source size in bytes
+        digest (str): Hex SHA-256 of the source
+        options (dict): Resolved options from selection_options()
+        timeout (float): Wall-clock budget; the profile of an analysis that
+            runs out of time is stored anyway
+        reason (str): Why the analysis is profiled
+        elapsed_ms (float): How long the analysis took unprofiled, if known
+        client (str): Client id, for the per-client limit
+        admit (bool): Apply the admission limits (see AnalysisPool.run)
+
+    Returns:
+        tuple: (results, or None if the analysis was cut short; the
+            description from CaptureStore.save())
+    """
+    run = pool.run_file if isinstance(source, str) else pool.run
+    result, stats = await run(language, source, timeout, {**options, "capture": True}, client, admit)
+    info = captures.save(stats, {
+        "reason": reason,
+        "language": language,
+        "sha256": digest,
+        "bytes": size,
+        "options": options,
+        "elapsed_ms": elapsed_ms,
+        "complete": result is not None,
+    })
+    PROFILE_CAPTURES.inc(reason=reason)
+    return result, info
+
+async def captured_response(language, source, size, digest, options, cache_key, timeout, profile=False, client=None):
+    """
+    Analyze under cProfile for a request carrying the profile token.
+
+    The cache is bypassed so the analysis actually runs; its fresh result
+    is cached as usual. The capture id is returned in X-Profile-Capture,
+    also when the analysis runs out of time.
+
+    Returns:
+        Response: Analysis results with their ETag, or the budget exceeded
+            or overloaded response
+    """
+    options = selection_options(options)
+    try:
+        result, info = await capture_analysis(
+            language, source, size, digest, options, timeout, "requested", client=client, admit=True
+        )
+    except BudgetExceeded as e:
+        return budget_exceeded_response(422, e.budget, e.limit)
+    except Overloaded as e:
+        REJECTED.inc(reason=e.reason)
+        return overloaded_response(e)
+
+    headers = {"X-Profile-Capture": info["id"]}
+    if result is None:
+        return budget_exceeded_response(422, "time", f"{timeout:g}s", headers)
+    timings = result.pop("timings_ms", {})
+    cache.put(cache_key, result)
+    if profile:
+        result["timings_ms"] = timings
+    return JSONResponse(content=result, headers={"ETag": f'"{cache_key}"', **headers})
+
+async def analyze_upload_stream(language, file, selected, profile=False, options=None, if_none_match=None, client=None,
+                                capture=False, memory=False):
+    """
+    Analyze an upload without reading it into memory.
+
+    The upload is copied in chunks to a temporary file, which a worker then
+    analyzes chunk by chunk. The content is hashed along the way, and
+    checked against the budgets from stream_budgets().
+
+    Args:
+        language (str): Analyzer language
+        file (UploadFile): Upload to analyze
+        selected (list): Rules from select_rules(), used to pick the budgets
+        profile (bool): Add per-phase timings in milliseconds as "timings_ms"
+        options (dict): Rule selection from parse_rule_selection(), or None
+        if_none_match (str): If-None-Match request header, if any
+        client (str): Client id from client_id(), for the per-client limit
+        capture (bool): Profile the analysis, bypassing the cache (see
+            captured_response)
+        memory (bool): Add the analysis' peak memory as "memory" (see run_cached)
+
+    Returns:
+        Response: Analysis results with their ETag, a 304, or the budget
+            exceeded or overloaded response
+    """
+    options = selection_options(options)
+    try:
+        path, digest, size = await spool_upload(file, *stream_budgets(selected, options))
+    except BudgetExceeded as e:
+        ANALYSES.inc(language=language, outcome="budget_exceeded")
+        return budget_exceeded_response(413, e.budget, e.limit)
+
+    try:
+        cache_key = cache.digest_key(language, digest, selection_variant(options))
+        if capture:
+            return await captured_response(
+                language, path, size, digest, options, cache_key, config.STREAM_TIMEOUT_SECONDS, profile, client
+            )
+        if etag_matches(if_none_match, cache_key):
+            return not_modified_response(language, cache_key)
+
+        try:
+            result = await run_cached(
+                language, cache_key, size, profile,
+                lambda extra: run_file(language, path, size, config.STREAM_TIMEOUT_SECONDS, {**options, **extra}, client),
+                slow=lambda elapsed_ms, reason: capture_slow_analysis(
+                    language, path, size, options, elapsed_ms, reason, digest
+                ),
+                memory=memory,
+            )
+        except BudgetExceeded as e:
+            return budget_exceeded_response(422, e.budget, e.limit)
+        except Overloaded as e:
+            return overloaded_response(e)
+        return etag_response(result, cache_key)
+    finally:
+        os.unlink(path)
+
+def run_file(language, path, size, timeout, options, client=None, admit=True):
+    """
+    Start the analysis of a file on disk in the worker pool.
+
+    Files of at least PARALLEL_MIN_BYTES are analyzed in pieces by several
+    workers at once (see AnalysisPool.run_parallel), unless the pool has a
+    single worker or the legacy engine was picked; the results are the same.
+
+    Returns:
+        Awaitable: The analysis results, as AnalysisPool.run_file() returns them
+    """
+    if 0 < config.PARALLEL_MIN_BYTES <= size and pool.size > 1 and "engine" not in options:
+        return pool.run_parallel(language, path, timeout, options, client, admit)
+    return pool.run_file(language, path, timeout, options, client, admit)
+
+def stream_budgets(selected, options=None):
+    """
+    Size budgets for an upload analyzed from disk.
+
+    Uploads up to STREAM_MAX_FILE_BYTES are accepted when the fast engine
+    runs rules that only need line statistics; otherwise the usual size
+    budgets apply, because the worker has to hold the full text.
+
+    Returns:
+        tuple: (byte limit, name of that budget, line limit or None)
+    """
+    if required_inputs(selected) - {STATS} or "engine" in selection_options(options):
+        return config.MAX_FILE_BYTES, "max_bytes", config.MAX_FILE_LINES
+    return config.STREAM_MAX_FILE_BYTES, "stream_max_bytes", None
+
+async def spool_upload(file, max_bytes, budget="max_bytes", max_lines=None):
+    """
+    Copy an upload to a temporary file in chunks, hashing it along the way.
+
+    Args:
+        file (UploadFile): Upload to copy
+        max_bytes (int): Largest accepted upload
+        budget (str): Name of the byte budget, for the error
+        max_lines (int): Most lines accepted, or None for no limit
+
+    Returns:
+        tuple: (path of the copy, hex SHA-256 of the content, size in bytes);
+            the caller deletes the copy
+
+    Raises:
+        BudgetExceeded: If the upload is over a budget; nothing is kept
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    lines = 1
+    spool = tempfile.NamedTemporaryFile(prefix="carbon-crunch-", delete=False)
+    try:
+        with spool:
+            while True:
+                chunk = await file.read(config.STREAM_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                lines += chunk.count(b'\n')
+                # Check the budgets as we go so an oversized upload is never copied in full
+                if size > max_bytes:
+                    raise BudgetExceeded(budget, max_bytes)
+                if max_lines is not None and lines > max_lines:
+                    raise BudgetExceeded("max_lines", max_lines)
+                hasher.update(chunk)
+                spool.write(chunk)
+    except BaseException:
+        os.unlink(spool.name)
+        raise
+    return spool.name, hasher.hexdigest(), size
+
+async def run_cached(language, cache_key, size, profile, run, shadow=None, slow=None, memory=False):
+    """
+    Answer an analysis from the cache, or run it and cache the result.
+
+    Args:
+        language (str): Analyzer language
+        cache_key (str): Key from ResultCache.key() or ResultCache.digest_key()
+        size (int): Source size in bytes, for the metrics
+        profile (bool): Add per-phase timings in milliseconds as "timings_ms"
+        run (callable): Starts the analysis with a dict of extra worker
+            options; returns an awaitable result
+        shadow (callable): Called with a fresh result and its timings, for
+            shadow mode
+        slow (callable): Called as slow(elapsed_ms, reason) when a fresh
+            analysis took longer than PROFILE_THRESHOLD_SECONDS ("threshold")
+            or ran out of time ("timeout"), to profile it
+        memory (bool): Add the peak memory of the analysis as "memory"
+            ({"peak_bytes", "input_bytes"}, {"cached": True}, or {"error"}
+            if the worker did not report it); a fraction
+            MEMORY_SAMPLE_RATE of the other fresh analyses is measured too,
+            for the metrics
+
+    Returns:
+        dict: Analysis results
+
+    Raises:
+        BudgetExceeded: If the analysis ran past its time budget
+        Overloaded: If the analysis queue is full
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        # Identical uploads are answered from the cache
+        result = cache.get(cache_key)
+        if result is not None:
+            outcome = "cached"
+            timings = {"cached": True}
+        else:
+            # Tracing memory slows the analysis down, so only a sample is measured
+            trace_memory = memory or random.random() < config.MEMORY_SAMPLE_RATE
+            result = await run({"trace_memory": True} if trace_memory else {})
+            timings = result.pop("timings_ms", {})
+            usage = result.pop("memory", None)
+            cache.put(cache_key, result)
+            outcome = "ok"
+            ANALYZED_BYTES.inc(size, language=language)
+            if usage is not None:
+                usage["input_bytes"] = size
+                PEAK_MEMORY_BYTES.observe(usage["peak_bytes"], language=language, size=size_bucket(size))
+            for phase, milliseconds in timings.items():
+                if phase != "total":
+                    PHASE_SECONDS.inc(milliseconds / 1000, language=language, phase=phase)
+            if shadow is not None:
+                shadow(result, timings)
+            if slow is not None and 0 < config.PROFILE_THRESHOLD_SECONDS * 1000 <= timings.get("total", 0):
+                slow(timings["total"], "threshold")
+    except BudgetExceeded as e:
+        outcome = "budget_exceeded"
+        if slow is not None and config.PROFILE_THRESHOLD_SECONDS > 0 and e.budget == "time":
+            slow(round((time.perf_counter() - started) * 1000, 3), "timeout")
+        raise
+    except Overloaded as e:
+        outcome = "rejected"
+        REJECTED.inc(reason=e.reason)
+        raise
+    finally:
+        ANALYSES.inc(language=language, outcome=outcome)
+        ANALYSIS_SECONDS.observe(time.perf_counter() - started, language=language, size=size_bucket(size))
+
+    if profile:
+        result["timings_ms"] = timings
+    if memory:
+        if outcome == "cached":
+            result["memory"] = {"cached": True}
+        elif usage is not None:
+            result["memory"] = usage
+        else:
+            result["memory"] = {"error": "The analysis did not report its memory"}
+    return result
+
+def parse_rule_selection(categories, rules, engine=None):
+    """
+    Turn the comma-separated categories and rules query parameters, and
+    the engine, into analyzer keyword arguments.
+
+    Args:
+        categories (str | None): e.g. "naming,formatting"
+        rules (str | None): e.g. "formatting.line_length,naming.snake_case"
+        engine (str | None): "fast" or "legacy"; None for the configured engine
+
+    Returns:
+        dict: Sorted "categories" and "rules" lists, None where not given or
+            empty, and the "engine"
+    """
+    def split(value):
+        if value is None:
+            return None
+        return sorted({item.strip() for item in value.split(",") if item.strip()}) or None
+
+    return {"categories": split(categories), "rules": split(rules), "engine": engine or None}
+
+def selection_options(options):
+    """
+    Drop the unset entries of a rule selection, and resolve the engine: a
+    selection of categories or rules runs on the fast engine, anything else
+    on the configured one. It is only named when it is not the fast one, so
+    the options (and cache keys) of fast analyses stay the same.
+    """
+    options = {name: value for name, value in (options or {}).items() if value is not None}
+    engine = options.pop("engine", None)
+    if engine is None:
+        engine = FAST_ENGINE if "categories" in options or "rules" in options else config.ENGINE
+    if engine != FAST_ENGINE:
+        options["engine"] = engine
+    return options
+
+def check_selection(language, options):
+    """
+    Check the categories, rules and engine of a request.
+
+    Returns:
+        list: Rules from select_rules()
+
+    Raises:
+        ValueError: If a category, rule or engine is unknown, or the engine
+            cannot run the selection
+    """
+    check_engine(selection_options(options).get("engine", FAST_ENGINE), options["categories"], options["rules"])
+    return select_rules(language, options["categories"], options["rules"])
+
+def selection_variant(options):
+    """Cache key variant for a rule selection; empty for the full analysis."""
+    return json.dumps(options, sort_keys=True) if options else ""
+
+def client_id(request):
+    """Identify the client of a request for the per-client analysis limit."""
+    if config.CLIENT_HEADER:
+        value = request.headers.get(config.CLIENT_HEADER)
+        if value:
+            # Proxies append to X-Forwarded-For; the first entry is the client
+            return value.split(",")[0].strip()
+    return request.client.host if request.client else None
+
+def profile_requested(request):
+    """Check whether a request carries the profile token, to be profiled on the spot."""
+    if not config.PROFILE_TOKEN or request is None:
+        return False
+    token = request.headers.get(config.PROFILE_HEADER)
+    return token is not None and hmac.compare_digest(token, config.PROFILE_TOKEN)
+
+def profiles_forbidden_response():
+    """Answer a profile request that lacks the token, or any when none is configured."""
+    if not config.PROFILE_TOKEN:
+        return JSONResponse(status_code=403, content={"error": "Profiles are disabled; set CARBON_CRUNCH_PROFILE_TOKEN"})
+    return JSONResponse(status_code=403, content={"error": f"Pass the profile token in {config.PROFILE_HEADER}"})
+
+def profiles_allowed(request):
+    """Captures are only served with the profile token, so never when none is configured."""
+    return profile_requested(request)
+
+def source_key(language, content, options=None):
+    """Cache key for source code under a rule selection; also its ETag."""
+    return cache.key(language, content, selection_variant(selection_options(options)))
+
+def etag_matches(if_none_match, cache_key):
+    """Check an If-None-Match header against the ETag of a cache key."""
+    if not if_none_match:
+        return False
+    # Weak and strong validators compare the same for a GET-like lookup
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return f'"{cache_key}"' in tags
+
+def etag_response(result, cache_key):
+    """Return analysis results with the ETag of their cache key."""
+    return JSONResponse(content=result, headers={"ETag": f'"{cache_key}"'})
+
+def not_modified_response(language, cache_key):
+    """Tell the client its copy of the results for cache_key is current."""
+    ANALYSES.inc(language=language, outcome="not_modified")
+    return Response(status_code=304, headers={"ETag": f'"{cache_key}"'})
+
+def size_budget_exceeded(content):
+    """Return the size budget content exceeds as a BudgetExceeded, or None."""
+    if len(content) > config.MAX_FILE_BYTES:
+        return BudgetExceeded("max_bytes", config.MAX_FILE_BYTES)
+    if content.count(b'\n') + 1 > config.MAX_FILE_LINES:
+        return BudgetExceeded("max_lines", config.MAX_FILE_LINES)
+    return None
+
+async def analyze_batch_entry(name, content, profile=False, client=None):
+    """Analyze one batch entry for a client, returning its NDJSON record."""
+    language = language_for(name)
+    if language is None:
+        return {"file": name, "status": "error", "error": "Unsupported file type"}
+
+    exceeded = size_budget_exceeded(content)
+    try:
+        if exceeded:
+            ANALYSES.inc(language=language, outcome="budget_exceeded")
+            raise exceeded
+        cache_key = source_key(language, content)
+        result = await analyze_source(language, content, profile, cache_key=cache_key, client=client, admit=False)
+    except BudgetExceeded as e:
+        return {"file": name, "status": "budget_exceeded", "budget": e.budget, "limit": e.limit, "error": str(e)}
+    except Exception as e:
+        return {"file": name, "status": "error", "error": f"An error occurred: {str(e)}"}
+    return {"file": name, "status": "ok", "language": language, "etag": f'"{cache_key}"', "result": result}
+
+def start_job(job_id, coroutine):
+    """Run a job in the background, keeping a handle to cancel it."""
+    task = asyncio.ensure_future(coroutine)
+    job_tasks[job_id] = task
+    task.add_done_callback(lambda _: job_tasks.pop(job_id, None))
+
+async def run_file_job(job_id, language, path, digest, size, profile=False, options=None):
+    """
+    Analyze a stored upload for a single-file job and record the outcome.
+
+    The job waits for a free worker rather than being turned away, and the
+    stored upload is deleted when the job ends.
+    """
+    options = selection_options(options)
+    cache_key = cache.digest_key(language, digest, selection_variant(options))
+    try:
+        jobs.update(job_id, status=RUNNING)
+        result = await run_cached(
+            language, cache_key, size, profile,
+            lambda extra: run_file(language, path, size, config.JOB_TIMEOUT_SECONDS, {**options, **extra}, admit=False),
+            slow=lambda elapsed_ms, reason: capture_slow_analysis(
+                language, path, size, options, elapsed_ms, reason, digest
+            ),
+        )
+        jobs.update(job_id, status=DONE, progress={"done": 1, "total": 1}, etag=f'"{cache_key}"', result=result)
+    except BudgetExceeded as e:
+        jobs.update(job_id, status=FAILED, budget=e.budget, limit=e.limit, error=str(e))
+    except Exception as e:
+        jobs.update(job_id, status=FAILED, error=f"An error occurred: {str(e)}")
+    finally:
+        os.unlink(path)
+
+async def run_batch_job(job_id, upload, profile=False):
+    """
+    Analyze the files of a stored archive for a batch job, recording
+    progress as each file finishes.
+
+    The result holds the per-file records and the summary that
+    /analyze-batch would stream.
+    """
+    records = []
+    summary = None
+    batch = iter_batch_records([upload], profile)
+    try:
+        jobs.update(job_id, status=RUNNING)
+        async for record in batch:
+            if "summary" in record:
+                summary = record["summary"]
+                continue
+            records.append(record)
+            jobs.update(job_id, progress={"done": len(records), "total": None})
+        jobs.update(
+            job_id,
+            status=DONE,
+            progress={"done": len(records), "total": len(records)},
+            result={"files": records, "summary": summary},
+        )
+    except Exception as e:
+        jobs.update(job_id, status=FAILED, error=f"An error occurred: {str(e)}")
+    finally:
+        # A cancelled job drops the analyses still in flight
+        await batch.aclose()
+        upload.discard()
+
+async def stream_batch(files, profile=False, client=None):
+    """Analyze batch entries concurrently and yield NDJSON lines as they finish."""
+    records = iter_batch_records(files, profile, client)
+    try:
+        async for record in records:
+            yield json.dumps(record) + "\n"
+    finally:
+        # The client went away or the batch is done; drop unfinished work
+        await records.aclose()
+        for file in files:
+            file.file.close()
+
+async def iter_batch_records(files, profile=False, client=None):
+    """
+    Analyze batch entries concurrently and yield their records as they finish.
+
+    Yields one record per file, then a final {"summary": ...} record.
+    Closing the generator early cancels the analyses still in flight.
+    Entries in flight count against the client's share of the pool, and
+    never exceed it.
+    """
+    started = time.perf_counter()
+    # Keep every worker busy without reading the whole batch into memory
+    max_in_flight = pool.size * 2
+    if client is not None and config.MAX_CLIENT_ANALYSES:
+        max_in_flight = min(max_in_flight, config.MAX_CLIENT_ANALYSES)
+    pending = set()
+    counts = {"ok": 0, "budget_exceeded": 0, "error": 0}
+    scores = []
+
+    def finished(task):
+        record = task.result()
+        counts[record["status"]] += 1
+        if record["status"] == "ok":
+            scores.append(record["result"]["overall_score"])
+        return record
+
+    try:
+        entries = iter_upload_entries(files)
+        total = 0
+        while True:
+            try:
+                # Reading and inflating an entry blocks, so it runs off the event loop
+                entry = await asyncio.to_thread(next, entries, None)
+            except Exception as e:
+                counts["error"] += 1
+                yield {"status": "error", "error": f"Could not read upload: {str(e)}"}
+                break
+            if entry is None:
+                break
+            name, content = entry
+
+            if total == config.MAX_BATCH_FILES:
+                yield {
+                    "status": "budget_exceeded",
+                    "budget": "max_batch_files",
+                    "limit": config.MAX_BATCH_FILES,
+                    "error": f"Batch exceeds the limit of {config.MAX_BATCH_FILES} files; remaining files were skipped",
+                }
+                break
+            total += 1
+
+            pending.add(asyncio.ensure_future(analyze_batch_entry(name, content, profile, client)))
+            if len(pending) >= max_in_flight:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield finished(task)
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield finished(task)
+
+        yield {
+            "summary": {
+                "files": sum(counts.values()),
+                "analyzed": counts["ok"],
+                "budget_exceeded": counts["budget_exceeded"],
+                "errors": counts["error"],
+                "average_score": round(sum(scores) / len(scores), 1) if scores else None,
+                "elapsed_seconds": round(time.perf_counter() - started, 3),
+            }
+        }
+    finally:
+        for task in pending:
+            task.cancel()
+
+def budget_exceeded_response(status_code, budget, limit, headers=None):
+    """Build the response returned when a file exceeds an analysis budget."""
+    return JSONResponse(
+        status_code=status_code,
+        content={
+            "status": "budget_exceeded",
+            "budget": budget,
+            "limit": limit,
+            "error": f"File exceeds the analysis budget for {budget} ({limit})",
+        },
+        headers=headers,
+    )
+
+def overloaded_response(error):
+    """Build the 429 response returned when the analysis queue is full."""
+    return JSONResponse(
+        status_code=429,
+        content={
+            "status": "overloaded",
+            "reason": error.reason,
+            "limit": error.limit,
+            "retry_after": error.retry_after,
+            "error": str(error),
+        },
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -0,0 +1,122 @@
+import math
+
+# Latency buckets in seconds, from cache hits to files near the time budget
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Peak memory buckets in bytes, from small files to inputs near the pod limit
+MEMORY_BUCKETS = tuple(2 ** power for power in range(18, 31, 2))
+
+# Upper bounds of the size buckets used as a label, in bytes
+SIZE_BUCKETS = (
+    (1024, "1kb"),
+    (10 * 1024, "10kb"),
+    (100 * 1024, "100kb"),
+    (1024 * 1024, "1mb"),
+)
+
+def size_bucket(size):
+    """Label for the size bucket a file of size bytes falls into."""
+    for limit, label in SIZE_BUCKETS:
+        if size <= limit:
+            return label
+    return "large"
+
+class Counter:
+    """Monotonic counter with labels, rendered in Prometheus text format."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        for key, value in sorted(self._values.items()):
+            yield self.name, dict(key), value
+
+class CallbackMetric:
+    """Gauge or counter whose value is read from a callback when scraped."""
+
+    def __init__(self, name, help_text, read, kind="gauge"):
+        self.name = name
+        self.help_text = help_text
+        self.kind = kind
+        self._read = read
+
+    def samples(self):
+        yield self.name, {}, self._read()
+
+class Histogram:
+    """Cumulative histogram with labels, rendered in Prometheus text format."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * (len(self.buckets) + 2)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+        series[-2] += 1
+        series[-1] += value
+
+    def samples(self):
+        for key, series in sorted(self._series.items()):
+            labels = dict(key)
+            for bound, count in zip(self.buckets, series):
+                yield f"{self.name}_bucket", {**labels, "le": _format_number(bound)}, count
+            yield f"{self.name}_bucket", {**labels, "le": "+Inf"}, series[-2]
+            yield f"{self.name}_count", labels, series[-2]
+            yield f"{self.name}_sum", labels, series[-1]
+
+class Registry:
+    """Collection of metrics rendered together by the /metrics endpoint."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: Exposition text, one sample per line
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                if labels:
+                    rendered = ",".join(f'{label}="{_escape(str(text))}"' for label, text in labels.items())
+                    lines.append(f"{name}{{{rendered}}} {_format_number(value)}")
+                else:
+                    lines.append(f"{name} {_format_number(value)}")
+        return "\n".join(lines) + "\n"
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_number(value):
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(round(value, 9))
+    return str(value)
@@ -0,0 +1,627 @@
+import asyncio
+import cProfile
+import heapq
+import itertools
+import marshal
+import math
+import multiprocessing
+import os
+import signal
+from collections import OrderedDict
+from . import config
+from .analyzers.core import BACKENDS, FAST_ENGINE, analyze_source, analyze_stream, backend
+from .analyzers.incremental import IncrementalDocument
+from .analyzers.memory import traced_peak
+from .analyzers.parallel import analyze_piece, collect_patterns, piece_boundaries, piece_plan, piece_runs, reduce_pieces
+
+class BudgetExceeded(Exception):
+    """Raised when an analysis runs past one of its budgets."""
+
+    def __init__(self, budget, limit):
+        super().__init__(f"Analysis exceeded the {budget} budget ({limit})")
+        self.budget = budget
+        self.limit = limit
+
+class Overloaded(Exception):
+    """Raised when an analysis is turned away because the queue is full."""
+
+    def __init__(self, reason, limit, retry_after):
+        super().__init__(f"Too many queued analyses ({reason} limit {limit}); retry in {retry_after}s")
+        self.reason = reason
+        self.limit = limit
+        self.retry_after = retry_after
+
+class AnalysisPool:
+    """
+    Pre-started worker processes that run analyses off the event loop.
+
+    Each worker handles one analysis at a time and exits after
+    max_tasks_per_worker analyses, after which it is replaced. A worker
+    that runs past its time budget is killed and replaced as well, so a
+    pathological file can never hold on to a worker.
+
+    Analyses waiting for a worker are served smallest first: each one
+    queues as if it had arrived size / priority_bytes_per_second seconds
+    later than it did, so small files overtake large ones, but a large
+    file is never passed over indefinitely. When max_queued analyses are
+    already waiting, or a client already has max_per_client analyses
+    queued or running, new ones are rejected with Overloaded instead of
+    piling up.
+    """
+
+    def __init__(self, size, max_tasks_per_worker, max_queued=0, max_per_client=0,
+                 priority_bytes_per_second=1024 * 1024, on_wait=None):
+        self.size = size
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.max_queued = max_queued  # 0 for no limit
+        self.max_per_client = max_per_client  # 0 for no limit
+        self.priority_bytes_per_second = priority_bytes_per_second
+        self.on_wait = on_wait  # Called as on_wait(seconds, size) once a worker is free
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = None
+        self._workers = []
+        self._waiters = []  # Heap of [priority, order, future]
+        self._order = itertools.count()
+        self._clients = {}  # Client -> analyses queued or running
+        self._service_seconds = 0.1  # Moving average of one analysis
+        self.waiting = 0  # Analyses queued for a free worker
+        self.busy = 0  # Workers currently analyzing
+
+    def start(self):
+        """Start all workers; called once at application startup."""
+        if self._idle is not None:
+            return
+        self._idle = [self._spawn() for _ in range(self.size)]
+
+    def shutdown(self):
+        """Stop all workers."""
+        for worker in self._workers:
+            worker.stop()
+        self._workers = []
+        self._idle = None
+
+    def retry_after(self):
+        """Whole seconds until the queue has likely drained, for Retry-After."""
+        estimate = (self.waiting + self.busy) * self._service_seconds / max(self.size, 1)
+        return max(1, math.ceil(estimate))
+
+    async def run(self, language, content, timeout, options=None, client=None, admit=True):
+        """
+        Analyze source code in the next free worker.
+
+        Args:
+            language (str): 'python' or 'javascript'
+            content (bytes): Source code to analyze
+            timeout (float): Wall-clock budget in seconds
+            options (dict): Extra keyword arguments for the analyzer, such as
+                categories, rules or engine; a true "capture" runs the
+                analysis under cProfile, and a true "trace_memory" adds its
+                peak memory as "memory"
+            client (str): Who asked, for the per-client limit; None to exempt
+            admit (bool): Apply the admission limits; False for work that was
+                admitted as a whole, like the files of a batch
+
+        Returns:
+            dict: Analysis results, with per-phase timings as "timings_ms";
+                with "capture", a (results or None, profile) pair as
+                _run_captured() returns it
+
+        Raises:
+            BudgetExceeded: If the analysis did not finish within the timeout
+            Overloaded: If the queue or the client's share of it is full
+            RuntimeError: If the analyzer raised an error
+        """
+        task = ("source", language, content, timeout, options or {})
+        return await self._submit(task, timeout, len(content), client, admit)
+
+    async def run_file(self, language, path, timeout, options=None, client=None, admit=True):
+        """
+        Analyze a file on disk in the next free worker, reading it in chunks.
+
+        Args:
+            language (str): 'python' or 'javascript'
+            path (str): File to analyze; it must exist until the call returns
+            timeout (float): Wall-clock budget in seconds
+            options (dict): Extra keyword arguments for the analyzer, as for run()
+            client (str): Who asked, for the per-client limit; None to exempt
+            admit (bool): Apply the admission limits; False for queued jobs,
+                which wait for a worker instead of being turned away
+
+        Returns:
+            dict: Analysis results, with per-phase timings as "timings_ms";
+                a pair with "capture", as for run()
+
+        Raises:
+            BudgetExceeded: If the analysis did not finish within the timeout
+            Overloaded: If the queue or the client's share of it is full
+            RuntimeError: If the analyzer raised an error
+        """
+        task = ("file", language, path, timeout, options or {})
+        return await self._submit(task, timeout, os.path.getsize(path), client, admit)
+
+    async def run_parallel(self, language, path, timeout, options=None, client=None, admit=True, piece_bytes=None):
+        """
+        Analyze a large file on disk with several workers at once.
+
+        The file is cut into pieces of whole lines (see piece_boundaries),
+        whose line statistics, piecewise fact groups and Python syntax are
+        computed in parallel, at most one piece per worker at a time, while
+        one more worker matches the other patterns over the whole file. A
+        statement that runs across a cut makes its pieces be parsed again
+        as one, and so does a match of a piecewise group's pattern that may
+        run across one (see piece_runs). A last worker merges the pieces and
+        scores the file, with the same results as run_file(). Only the fast
+        engine can analyze a file in pieces.
+
+        Args:
+            language (str): 'python' or 'javascript'
+            path (str): File to analyze; it must exist until the call returns
+            timeout (float): Wall-clock budget in seconds for the whole analysis
+            options (dict): Categories, rules and "trace_memory", as for run()
+            client (str): Who asked, for the per-client limit; None to exempt
+            admit (bool): Apply the admission limits, once for the whole file
+            piece_bytes (int): Target size of a piece; PARALLEL_PIECE_BYTES
+                when None
+
+        Returns:
+            dict: Analysis results, with per-phase timings as "timings_ms";
+                "pieces" is the wall-clock time of the parallel part, and
+                with "trace_memory" the peak is the largest of any worker
+
+        Raises:
+            BudgetExceeded: If the analysis did not finish within the timeout
+            Overloaded: If the queue or the client's share of it is full
+            RuntimeError: If the analyzer raised an error
+        """
+        self.start()
+        if admit:
+            self.admit(client)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        options = dict(options or {})
+        trace_memory = options.pop("trace_memory", False)
+        groups, piecewise, with_syntax, with_stats = piece_plan(language, options.get("categories"), options.get("rules"))
+        size = os.path.getsize(path)
+        with open(path, 'rb') as file:
+            pieces = piece_boundaries(language, file, size, piece_bytes or config.PARALLEL_PIECE_BYTES)
+        slots = asyncio.Semaphore(self.size)
+        peaks = []
+
+        async def submit(mode, payload, task_options, task_bytes):
+            # Every task gets what is left of the budget of the whole file
+            remaining = timeout - (loop.time() - started)
+            if remaining <= 0:
+                raise BudgetExceeded("time", f"{timeout:g}s")
+            task = (mode, language, payload, remaining, task_options)
+            try:
+                return await self._submit(task, remaining, task_bytes, client, admit=False)
+            except BudgetExceeded as e:
+                if e.budget != "time":
+                    raise
+                raise BudgetExceeded("time", f"{timeout:g}s") from None
+
+        async def run_piece(start, end, with_syntax, with_stats, piecewise=()):
+            payload = (path, start, end, end == size, with_syntax, with_stats, piecewise)
+            async with slots:
+                result = await submit("piece", payload, {"trace_memory": trace_memory}, end - start)
+            peaks.append(result.pop("memory", {}).get("peak_bytes", 0))
+            return result
+
+        async def run_patterns():
+            async with slots:
+                result = await submit("patterns", (path, groups), {"trace_memory": trace_memory}, size)
+            peaks.append(result.pop("memory", {}).get("peak_bytes", 0))
+            return result["facts"]
+
+        async def parses(results):
+            """Parse again, as one, the runs of pieces that did not parse on their own."""
+            parsed = True
+            index = 0
+            while index < len(pieces):
+                parsed = results[index]["parsed"]
+                count = 1
+                # Like IncrementalDocument, double the run until it parses
+                while not parsed and index + count < len(pieces):
+                    count = min(count * 2, len(pieces) - index)
+                    run = await run_piece(pieces[index][0], pieces[index + count - 1][1], True, False)
+                    parsed = run["parsed"]
+                index += count
+            return parsed
+
+        async def piece_facts(results):
+            """Collect again, as one, the runs of pieces that a piecewise group may match across."""
+            runs = piece_runs(language, [result["cut"] for result in results])
+            joined = [run_piece(pieces[first][0], pieces[end - 1][1], False, False, piecewise)
+                      for first, end in runs if end - first > 1]
+            joined = iter(await _gather(joined))
+            return [
+                results[first]["facts"] if end - first == 1 else next(joined)["facts"]
+                for first, end in runs
+            ]
+
+        # The whole-file pattern pass is the longest task, so it starts first
+        tasks = [run_piece(start, end, with_syntax, with_stats, piecewise) for start, end in pieces]
+        if groups:
+            tasks.insert(0, run_patterns())
+        results = await _gather(tasks)
+        facts = results.pop(0) if groups else None
+        stats = [result["stats"] for result in results] if with_stats else None
+        parts = await piece_facts(results) if piecewise else None
+        parsed = await parses(results) if with_syntax else None
+        pieces_ms = (loop.time() - started) * 1000
+
+        result = await submit("reduce", (stats, facts, parts, parsed), {**options, "trace_memory": trace_memory}, 0)
+        result["timings_ms"] = {
+            "pieces": round(pieces_ms, 3),
+            **result["timings_ms"],
+            "total": round((loop.time() - started) * 1000, 3),
+        }
+        if trace_memory:
+            result["memory"]["peak_bytes"] = max(peaks + [result["memory"]["peak_bytes"]])
+        return result
+
+    def admit(self, client=None):
+        """
+        Check that a new analysis may queue.
+
+        Raises:
+            Overloaded: If the queue, or the client's share of it, is full
+        """
+        if self.max_per_client and client is not None and self._clients.get(client, 0) >= self.max_per_client:
+            raise Overloaded("client", self.max_per_client, self.retry_after())
+        if self.max_queued and not self._idle and self.waiting >= self.max_queued:
+            raise Overloaded("queue", self.max_queued, self.retry_after())
+
+    async def _submit(self, task, timeout, size, client, admit=True):
+        self.start()
+        if admit:
+            self.admit(client)
+        if client is not None:
+            self._clients[client] = self._clients.get(client, 0) + 1
+        try:
+            worker = await self._acquire(size)
+
+            self.busy += 1
+            healthy = False
+            started = asyncio.get_running_loop().time()
+            try:
+                status, payload = await worker.run(task, timeout)
+                healthy = True
+            finally:
+                self.busy -= 1
+                elapsed = asyncio.get_running_loop().time() - started
+                self._service_seconds += (elapsed - self._service_seconds) * 0.2
+                if not healthy or worker.tasks >= self.max_tasks_per_worker:
+                    self._retire(worker, force=not healthy)
+                    worker = self._spawn()
+                self._release(worker)
+        finally:
+            if client is not None:
+                self._clients[client] -= 1
+                if not self._clients[client]:
+                    del self._clients[client]
+
+        if status == "error":
+            raise RuntimeError(payload)
+        return payload
+
+    async def _acquire(self, size):
+        """Wait for a free worker, behind every waiter with a lower priority."""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        if self._idle and not self._waiters:
+            worker = self._idle.pop()
+        else:
+            future = loop.create_future()
+            priority = started + size / self.priority_bytes_per_second
+            heapq.heappush(self._waiters, [priority, next(self._order), future])
+            self.waiting += 1
+            try:
+                worker = await future
+            except asyncio.CancelledError:
+                # A worker handed over just as the caller went away goes to the next waiter
+                if future.done() and not future.cancelled():
+                    self._release(future.result())
+                raise
+            finally:
+                self.waiting -= 1
+
+        if self.on_wait is not None:
+            self.on_wait(loop.time() - started, size)
+        return worker
+
+    def _release(self, worker):
+        """Hand a free worker to the first waiter still waiting, or park it."""
+        if self._idle is None:
+            # The pool was shut down while the analysis ran
+            worker.stop()
+            return
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(worker)
+                return
+        self._idle.append(worker)
+
+    def _spawn(self):
+        worker = _Worker(self._context, _worker_main, self.max_tasks_per_worker)
+        self._workers.append(worker)
+        return worker
+
+    def _retire(self, worker, force=False):
+        worker.stop(force)
+        self._workers.remove(worker)
+
+class SessionWorkers:
+    """
+    Worker processes that analyze the documents of live editing sessions.
+
+    Each session is pinned to one worker, which keeps an
+    IncrementalDocument per session between analyses, so its memoized
+    pieces survive from one edit to the next; the session sends the whole
+    text with every analysis. A worker runs one analysis at a time, under
+    the same CPU limit as the AnalysisPool workers, and one that runs past
+    its time budget (or whose caller went away) is killed and replaced;
+    its sessions then start their memos over. A worker keeps the
+    documents of at most max_documents sessions, dropping the least
+    recently analyzed ones, and is replaced after max_tasks_per_worker
+    analyses.
+    """
+
+    def __init__(self, size, max_tasks_per_worker, max_documents):
+        self.size = size
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.max_documents = max_documents
+        self._context = multiprocessing.get_context("spawn")
+        self._workers = [None] * size  # Started on their first analysis
+        self._locks = [asyncio.Lock() for _ in range(size)]
+        self._sessions = itertools.count()
+
+    def pin(self):
+        """Return a new session id; its analyses all run on the same worker."""
+        return next(self._sessions)
+
+    def shutdown(self):
+        """Stop all workers."""
+        for index, worker in enumerate(self._workers):
+            if worker is not None:
+                worker.stop()
+                self._workers[index] = None
+
+    async def run(self, session, document, timeout, options):
+        """
+        Analyze the current text of a session's document on its worker.
+
+        Args:
+            session (int): Session id from pin()
+            document (IncrementalDocument): The session's document
+            timeout (float): Wall-clock budget in seconds, not counting the
+                wait for the worker
+            options (dict): Keyword arguments for IncrementalDocument.analyze()
+
+        Returns:
+            dict: Analysis results
+
+        Raises:
+            BudgetExceeded: If the analysis did not finish within the timeout
+            RuntimeError: If the analyzer raised an error
+        """
+        index = session % self.size
+        task = (session, document.language, document.text, timeout, options)
+        async with self._locks[index]:
+            worker = self._workers[index]
+            if worker is None:
+                worker = self._workers[index] = _Worker(
+                    self._context, _session_worker_main, self.max_tasks_per_worker, self.max_documents
+                )
+            healthy = False
+            try:
+                status, payload = await worker.run(task, timeout)
+                healthy = True
+            finally:
+                # A worker still analyzing would answer the next task with this one's results
+                if not healthy or worker.tasks >= self.max_tasks_per_worker:
+                    worker.stop(force=not healthy)
+                    self._workers[index] = None
+
+        if status == "error":
+            raise RuntimeError(payload)
+        return payload
+
+async def _gather(coroutines):
+    """Run coroutines concurrently; if one fails, cancel the others and raise."""
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        # Let the cancelled analyses hand back or replace their workers first
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+class _Worker:
+    """Parent-side handle for one worker process."""
+
+    def __init__(self, context, target, *args):
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(
+            target=target,
+            args=(child_connection, *args),
+            daemon=True,
+        )
+        self.process.start()
+        child_connection.close()
+        self.tasks = 0
+
+    async def run(self, task, timeout):
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        fd = self.connection.fileno()
+
+        def on_readable():
+            if not ready.done():
+                ready.set_result(None)
+
+        self.tasks += 1
+        self.connection.send(task)
+        loop.add_reader(fd, on_readable)
+        try:
+            await asyncio.wait_for(ready, timeout)
+            return self.connection.recv()
+        except asyncio.TimeoutError:
+            raise BudgetExceeded("time", f"{timeout:g}s")
+        except EOFError:
+            # The worker died without reporting, e.g. killed by its CPU limit
+            raise BudgetExceeded("time", f"{timeout:g}s")
+        finally:
+            loop.remove_reader(fd)
+
+    def stop(self, force=False):
+        """Close the pipe so the worker exits, killing it if forced or stuck."""
+        self.connection.close()
+        if not force:
+            self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+def _worker_main(connection, max_tasks):
+    """Worker process loop: analyze sources until recycled or told to stop."""
+    # Import the default engine up front, so the first analysis is not slowed down
+    for language in BACKENDS:
+        backend(language)
+
+    for _ in range(max_tasks):
+        try:
+            mode, language, payload, timeout, options = connection.recv()
+        except EOFError:
+            break
+
+        _limit_cpu_time(timeout)
+        try:
+            # Options only name the engine when it is not the fast one
+            engine = options.pop("engine", FAST_ENGINE)
+            capture = options.pop("capture", False)
+            trace_memory = options.pop("trace_memory", False)
+
+            def analyze():
+                if mode == "piece":
+                    path, start, end, *flags = payload
+                    with open(path, 'rb') as file:
+                        file.seek(start)
+                        return analyze_piece(language, file.read(end - start), *flags)
+                if mode == "patterns":
+                    path, groups = payload
+                    with open(path, 'rb') as file:
+                        return {"facts": collect_patterns(language, file.read(), groups)}
+                if mode == "reduce":
+                    return reduce_pieces(language, *payload, True, **options)
+                if mode == "file":
+                    with open(payload, 'rb') as file:
+                        chunks = iter(lambda: file.read(config.STREAM_CHUNK_BYTES), b'')
+                        return analyze_stream(language, chunks, True, engine=engine, **options)
+                return analyze_source(language, payload, True, engine=engine, **options)
+
+            if trace_memory:
+                analyze = _measure_memory(analyze)
+            result = _run_captured(analyze, timeout) if capture else analyze()
+            connection.send(("ok", result))
+        except Exception as e:
+            connection.send(("error", str(e)))
+    connection.close()
+
+def _session_worker_main(connection, max_tasks, max_documents):
+    """Session worker loop: analyze session documents until recycled or told to stop."""
+    documents = OrderedDict()  # Session id -> IncrementalDocument, least recently analyzed first
+    for _ in range(max_tasks):
+        try:
+            session, language, text, timeout, options = connection.recv()
+        except EOFError:
+            break
+
+        _limit_cpu_time(timeout)
+        try:
+            document = documents.pop(session, None)
+            if document is None or document.language != language:
+                document = IncrementalDocument(language)
+            documents[session] = document
+            while len(documents) > max_documents:
+                documents.popitem(last=False)
+            document.replace(text)
+            connection.send(("ok", document.analyze(**options)))
+        except Exception as e:
+            connection.send(("error", str(e)))
+    connection.close()
+
+def _measure_memory(analyze):
+    """Wrap an analysis so its result reports the peak memory it allocated."""
+    def measured():
+        result, peak = traced_peak(analyze)
+        result["memory"] = {"peak_bytes": peak}
+        return result
+    return measured
+
+class _CaptureDeadline(BaseException):
+    """Interrupts a profiled analysis; not an Exception, so analyzers cannot swallow it."""
+
+def _run_captured(analyze, timeout):
+    """
+    Run an analysis under cProfile.
+
+    A profiled analysis is cut short a little before the parent's timeout,
+    so the profile of an analysis too slow to finish is still returned.
+
+    Returns:
+        tuple: (results, or None if cut short; marshalled pstats data, the
+            format of a cProfile dump file)
+    """
+    profiler = cProfile.Profile()
+    clear_deadline = _set_deadline(timeout * 0.9)
+    try:
+        profiler.enable()
+        try:
+            result = analyze()
+        except _CaptureDeadline:
+            result = None
+        finally:
+            profiler.disable()
+    finally:
+        clear_deadline()
+    profiler.create_stats()
+    return result, marshal.dumps(profiler.stats)
+
+def _set_deadline(seconds):
+    """Raise _CaptureDeadline in this thread after seconds; returns a function that clears it."""
+    if not hasattr(signal, "setitimer"):  # Not available on Windows
+        return lambda: None
+
+    def expired(signum, frame):
+        raise _CaptureDeadline()
+
+    previous = signal.signal(signal.SIGALRM, expired)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+
+    def clear():
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+    return clear
+
+def _limit_cpu_time(timeout):
+    """Let the kernel stop the worker too, in case the parent cannot."""
+    try:
+        import resource
+    except ImportError:  # Not available on Windows
+        return
+
+    # The CPU limit covers the whole process, so extend it past the CPU
+    # time already used by earlier tasks
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    seconds = math.ceil(usage.ru_utime + usage.ru_stime + timeout) + 1
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        seconds = min(seconds, hard)
+    try:
+        resource.setrlimit(resource.RLIMIT_CPU, (seconds, hard))
+    except (ValueError, OSError):
+        pass
@@ -0,0 +1,229 @@
+import asyncio
+import time
+from fastapi import WebSocketDisconnect
+from . import config
+from .analyzers.incremental import IncrementalDocument
+from .analyzers.rules import select_rules
+from .batch import language_for
+from .runner import BudgetExceeded, SessionWorkers
+
+LANGUAGE_NAMES = ('python', 'javascript')
+
+# Close code sent when the server has no room for another session
+TRY_AGAIN_LATER = 1013
+
+class SessionManager:
+    """
+    Live editing sessions over WebSocket.
+
+    A client opens a document, then sends edits as they happen. Edits are
+    applied right away; the analysis waits until the edits pause (or a
+    maximum delay passes), so a burst of keystrokes is analyzed once.
+    Each session keeps an IncrementalDocument, so only the pieces of the
+    file touched since the last analysis are analyzed again. Analyses run
+    in a few worker processes shared by all sessions (see SessionWorkers),
+    each for at most ANALYSIS_TIMEOUT_SECONDS, after which its worker is
+    killed.
+
+    Client messages:
+        {"type": "open", "filename" or "language", "text", "categories", "rules", "profile"}
+        {"type": "edit", "changes": [{"range": {"start": {"line", "character"},
+                                                "end": {"line", "character"}}, "text"}]}
+            A change without a range replaces the whole document.
+
+    Server messages:
+        {"type": "result", "version", "result", "elapsed_ms"}
+        {"type": "budget_exceeded", "version", "budget", "limit", "error"}
+        {"type": "error", "error"}
+    """
+
+    def __init__(self, max_sessions, workers=1, max_tasks_per_worker=1000):
+        self.max_sessions = max_sessions
+        self.active = 0
+        # A worker may be handed every session, so it keeps room for all of them
+        self.workers = SessionWorkers(workers, max_tasks_per_worker, max_sessions)
+
+    def shutdown(self):
+        """Stop the workers, with the analyses still running on them."""
+        self.workers.shutdown()
+
+    async def serve(self, websocket):
+        """Run one session until the client disconnects."""
+        await websocket.accept()
+        if self.active >= self.max_sessions:
+            await websocket.send_json({"type": "error", "error": f"Too many open sessions ({self.max_sessions})"})
+            await websocket.close(code=TRY_AGAIN_LATER)
+            return
+
+        self.active += 1
+        session = EditSession(websocket, self.workers)
+        try:
+            await session.run()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            session.stop()
+            self.active -= 1
+
+class EditSession:
+    """One open document and its pending analysis."""
+
+    def __init__(self, websocket, workers):
+        self.websocket = websocket
+        self.workers = workers
+        self.id = workers.pin()
+        self.document = None
+        self.options = {}
+        self.profile = False
+        self.version = 0
+        self.changed = asyncio.Event()
+        self.analysis = None
+
+    async def run(self):
+        while True:
+            try:
+                message = await self.websocket.receive_json()
+            except ValueError:
+                await self.send_error("Messages must be JSON objects")
+                continue
+
+            try:
+                self.handle(message)
+            except ValueError as e:
+                await self.send_error(str(e))
+                continue
+
+            self.version += 1
+            self.changed.set()
+            if self.analysis is None:
+                self.analysis = asyncio.ensure_future(self.analyze_changes())
+
+    def stop(self):
+        if self.analysis is not None:
+            self.analysis.cancel()
+
+    def handle(self, message):
+        """
+        Apply one client message to the document.
+
+        Raises:
+            ValueError: If the message is malformed; the document is left as it was
+        """
+        kind = message.get("type") if isinstance(message, dict) else None
+        if kind == "open":
+            self.open(message)
+        elif kind == "edit":
+            if self.document is None:
+                raise ValueError("Open a document before sending edits")
+            self.edit(message.get("changes"))
+        else:
+            raise ValueError("Message type must be 'open' or 'edit'")
+
+    def open(self, message):
+        language = message.get("language")
+        if language not in LANGUAGE_NAMES:
+            language = language_for(message.get("filename"))
+        if language is None:
+            raise ValueError("Unsupported file type. Please open .js, .jsx, or .py files.")
+
+        text = message.get("text", "")
+        if not isinstance(text, str):
+            raise ValueError("Document text must be a string")
+
+        # Check the requested categories and rules before keeping the document
+        options = {"categories": message.get("categories"), "rules": message.get("rules")}
+        for name, value in options.items():
+            if value is not None and not (isinstance(value, list) and all(isinstance(item, str) for item in value)):
+                raise ValueError(f"'{name}' must be a list of names")
+        select_rules(language, options["categories"], options["rules"])
+
+        self.document = IncrementalDocument(language, text)
+        self.options = options
+        self.profile = bool(message.get("profile"))
+
+    def edit(self, changes):
+        if not isinstance(changes, list):
+            raise ValueError("Edits must have a list of changes")
+
+        document = self.document
+        lines = document.lines[:]
+        try:
+            for change in changes:
+                text = change.get("text")
+                if not isinstance(text, str):
+                    raise ValueError("Every change needs its replacement text")
+                if change.get("range") is None:
+                    document.replace(text)
+                    continue
+                start, end = change["range"]["start"], change["range"]["end"]
+                document.apply_edit((start["line"], start["character"]), (end["line"], end["character"]), text)
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            # Changes are applied all or nothing
+            document.lines = lines
+            if isinstance(e, ValueError):
+                raise
+            raise ValueError("Changes must be objects with a text and an optional range of start and end positions")
+
+    async def analyze_changes(self):
+        """Analyze the document after each pause in the edits, one analysis at a time."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.changed.wait()
+
+            # Wait for the edits to pause, but not longer than the maximum delay
+            deadline = loop.time() + config.SESSION_MAX_DELAY_SECONDS
+            while True:
+                self.changed.clear()
+                wait = min(config.SESSION_DEBOUNCE_SECONDS, deadline - loop.time())
+                if wait <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self.changed.wait(), wait)
+                except asyncio.TimeoutError:
+                    break
+            self.changed.clear()
+
+            version = self.version
+            exceeded = self.budget_exceeded()
+            if exceeded:
+                await self.send_budget_exceeded(version, *exceeded)
+                continue
+
+            started = time.perf_counter()
+            # Edits that arrive meanwhile are picked up by the next pass
+            options = {"profile": self.profile, **self.options}
+            try:
+                result = await self.workers.run(self.id, self.document, config.ANALYSIS_TIMEOUT_SECONDS, options)
+            except BudgetExceeded as e:
+                await self.send_budget_exceeded(version, e.budget, e.limit)
+                continue
+            except Exception as e:
+                await self.send_error(f"An error occurred: {str(e)}")
+                continue
+            await self.websocket.send_json({
+                "type": "result",
+                "version": version,
+                "result": result,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+            })
+
+    def budget_exceeded(self):
+        """Return (budget, limit) for the size budget the document exceeds, or None."""
+        lines = self.document.lines
+        if sum(len(line.encode()) for line in lines) + len(lines) - 1 > config.MAX_FILE_BYTES:
+            return "max_bytes", config.MAX_FILE_BYTES
+        if len(lines) > config.MAX_FILE_LINES:
+            return "max_lines", config.MAX_FILE_LINES
+        return None
+
+    async def send_budget_exceeded(self, version, budget, limit):
+        await self.websocket.send_json({
+            "type": "budget_exceeded",
+            "version": version,
+            "budget": budget,
+            "limit": limit,
+            "error": f"File exceeds the analysis budget for {budget} ({limit})",
+        })
+
+    async def send_error(self, error):
+        await self.websocket.send_json({"type": "error", "error": error})
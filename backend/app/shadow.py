@@ -0,0 +1,181 @@
+import asyncio
+import json
+import random
+import sqlite3
+import statistics
+import time
+from .analyzers import ANALYZER_VERSION
+
+def compare_results(primary, shadow):
+    """
+    Describe how two results for the same file differ.
+
+    Args:
+        primary (dict): Result of the engine that answered the request
+        shadow (dict): Result of the other engine
+
+    Returns:
+        dict: "match", the shadow score minus the primary one as
+            "score_delta", the non-zero "breakdown_deltas" by category, and
+            the recommendations only one of the engines made
+    """
+    categories = list(primary["breakdown"]) + [name for name in shadow["breakdown"] if name not in primary["breakdown"]]
+    breakdown_deltas = {}
+    for name in categories:
+        delta = shadow["breakdown"].get(name, 0) - primary["breakdown"].get(name, 0)
+        if delta:
+            breakdown_deltas[name] = delta
+
+    missing = [text for text in primary["recommendations"] if text not in shadow["recommendations"]]
+    extra = [text for text in shadow["recommendations"] if text not in primary["recommendations"]]
+    score_delta = shadow["overall_score"] - primary["overall_score"]
+    return {
+        "match": not score_delta and not breakdown_deltas and primary["recommendations"] == shadow["recommendations"],
+        "score_delta": score_delta,
+        "breakdown_deltas": breakdown_deltas,
+        "missing_recommendations": missing,
+        "extra_recommendations": extra,
+    }
+
+class ShadowRunner:
+    """
+    Re-run a sample of analyses through another engine and log the differences.
+
+    A sampled analysis is run again with the alternate engine in the
+    background, after its own response is on its way, and at most
+    max_in_flight such runs are pending at once. Score and recommendation
+    differences and both engines' timings are written to a local SQLite
+    store, which keeps the latest max_records comparisons.
+    """
+
+    def __init__(self, rate, store_path, max_in_flight=1, max_records=100_000, on_compare=None):
+        self.rate = rate
+        self.max_in_flight = max_in_flight
+        self.max_records = max_records
+        self.on_compare = on_compare
+        self.in_flight = 0
+        self._tasks = set()
+        self._db = _open_store(store_path) if rate > 0 else None
+
+    def sample(self):
+        """Decide whether to shadow the analysis at hand."""
+        return self._db is not None and self.in_flight < self.max_in_flight and random.random() < self.rate
+
+    def submit(self, language, engine, alternate, result, elapsed_ms, run):
+        """
+        Compare a result with the alternate engine's, in the background.
+
+        Args:
+            language (str): Analyzer language
+            engine (str): Engine that produced result
+            alternate (str): Engine that run() analyzes with
+            result (dict): Result that answered the request
+            elapsed_ms (float): Analysis time of result in milliseconds
+            run (callable): Starts the alternate analysis; returns an
+                awaitable result with "timings_ms"
+        """
+        self.in_flight += 1
+        task = asyncio.ensure_future(self._compare(language, engine, alternate, result, elapsed_ms, run))
+        self._tasks.add(task)
+        task.add_done_callback(self._finished)
+
+    def cancel(self):
+        """Drop the comparisons still pending, e.g. at shutdown."""
+        for task in list(self._tasks):
+            task.cancel()
+
+    def _finished(self, task):
+        self._tasks.discard(task)
+        self.in_flight -= 1
+
+    async def _compare(self, language, engine, alternate, result, elapsed_ms, run):
+        try:
+            shadow = await run()
+        except Exception as e:
+            self._record(language, engine, alternate, None, elapsed_ms, None, str(e))
+            return
+        shadow_ms = shadow.pop("timings_ms", {}).get("total")
+        self._record(language, engine, alternate, compare_results(result, shadow), elapsed_ms, shadow_ms)
+
+    def _record(self, language, engine, alternate, diff, primary_ms, shadow_ms, error=None):
+        outcome = "error" if diff is None else "match" if diff["match"] else "mismatch"
+        if self.on_compare is not None:
+            self.on_compare(language, outcome)
+        with self._db:
+            self._db.execute(
+                "INSERT INTO comparisons (created_at, analyzer_version, language, engine, shadow_engine,"
+                " outcome, score_delta, diff, primary_ms, shadow_ms, error)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    time.time(), ANALYZER_VERSION, language, engine, alternate, outcome,
+                    diff["score_delta"] if diff else None, json.dumps(diff) if diff else None,
+                    primary_ms, shadow_ms, error,
+                ),
+            )
+            self._db.execute(
+                "DELETE FROM comparisons WHERE id <= (SELECT MAX(id) FROM comparisons) - ?", (self.max_records,)
+            )
+
+    def report(self, recent=20):
+        """
+        Summarize the comparisons logged under the current analyzer version.
+
+        Returns:
+            dict: Counts, score drift and the median time ratio (shadow over
+                primary) per language and engine pair, plus the latest
+                mismatches and errors
+        """
+        if self._db is None:
+            return {"enabled": False}
+        groups = {}
+        rows = self._db.execute(
+            "SELECT language, engine, shadow_engine, outcome, score_delta, primary_ms, shadow_ms"
+            " FROM comparisons WHERE analyzer_version = ?", (ANALYZER_VERSION,)
+        )
+        for language, engine, alternate, outcome, score_delta, primary_ms, shadow_ms in rows:
+            group = groups.setdefault((language, engine, alternate), {
+                "language": language, "engine": engine, "shadow_engine": alternate,
+                "compared": 0, "match": 0, "mismatch": 0, "error": 0, "deltas": [], "ratios": [],
+            })
+            group["compared"] += 1
+            group[outcome] += 1
+            if score_delta is not None:
+                group["deltas"].append(score_delta)
+            if primary_ms and shadow_ms:
+                group["ratios"].append(shadow_ms / primary_ms)
+
+        summary = []
+        for group in groups.values():
+            deltas = group.pop("deltas")
+            ratios = group.pop("ratios")
+            group["mean_abs_score_delta"] = round(sum(map(abs, deltas)) / len(deltas), 2) if deltas else None
+            group["max_abs_score_delta"] = max(map(abs, deltas)) if deltas else None
+            group["median_time_ratio"] = round(statistics.median(ratios), 3) if ratios else None
+            summary.append(group)
+
+        latest = [
+            {
+                "created_at": created_at, "language": language, "engine": engine, "shadow_engine": alternate,
+                "outcome": outcome, "diff": json.loads(diff) if diff else None,
+                "primary_ms": primary_ms, "shadow_ms": shadow_ms, "error": error,
+            }
+            for created_at, language, engine, alternate, outcome, diff, primary_ms, shadow_ms, error
+            in self._db.execute(
+                "SELECT created_at, language, engine, shadow_engine, outcome, diff, primary_ms, shadow_ms, error"
+                " FROM comparisons WHERE analyzer_version = ? AND outcome != 'match' ORDER BY id DESC LIMIT ?",
+                (ANALYZER_VERSION, recent),
+            )
+        ]
+        return {"enabled": True, "rate": self.rate, "in_flight": self.in_flight, "engines": summary, "latest": latest}
+
+def _open_store(path):
+    """Open (and if needed create) the comparison store."""
+    db = sqlite3.connect(path, timeout=5, check_same_thread=False)
+    with db:
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS comparisons ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, analyzer_version TEXT NOT NULL,"
+            " language TEXT NOT NULL, engine TEXT NOT NULL, shadow_engine TEXT NOT NULL, outcome TEXT NOT NULL,"
+            " score_delta INTEGER, diff TEXT, primary_ms REAL, shadow_ms REAL, error TEXT)"
+        )
+    return db
@@ -0,0 +1,253 @@
+import os
+import random
+
+SAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'samples')
+
+KB = 1024
+MB = 1024 * KB
+
+# Sizes used for the realistic cases; 10 MB is opt-in because it is slow
+DEFAULT_SIZES = (1 * KB, 64 * KB, 1 * MB)
+FULL_SIZES = DEFAULT_SIZES + (10 * MB,)
+
+# Size used for the adversarial cases
+ADVERSARIAL_SIZE = 256 * KB
+
+# Pathological cases: one unit repeated, so that a backtracking pattern
+# would retry the rest of the text from every position. The original
+# analyzer takes seconds on a few KB of them, hence their small size in
+# the corpus; benchmarks.run --scaling grows them to check that analysis
+# time grows linearly.
+PATHOLOGICAL_UNITS = {
+    'python_long_identifier': ('python', 'a'),
+    'python_open_signatures': ('python', 'def f(a, '),
+    'javascript_open_functions': ('javascript', 'function a(){ '),
+    'javascript_open_arrows': ('javascript', 'const a = () => { '),
+    'javascript_open_components': ('javascript', 'function Comp(){ x return ( a\n'),
+    'javascript_long_variable': ('javascript', 'let ' + 'a_' * 1024),
+}
+PATHOLOGICAL_SIZE = 16 * KB
+
+WORDS = [
+    'user', 'order', 'item', 'price', 'total', 'cart', 'account', 'session',
+    'token', 'profile', 'invoice', 'report', 'payload', 'record', 'status',
+]
+
+def _seed(name):
+    """Read a file from samples/, or return an empty string if it is missing."""
+    path = os.path.join(SAMPLES_DIR, name)
+    if not os.path.exists(path):
+        return ''
+    with open(path, 'r', encoding='utf-8') as file:
+        return file.read()
+
+def _name(rng, style='snake'):
+    first, second = rng.choice(WORDS), rng.choice(WORDS)
+    if style == 'camel':
+        return first + second.capitalize()
+    if style == 'pascal':
+        return first.capitalize() + second.capitalize()
+    return f'{first}_{second}'
+
+def _fill(size, units):
+    """Concatenate generated units until the text reaches size characters."""
+    parts = []
+    length = 0
+    for unit in units:
+        parts.append(unit)
+        length += len(unit)
+        if length >= size:
+            break
+    return ''.join(parts)[:size]
+
+def _python_units(rng):
+    seeds = [_seed('sample_py.py'), _seed('test.py')]
+    yield '"""Generated FastAPI service module."""\n\nfrom fastapi import FastAPI, HTTPException\n\napp = FastAPI()\n\n'
+    index = 0
+    while True:
+        index += 1
+        name = f'{_name(rng)}_{index}'
+        kind = index % 5
+        if kind == 0 and seeds[index % 2]:
+            # Seed files keep the corpus close to what users actually upload
+            yield f'\n# Seed copy {index}\n' + seeds[index % 2] + '\n'
+        elif kind == 1:
+            yield (
+                f'\n@app.get("/{name}/{{item_id}}")\n'
+                f'async def get_{name}(item_id: int, limit: int = 10) -> dict:\n'
+                f'    """Return {name} data."""\n'
+                f'    try:\n'
+                f'        values = [item_id * {rng.randint(2, 99)} for _ in range(limit)]\n'
+                f'    except ValueError as error:\n'
+                f'        raise HTTPException(status_code=400, detail=str(error))\n'
+                f'    return {{"id": item_id, "values": values}}\n'
+            )
+        elif kind == 2:
+            yield (
+                f'\nclass {_name(rng, "pascal")}{index}:\n'
+                f'    """Stores {name} state."""\n\n'
+                f'    def __init__(self, value, scale=1):\n'
+                f'        self.value = value\n'
+                f'        self.scale = scale\n\n'
+                f'    def compute(self, factor):\n'
+                f'        # Scale the value by factor\n'
+                f'        if factor > {rng.randint(1, 50)}:\n'
+                f'            return self.value * factor * self.scale\n'
+                f'        return self.value\n'
+            )
+        elif kind == 3:
+            yield (
+                f'\ndef {name}(records, threshold={rng.randint(1, 9)}):\n'
+                f"    selected = []\n"
+                f'    for record in records:\n'
+                f"        if record['{rng.choice(WORDS)}'] > threshold:\n"
+                f'            selected.append(record)\n'
+                f"    print('selected', len(selected))\n"
+                f'    return selected\n'
+            )
+        else:
+            yield f'{name.upper()} = {rng.randint(100, 10000)}\n'
+
+def _javascript_units(rng):
+    seeds = [_seed('sample_js.js'), _seed('test_fixed.js')]
+    yield "import React, { useState, useEffect } from 'react';\n\n"
+    index = 0
+    while True:
+        index += 1
+        name = f'{_name(rng, "pascal")}{index}'
+        kind = index % 4
+        if kind == 0 and seeds[index % 2]:
+            yield f'\n// Seed copy {index}\n' + seeds[index % 2].replace('export default', '// export default') + '\n'
+        elif kind == 1:
+            yield (
+                f'\n/**\n * Renders {name}.\n * @param {{object}} props\n */\n'
+                f'function {name}({{ items, onSelect }}) {{\n'
+                f'  const [selected, setSelected] = useState(null);\n'
+                f'  useEffect(() => {{\n'
+                f"    fetch('/api/{rng.choice(WORDS)}').then((res) => res.json()).then(setSelected);\n"
+                f'  }}, []);\n'
+                f'  return (\n'
+                f'    <ul className="list">\n'
+                f'      {{items.map((item) => (\n'
+                f'        <li key={{item.id}} onClick={{() => onSelect(item)}}>{{item.label}}</li>\n'
+                f'      ))}}\n'
+                f'    </ul>\n'
+                f'  );\n'
+                f'}}\n'
+            )
+        elif kind == 2:
+            yield (
+                f'\nconst {_name(rng, "camel")}{index} = async (input) => {{\n'
+                f'  try {{\n'
+                f'    const result = await compute(input, {rng.randint(1, 500)});\n'
+                f'    console.log(`done ${{result}}`);\n'
+                f'    return result?.value ?? null;\n'
+                f'  }} catch (error) {{\n'
+                f"    return {{ error: 'failed', code: {rng.randint(400, 599)} }};\n"
+                f'  }}\n'
+                f'}};\n'
+            )
+        else:
+            yield f'const {_name(rng).upper()}_{index} = {rng.randint(100, 10000)};\n'
+
+def python_module(size, seed=0):
+    """Realistic Python/FastAPI source of the given size in characters."""
+    return _fill(size, _python_units(random.Random(seed)))
+
+def javascript_module(size, seed=0):
+    """Realistic JavaScript/React source of the given size in characters."""
+    return _fill(size, _javascript_units(random.Random(seed)))
+
+def minified_bundle(size, seed=0):
+    """JavaScript source squeezed onto a single line, like a production bundle."""
+    rng = random.Random(seed)
+    units = ["import React from 'react';"]
+    length = len(units[0])
+    while length < size:
+        index = len(units)
+        unit = (
+            f'function f{index}(a,b){{if(a>b){{return a-b}}for(let i=0;i<a;i++){{b+=i*{rng.randint(2, 9)}}}'
+            f'return b}}const c{index}=/[a-z]+\\/{index}/g;const t{index}=`v${{f{index}(1,2)}}`;'
+        )
+        units.append(unit)
+        length += len(unit)
+    return ''.join(units).replace('\n', '')[:size]
+
+def deep_nesting(size, language, depth=60):
+    """Source made of deeply nested conditionals."""
+    units = []
+    length = 0
+    while length < size:
+        if language == 'python':
+            lines = [f'def nested_{len(units)}(value):']
+            lines += [f"{'    ' * (level + 1)}if value > {level}:" for level in range(depth)]
+            lines.append(f"{'    ' * (depth + 1)}return value")
+            lines.append('    return None\n')
+        else:
+            lines = [f'function nested{len(units)}(value) {{']
+            lines += [f"{'  ' * (level + 1)}if (value > {level}) {{" for level in range(depth)]
+            lines.append(f"{'  ' * (depth + 1)}return value;")
+            lines += [f"{'  ' * level}}}" for level in range(depth, -1, -1)]
+            lines.append('')
+        unit = '\n'.join(lines) + '\n'
+        units.append(unit)
+        length += len(unit)
+    return ''.join(units)[:size]
+
+def many_constants(size, language, seed=0):
+    """Thousands of constants and magic numbers."""
+    rng = random.Random(seed)
+    units = []
+    length = 0
+    while length < size:
+        index = len(units)
+        if language == 'python':
+            unit = f'LIMIT_{index} = {rng.randint(2, 10 ** 6)}\nratio_{index} = LIMIT_{index} * {rng.random():.4f}\n'
+        else:
+            unit = f"const LIMIT_{index} = {rng.randint(2, 10 ** 6)};\nconst label{index} = 'value {index}';\n"
+        units.append(unit)
+        length += len(unit)
+    return ''.join(units)[:size]
+
+def pathological(size):
+    """Every pathological case at the given size in characters, by name."""
+    return {
+        name: (language, (unit * (size // len(unit) + 1))[:size])
+        for name, (language, unit) in PATHOLOGICAL_UNITS.items()
+    }
+
+def build_corpus(sizes=DEFAULT_SIZES, adversarial_size=ADVERSARIAL_SIZE, pathological_size=PATHOLOGICAL_SIZE):
+    """
+    Build every benchmark case.
+
+    The output only depends on the arguments, so two runs (or two machines)
+    always time exactly the same input.
+
+    Args:
+        sizes (tuple): Sizes of the realistic cases, in characters
+        adversarial_size (int): Size of the adversarial cases
+        pathological_size (int): Size of the pathological cases
+
+    Returns:
+        dict: Case name to (language, source) pairs
+    """
+    cases = {}
+    for size in sizes:
+        label = _label(size)
+        cases[f'python_fastapi_{label}'] = ('python', python_module(size))
+        cases[f'javascript_react_{label}'] = ('javascript', javascript_module(size))
+
+    label = _label(adversarial_size)
+    cases[f'javascript_minified_{label}'] = ('javascript', minified_bundle(adversarial_size))
+    cases[f'python_deep_nesting_{label}'] = ('python', deep_nesting(adversarial_size, 'python'))
+    cases[f'javascript_deep_nesting_{label}'] = ('javascript', deep_nesting(adversarial_size, 'javascript'))
+    cases[f'python_constants_{label}'] = ('python', many_constants(adversarial_size, 'python'))
+    cases[f'javascript_constants_{label}'] = ('javascript', many_constants(adversarial_size, 'javascript'))
+
+    label = _label(pathological_size)
+    for name, case in pathological(pathological_size).items():
+        cases[f'{name}_{label}'] = case
+    return cases
+
+def _label(size):
+    return f'{size // MB}mb' if size >= MB else f'{size // KB}kb'
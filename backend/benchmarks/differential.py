@@ -0,0 +1,152 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+
+from app import config
+from app.analyzers import ANALYZER_VERSION
+from app.analyzers.core import language_for
+from app.analyzers.parallel import piece_boundaries
+from app.runner import AnalysisPool, BudgetExceeded
+from app.shadow import compare_results
+from .corpus import ADVERSARIAL_SIZE, DEFAULT_SIZES, FULL_SIZES, SAMPLES_DIR, build_corpus
+
+def build_cases(sizes, adversarial_size, only=None):
+    """
+    Collect the files to replay: everything in samples/ plus the benchmark corpus.
+
+    Returns:
+        dict: Case name to (language, source bytes) pairs
+    """
+    cases = {}
+    for name in sorted(os.listdir(SAMPLES_DIR)):
+        language = language_for(name)
+        if language is not None:
+            with open(os.path.join(SAMPLES_DIR, name), 'rb') as file:
+                cases[f'samples/{name}'] = (language, file.read())
+    for name, (language, content) in build_corpus(sizes, adversarial_size).items():
+        cases[name] = (language, content.encode('utf-8'))
+    return {name: case for name, case in cases.items() if not only or only in name}
+
+async def replay_case(pool, language, content, timeout):
+    """
+    Analyze one file with both engines, one after the other.
+
+    Returns:
+        dict: Both timings in milliseconds, their ratio (legacy over fast)
+            and the differences as compare_results() describes them, with
+            files of at least PARALLEL_MIN_BYTES also analyzed in pieces
+            (as "parallel", see replay_pieces()), or an "error" if either
+            engine failed or ran out of time
+    """
+    results = {}
+    for engine in ('fast', 'legacy'):
+        try:
+            results[engine] = await pool.run(language, content, timeout, {'engine': engine})
+        except (BudgetExceeded, RuntimeError) as e:
+            return {'error': f'{engine}: {e}'}
+    fast_ms = results['fast'].pop('timings_ms')['total']
+    legacy_ms = results['legacy'].pop('timings_ms')['total']
+    case = {
+        'fast_ms': round(fast_ms, 3),
+        'legacy_ms': round(legacy_ms, 3),
+        'time_ratio': round(legacy_ms / fast_ms, 2) if fast_ms else None,
+        **compare_results(results['fast'], results['legacy']),
+    }
+    if 0 < config.PARALLEL_MIN_BYTES <= len(content):
+        try:
+            case['parallel'] = await replay_pieces(pool, language, content, timeout, results['fast'])
+        except (BudgetExceeded, RuntimeError) as e:
+            return {'error': f'parallel: {e}'}
+    return case
+
+async def replay_pieces(pool, language, content, timeout, expected):
+    """
+    Analyze one large file in pieces, as the server does from
+    PARALLEL_MIN_BYTES, and compare it with the serial fast engine.
+
+    Returns:
+        dict: How many pieces the file was cut into, and whether the result
+            is the serial one; a file left in one piece does not match, as
+            it would not test the pieces at all
+    """
+    with tempfile.NamedTemporaryFile(delete=False) as file:
+        file.write(content)
+    try:
+        with open(file.name, 'rb') as source:
+            pieces = len(piece_boundaries(language, source, len(content), config.PARALLEL_PIECE_BYTES))
+        result = await pool.run_parallel(language, file.name, timeout, admit=False)
+    finally:
+        os.unlink(file.name)
+    result.pop('timings_ms')
+    return {'pieces': pieces, 'match': pieces > 1 and result == expected}
+
+async def run_replay(cases, jobs, timeout):
+    """Replay every case through both engines in a pool of worker processes."""
+    pool = AnalysisPool(jobs, max_tasks_per_worker=1000)
+    pool.start()
+    try:
+        report = {}
+        for name, (language, content) in cases.items():
+            case = await replay_case(pool, language, content, timeout)
+            report[name] = {'language': language, 'bytes': len(content), **case}
+            if 'error' in case:
+                print(f"{name:<32} {'ERROR':>8} {case['error']}", file=sys.stderr)
+            else:
+                print(
+                    f"{name:<32} {'match' if case['match'] else 'DRIFT':>8}"
+                    f" {case['score_delta']:>+4} score  {case['time_ratio'] or 0:>8.1f}x legacy time",
+                    file=sys.stderr,
+                )
+                if 'parallel' in case:
+                    print(
+                        f"{'':<32} {'match' if case['parallel']['match'] else 'DRIFT':>8}"
+                        f" in {case['parallel']['pieces']} pieces",
+                        file=sys.stderr,
+                    )
+        return report
+    finally:
+        pool.shutdown()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Replay samples/ and the benchmark corpus through the fast and legacy engines and diff the results.',
+    )
+    parser.add_argument('--output', '-o', help='Write the JSON report to this file')
+    parser.add_argument('--full', action='store_true', help='Include the 10 MB cases')
+    parser.add_argument('--only', help='Only run cases whose name contains this text')
+    parser.add_argument('--jobs', type=int, default=1, help='Worker processes (default: 1)')
+    parser.add_argument('--timeout', type=float, default=60.0,
+                        help='Seconds each engine may spend on one case (default: 60)')
+    parser.add_argument('--fail-on-drift', action='store_true',
+                        help='Fail when any case scores differently or an engine fails')
+    args = parser.parse_args(argv)
+
+    cases = build_cases(FULL_SIZES if args.full else DEFAULT_SIZES, ADVERSARIAL_SIZE, args.only)
+    report = {
+        'analyzer_version': ANALYZER_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cases': asyncio.run(run_replay(cases, args.jobs, args.timeout)),
+    }
+    drifted = [
+        name for name, case in report['cases'].items()
+        if not case.get('match') or not case.get('parallel', {'match': True})['match']
+    ]
+    report['drifted'] = len(drifted)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+    print(f'{len(drifted)} of {len(cases)} cases differ between the engines', file=sys.stderr)
+    return 1 if args.fail_on_drift and drifted else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import argparse
+import json
+import platform
+import sys
+
+from app.analyzers import ANALYZER_VERSION, ENGINES
+from app.analyzers.core import analyze_source, analyze_stream
+from app.analyzers.memory import traced_peak
+from .corpus import ADVERSARIAL_SIZE, DEFAULT_SIZES, FULL_SIZES, KB, python_module
+from .differential import build_cases
+
+# Peak memory per input byte measured for each case, analyzed in full with
+# each engine and streamed (CPython 3.11). A full Python analysis with the
+# legacy engine holds the ast tree of the whole file, which takes around a
+# hundred times the source; the fast engine parses it piece by piece (see
+# py_facts.parses()), and the other analyses only keep compact per-line
+# statistics next to the source. Re-measure with --output after a change
+# that moves them on purpose.
+MEASURED_RATIOS = {
+    'samples/sample_js.js': {'fast': 9.81, 'legacy': 8.06, 'streamed': 7.33},
+    'samples/sample_py.py': {'fast': 49.71, 'legacy': 103.14, 'streamed': 6.33},
+    'samples/test.py': {'fast': 94.67, 'legacy': 83.31, 'streamed': 12.58},
+    'samples/test_fixed.js': {'fast': 17.59, 'legacy': 14.23, 'streamed': 5.97},
+    'python_fastapi_1kb': {'fast': 46.09, 'legacy': 109.77, 'streamed': 6.45},
+    'javascript_react_1kb': {'fast': 8.57, 'legacy': 9.01, 'streamed': 6.78},
+    'python_fastapi_64kb': {'fast': 3.86, 'legacy': 111.76, 'streamed': 4.32},
+    'javascript_react_64kb': {'fast': 2.69, 'legacy': 5.47, 'streamed': 4.5},
+    'python_fastapi_1mb': {'fast': 3.9, 'legacy': 80.67, 'streamed': 0.49},
+    'javascript_react_1mb': {'fast': 2.45, 'legacy': 5.41, 'streamed': 0.46},
+    'javascript_minified_256kb': {'fast': 2.75, 'legacy': 1.74, 'streamed': 1.01},
+    'python_deep_nesting_256kb': {'fast': 3.32, 'legacy': 46.38, 'streamed': 1.13},
+    'javascript_deep_nesting_256kb': {'fast': 1.2, 'legacy': 4.04, 'streamed': 1.24},
+    'python_constants_256kb': {'fast': 6.58, 'legacy': 164.69, 'streamed': 1.62},
+    'javascript_constants_256kb': {'fast': 2.79, 'legacy': 6.46, 'streamed': 1.55},
+    'python_long_identifier_16kb': {'fast': 6.0, 'legacy': 5.74, 'streamed': 2.14},
+    'python_open_signatures_16kb': {'fast': 5.07, 'legacy': 8.22, 'streamed': 3.14},
+    'javascript_open_functions_16kb': {'fast': 11.6, 'legacy': 5.92, 'streamed': 2.14},
+    'javascript_open_arrows_16kb': {'fast': 8.93, 'legacy': 5.12, 'streamed': 2.14},
+    'javascript_open_components_16kb': {'fast': 4.8, 'legacy': 7.66, 'streamed': 4.3},
+    'javascript_long_variable_16kb': {'fast': 2.34, 'legacy': 1.12, 'streamed': 2.14},
+}
+
+# A case is over budget once it needs this much more memory than measured
+BUDGET_MARGIN = 1.25
+
+# Budget ratios of the cases not measured above (such as the 10 MB ones):
+# the margin over the largest ratio measured for the language and engine
+# on inputs of 64 KB or more (smaller ones fall under MIN_BUDGET_BYTES)
+BUDGET_RATIOS = {
+    'fast': {'python': 9, 'javascript': 4},
+    'legacy': {'python': 206, 'javascript': 9},
+}
+STREAM_BUDGET_RATIO = 6
+
+# Small inputs are dominated by fixed costs, so no budget is below this
+MIN_BUDGET_BYTES = 64 * KB
+
+# Chunk size of the streamed analyses, like a streamed upload
+CHUNK_BYTES = 64 * KB
+
+# Only rules that need line statistics, so the upload is analyzed in chunks
+STREAM_RULES = {
+    'python': ['formatting.indentation', 'formatting.line_length', 'formatting.trailing_whitespace'],
+    'javascript': ['formatting.indentation', 'formatting.line_length'],
+}
+
+def budget_ratio(name, language, analysis):
+    """
+    Peak memory allowed per input byte for a case.
+
+    Args:
+        analysis (str): An engine, for a full analysis with it, or
+            'streamed'
+    """
+    measured = MEASURED_RATIOS.get(name)
+    if measured is None:
+        return STREAM_BUDGET_RATIO if analysis == 'streamed' else BUDGET_RATIOS[analysis][language]
+    return round(measured[analysis] * BUDGET_MARGIN, 2)
+
+def measure_case(name, language, content, engines=tuple(ENGINES)):
+    """
+    Measure the peak memory of one file, analyzed in full with each engine
+    and streamed (which always runs on the fast engine, as it selects rules).
+
+    Returns:
+        dict: Peak bytes and budget of each analysis, by engine or
+            'streamed', their ratio to the input size, and whether any
+            went over its budget
+    """
+    chunks = lambda: (content[start:start + CHUNK_BYTES] for start in range(0, len(content), CHUNK_BYTES))
+    peaks = {}
+    for engine in engines:
+        _, peaks[engine] = traced_peak(analyze_source, language, content, engine=engine)
+    _, peaks['streamed'] = traced_peak(lambda: analyze_stream(language, chunks(), rules=STREAM_RULES[language]))
+    budgets = {
+        analysis: max(int(budget_ratio(name, language, analysis) * len(content)), MIN_BUDGET_BYTES)
+        for analysis in peaks
+    }
+    return {
+        'peak_bytes': peaks,
+        'budget_bytes': budgets,
+        'ratio': {analysis: round(peak / len(content), 2) if content else None for analysis, peak in peaks.items()},
+        'over_budget': any(peaks[analysis] > budgets[analysis] for analysis in peaks),
+    }
+
+def warm_up():
+    """
+    Run both analyzers once, so the caches and lazy imports they fill on
+    first use (such as NumPy's) are not counted against the first case.
+    """
+    source = python_module(128 * KB).encode('utf-8')
+    for language in STREAM_RULES:
+        for engine in ENGINES:
+            analyze_source(language, source, engine=engine)
+        analyze_stream(language, iter([source]), rules=STREAM_RULES[language])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Check that the peak memory of each analysis stays within a multiple of its input size.',
+    )
+    parser.add_argument('--output', '-o', help='Write the JSON report to this file')
+    parser.add_argument('--full', action='store_true', help='Include the 10 MB cases')
+    parser.add_argument('--only', help='Only run cases whose name contains this text')
+    parser.add_argument('--engine', action='append', choices=sorted(ENGINES), dest='engines',
+                        help='Only measure full analyses with this engine (repeatable; all engines by default)')
+    args = parser.parse_args(argv)
+
+    warm_up()
+    report = {
+        'analyzer_version': ANALYZER_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'budget_margin': BUDGET_MARGIN,
+        'cases': {},
+    }
+    cases = build_cases(FULL_SIZES if args.full else DEFAULT_SIZES, ADVERSARIAL_SIZE, args.only)
+    for name, (language, content) in cases.items():
+        case = measure_case(name, language, content, args.engines or tuple(ENGINES))
+        report['cases'][name] = {'language': language, 'bytes': len(content), **case}
+        peaks = ' '.join(f'{peak / KB:>10.1f} KB {analysis}' for analysis, peak in case['peak_bytes'].items())
+        print(f"{name:<32} {'OVER' if case['over_budget'] else 'ok':>4} {peaks}", file=sys.stderr)
+    over = [name for name, case in report['cases'].items() if case['over_budget']]
+    report['over_budget'] = len(over)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+    print(f'{len(over)} of {len(cases)} cases over their memory budget', file=sys.stderr)
+    return 1 if over else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+import argparse
+import json
+import platform
+import sys
+import time
+from functools import partial
+
+from app.analyzers import ANALYZER_VERSION, ENGINES, js_analyzer, js_facts, py_analyzer, py_facts
+from app.analyzers.core import FAST_ENGINE, backend
+from app.analyzers.line_stats import LineStats
+from .corpus import ADVERSARIAL_SIZE, DEFAULT_SIZES, FULL_SIZES, PATHOLOGICAL_SIZE, build_corpus, pathological
+
+CATEGORIES = ['naming', 'modularity', 'comments', 'formatting', 'reusability', 'best_practices']
+
+# Phases faster than this are too noisy to flag as regressions
+MIN_REGRESSION_SECONDS = 0.002
+
+# A measurement is not repeated after a run this slow: its noise is small
+# next to it, and the legacy engine takes tens of seconds on some cases
+MAX_REPEATED_SECONDS = 1.0
+
+# --scaling times the pathological cases at their size and at this many
+# times it, and fails when the time grew by more than the limit: about the
+# factor when it grows linearly, its square when it grows quadratically
+SCALING_FACTOR = 16
+MAX_SCALING_RATIO = 3 * SCALING_FACTOR
+
+def time_call(function, *args, repeat=3):
+    """Best wall-clock time of up to repeat calls (see MAX_REPEATED_SECONDS), and the last return value."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - started)
+        if best > MAX_REPEATED_SECONDS:
+            break
+    return best, result
+
+def benchmark_case(language, content, engine=FAST_ENGINE, repeat=3):
+    """
+    Time one source file end to end and phase by phase.
+
+    Each category is timed with the work it does on its own: with the fast
+    engine, an analysis of just that category, which only matches the
+    patterns of the facts its rules read (plus the shared line statistics);
+    with the legacy engine, its lap of a full analysis, in which each
+    category matches its own patterns.
+
+    Args:
+        language (str): 'python' or 'javascript'
+        content (str): Source code
+        engine (str): 'fast' or 'legacy'
+        repeat (int): Runs per measurement; the fastest one is kept
+
+    Returns:
+        dict: Seconds per phase, with 'total' for the whole analysis
+    """
+    analyze = getattr(backend(language, engine), f'analyze_{language}_source')
+    if engine != FAST_ENGINE:
+        return _benchmark_laps(analyze, content, repeat)
+
+    timings = {}
+    timings['total'], _ = time_call(analyze, content, repeat=repeat)
+    if language == 'python':
+        timings['line_stats'], _ = time_call(LineStats.from_content, content, ('#',), repeat=repeat)
+        timings['facts'], _ = time_call(py_facts.collect_facts, content, repeat=repeat)
+        timings['parse'], _ = time_call(py_facts.parses, content, repeat=repeat)
+    else:
+        timings['line_stats'], _ = time_call(
+            LineStats.from_content, content, js_analyzer.COMMENT_PREFIXES, js_analyzer.BLOCK_COMMENT_PREFIXES, repeat=repeat,
+        )
+        timings['facts'], _ = time_call(js_facts.collect_facts, content, repeat=repeat)
+
+    for category in CATEGORIES:
+        timings[category], _ = time_call(partial(analyze, categories=[category]), content, repeat=repeat)
+    return {phase: round(seconds, 6) for phase, seconds in timings.items()}
+
+def _benchmark_laps(analyze, content, repeat):
+    """Best time of each phase over up to repeat profiled analyses, from their laps."""
+    best = {}
+    for _ in range(repeat):
+        laps = analyze(content, True)['timings_ms']
+        for phase, milliseconds in laps.items():
+            best[phase] = min(best.get(phase, float('inf')), milliseconds / 1000)
+        if best['total'] > MAX_REPEATED_SECONDS:
+            break
+    return {phase: round(seconds, 6) for phase, seconds in best.items()}
+
+def run_benchmarks(sizes, adversarial_size, repeat, only=None, engines=tuple(ENGINES)):
+    """Time every corpus case with each engine and return the JSON-ready report."""
+    report = {
+        'analyzer_version': ANALYZER_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'cases': {},
+    }
+    for name, (language, content) in build_corpus(sizes, adversarial_size).items():
+        if only and only not in name:
+            continue
+        seconds = {}
+        for engine in engines:
+            seconds[engine] = benchmark_case(language, content, engine, repeat)
+            print(f"{name:<32} {engine:<6} {seconds[engine]['total'] * 1000:>10.1f} ms", file=sys.stderr)
+        report['cases'][name] = {'language': language, 'bytes': len(content.encode('utf-8')), 'seconds': seconds}
+    return report
+
+def check_scaling(size, repeat):
+    """
+    Time the pathological cases at size and SCALING_FACTOR times size.
+
+    Returns:
+        dict: Case name to the seconds at both sizes and their ratio
+    """
+    analyzers = {'python': py_analyzer.analyze_python_source, 'javascript': js_analyzer.analyze_javascript_source}
+    small, large = pathological(size), pathological(size * SCALING_FACTOR)
+    report = {}
+    for name, (language, content) in small.items():
+        before, _ = time_call(analyzers[language], content, repeat=repeat)
+        after, _ = time_call(analyzers[language], large[name][1], repeat=repeat)
+        report[name] = {'seconds': [round(before, 6), round(after, 6)], 'ratio': round(after / before, 1)}
+        print(f"{name:<32} {before * 1000:>10.1f} ms {after * 1000:>10.1f} ms  x{after / before:.1f}", file=sys.stderr)
+    return report
+
+def find_regressions(baseline, current, threshold_percent):
+    """
+    Compare two reports phase by phase, for each engine.
+
+    Args:
+        baseline (dict): Earlier report
+        current (dict): New report
+        threshold_percent (float): Allowed slowdown per phase
+
+    Returns:
+        list: Human-readable descriptions of phases that slowed down too much
+    """
+    regressions = []
+    for name, case in current['cases'].items():
+        before = baseline.get('cases', {}).get(name)
+        if before is None:
+            continue
+        for engine, timings in case['seconds'].items():
+            old_timings = before['seconds'].get(engine)
+            if not isinstance(old_timings, dict):
+                # Not timed with this engine, or a report from before engines were compared
+                continue
+            for phase, seconds in timings.items():
+                old = old_timings.get(phase)
+                if old is None or max(old, seconds) < MIN_REGRESSION_SECONDS:
+                    continue
+                change = (seconds - old) / old * 100 if old else float('inf')
+                if change > threshold_percent:
+                    regressions.append(
+                        f'{name} {engine} {phase}: {old * 1000:.2f} ms -> {seconds * 1000:.2f} ms (+{change:.0f}%)'
+                    )
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the Python and JavaScript analyzers.')
+    parser.add_argument('--output', '-o', help='Write the JSON report to this file')
+    parser.add_argument('--full', action='store_true', help='Include the 10 MB cases')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (default: 3)')
+    parser.add_argument('--only', help='Only run cases whose name contains this text')
+    parser.add_argument('--engine', action='append', choices=sorted(ENGINES), dest='engines',
+                        help='Engine to time; repeat for several (default: all of them)')
+    parser.add_argument('--compare', metavar='BASELINE', help='Fail when a phase is slower than in this report')
+    parser.add_argument('--threshold', type=float, default=20.0,
+                        help='Allowed slowdown in percent for --compare (default: 20)')
+    parser.add_argument('--scaling', action='store_true',
+                        help=f'Only check that the pathological cases take at most {MAX_SCALING_RATIO}x longer '
+                             f'at {SCALING_FACTOR}x their size')
+    args = parser.parse_args(argv)
+
+    if args.scaling:
+        scaling = check_scaling(PATHOLOGICAL_SIZE, args.repeat)
+        json.dump(scaling, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+        superlinear = [name for name, case in scaling.items() if case['ratio'] > MAX_SCALING_RATIO]
+        for name in superlinear:
+            print(f'SUPERLINEAR {name}: x{scaling[name]["ratio"]} at {SCALING_FACTOR}x the size', file=sys.stderr)
+        return 1 if superlinear else 0
+
+    report = run_benchmarks(
+        FULL_SIZES if args.full else DEFAULT_SIZES, ADVERSARIAL_SIZE, args.repeat, args.only, args.engines or tuple(ENGINES),
+    )
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = find_regressions(baseline, report, args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        if regressions:
+            return 1
+        print(f'No phase slowed down by more than {args.threshold:g}%', file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
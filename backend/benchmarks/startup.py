@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from .corpus import SAMPLES_DIR
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+# What a cold process runs for each case; the timer covers import and analysis
+CASES = {
+    'python': (
+        "from app.analyzers import analyze_file\n"
+        "analyze_file({path!r})\n",
+        'sample_py.py',
+    ),
+    'javascript': (
+        "from app.analyzers import analyze_file\n"
+        "analyze_file({path!r})\n",
+        'sample_js.js',
+    ),
+    'cli': (
+        "from app.analyzers.cli import main\n"
+        "main([{path!r}, '--output', {devnull!r}])\n",
+        'sample_py.py',
+    ),
+}
+
+# Runs the case and reports its time and the modules it loaded from outside
+# the standard library, which a dependency-free core must never need
+PROBE = '''
+import json, sys, time
+loaded = set(sys.modules)
+started = time.perf_counter()
+{code}
+seconds = time.perf_counter() - started
+names = {{name.partition('.')[0] for name in set(sys.modules) - loaded}}
+print(json.dumps({{
+    "seconds": seconds,
+    "external": sorted(names - set(sys.stdlib_module_names) - {{"app"}}),
+    "modules": sorted(names),
+}}))
+'''
+
+def run_case(name, runs):
+    """
+    Time one case in fresh interpreters.
+
+    Args:
+        name (str): Key of CASES
+        runs (int): Cold processes to start
+
+    Returns:
+        dict: Median seconds in process and for the whole process, and the
+            modules loaded outside the standard library
+    """
+    template, sample = CASES[name]
+    code = template.format(path=os.path.join(SAMPLES_DIR, sample), devnull=os.devnull)
+    in_process = []
+    wall = []
+    external = set()
+    modules = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, '-c', PROBE.format(code=code)],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        )
+        wall.append(time.perf_counter() - started)
+        probe = json.loads(completed.stdout.splitlines()[-1])
+        in_process.append(probe['seconds'])
+        external.update(probe['external'])
+        modules = probe['modules']
+    return {
+        'seconds': round(statistics.median(in_process), 6),
+        'process_seconds': round(statistics.median(wall), 6),
+        'external_modules': sorted(external),
+        'top_level_modules': len(modules),
+    }
+
+def interpreter_seconds(runs):
+    """Median time to start and stop a bare interpreter, for reference."""
+    wall = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], check=True)
+        wall.append(time.perf_counter() - started)
+    return round(statistics.median(wall), 6)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Time importing the analyzers and scoring one small file in a cold process.',
+    )
+    parser.add_argument('--runs', type=int, default=10, help='Cold processes per case (default: 10)')
+    parser.add_argument('--target-ms', type=float, default=50.0,
+                        help='Fail when import plus analysis takes longer (default: 50)')
+    parser.add_argument('--output', '-o', help='Write the JSON report to this file')
+    args = parser.parse_args(argv)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'runs': args.runs,
+        'target_ms': args.target_ms,
+        'interpreter_seconds': interpreter_seconds(args.runs),
+        'cases': {},
+    }
+    failures = []
+    for name in CASES:
+        case = run_case(name, args.runs)
+        report['cases'][name] = case
+        milliseconds = case['seconds'] * 1000
+        print(
+            f"{name:<12} {milliseconds:>8.1f} ms import + analysis"
+            f" {case['process_seconds'] * 1000:>8.1f} ms process",
+            file=sys.stderr,
+        )
+        if milliseconds > args.target_ms:
+            failures.append(f'{name}: {milliseconds:.1f} ms is over the {args.target_ms:g} ms target')
+        if case['external_modules']:
+            failures.append(f"{name}: imports non-stdlib modules {', '.join(case['external_modules'])}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+    for failure in failures:
+        print(f'SLOW START {failure}', file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())